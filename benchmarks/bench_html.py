@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, 2013 Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301,C0103
+
+"""Benchmark of the html tag clean.
+
+Compare clean_htmltag(), which strips the tags in one pass over the tags of sentence, with the
+original clean, which formats and runs about 80 patterns per sentence and repeats the div/span
+pattern for every pair. Both clean the same sentences, the results are checked to be identical.
+
+The sentences are generated: plain text, inline markup, nested div/span of a given depth. Use your
+own bitext corpus by option, both sides of pairs are cleaned.
+
+Command line Syntax::
+
+    Usage: bench_html.py [options]
+
+    Options:
+      -h, --help            show this help message and exit
+      -i FILE, --corpus=FILE
+                            bitext corpus, default is generated sentences
+      -n N, --sentences=N   number of generated sentences
+      -d N, --depth=N       depth of the nested div/span in generated sentences
+      -r N, --repeat=N      repeat N times and take the best time
+
+Sample results (python 2.7)::
+
+    $ bench_html.py
+    20000 sentences, 10000 with tags, 1337 cleaned by patterns
+    original     6.07s
+    one pass     0.46s  13.18x
+
+    $ bench_html.py --depth 40 --sentences 5000
+    5000 sentences, 2500 with tags, 332 cleaned by patterns
+    original     6.08s
+    one pass     0.27s  22.83x
+"""
+
+import random
+import re
+import sys
+import time
+
+from optparse import OptionParser
+from corpustoolkit import bitextio
+from corpustoolkit.cleantools import html
+from corpustoolkit.cleantools.html import COMPLEX_TAGS, COMPLEX_SINGLE_TAGS, DELETE_TAGS, DELETE_SINGLE_TAGS, INLINE_TAGS, STRUCT_TAGS
+
+WORDS = u"the file could not be opened click save to continue select a folder and try again settings " \
+        u"printer network connection account password update download".split()
+
+MARKUP = [u"<b>{0}</b>", u"<i>{0}</i>", u"<a href=\"http://example.com/\">{0}</a>", u"{0}<br/>",
+          u"<span class=\"ui\">{0}</span>", u"<p>{0}</p>", u"<strong>{0}</strong>", u"<code>{0}</code>",
+          u"<em>{0}</em>", u"<font color=\"red\">{0}</font>", u"<li>{0}</li>", u"{0} <!-- note -->"]
+
+
+def original_clean_htmltag(line):
+    """The tag clean before the one pass clean, the reference of results."""
+    if re.search(ur'<(%s).*?>.*</\1>' % '|'.join(COMPLEX_TAGS), line, re.IGNORECASE):
+        return u''
+    if re.search(ur'<(%s).*?/>' % '|'.join(COMPLEX_SINGLE_TAGS), line, re.IGNORECASE):
+        return u''
+    pattern_comment = ur'<!--(.*?)-->'
+    pattern_doctype = ur'(?i)<!DOCTYPE.+?>'
+    line = re.sub(pattern_comment, ur'\1', line)
+    line = re.sub(pattern_doctype, u'', line)
+
+    for tag in DELETE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>.*?</{tag} ?>'.format(tag=tag), u'', line)
+    for tag in DELETE_SINGLE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?/>'.format(tag=tag), u'', line)
+
+    for tag in INLINE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur'\1', line)
+
+    for tag in STRUCT_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur' \1 ', line)
+
+    for tag in ['div', 'span']:
+        pattern = ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)
+        result = re.sub(pattern, ur' \1 ', line, count=1)
+        while line != result:
+            line = result
+            result = re.sub(pattern, ur' \1 ', line, count=1)
+
+    line = re.sub(ur'<br.*?/>', ur' ', line)
+
+    return line
+
+
+def generate_sentences(count, depth):
+    """Generate sentences: half plain text, the others with inline markup or nested div/span."""
+    rng = random.Random(1)
+    sentences = []
+    for i in xrange(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 20))]
+        if i % 2 == 0:
+            sentences.append(u" ".join(words))
+        elif i % 10 == 1:
+            tag = rng.choice([u"div", u"span"])
+            nested = u" ".join(words)
+            for _ in range(depth):
+                nested = u"<{0} class=\"c\">{1} {2}</{0}>".format(tag, rng.choice(WORDS), nested)
+            sentences.append(nested)
+        else:
+            for _ in range(rng.randint(1, 3)):
+                index = rng.randrange(len(words))
+                words[index] = rng.choice(MARKUP).format(words[index])
+            sentences.append(u" ".join(words))
+    return sentences
+
+
+def bench(clean, sentences, repeat):
+    """Clean the sentences, return (best seconds, cleaned sentences)."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        cleaned = [clean(sentence) for sentence in sentences]
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+    return (best, cleaned)
+
+
+def main(argv):
+    """entry function."""
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("-i", "--corpus", metavar="FILE", dest="corpus", type="string",
+                      help="bitext corpus, default is generated sentences")
+    parser.add_option("-n", "--sentences", metavar="N", dest="sentences", type="int", default=20000,
+                      help="number of generated sentences")
+    parser.add_option("-d", "--depth", metavar="N", dest="depth", type="int", default=8,
+                      help="depth of the nested div/span in generated sentences")
+    parser.add_option("-r", "--repeat", metavar="N", dest="repeat", type="int", default=3,
+                      help="repeat N times and take the best time")
+    (options, _) = parser.parse_args(argv)
+
+    if options.corpus is None:
+        sentences = generate_sentences(options.sentences, options.depth)
+    else:
+        with bitextio.BitextReader(options.corpus) as reader:
+            sentences = [sentence for pair in reader.pairs() for sentence in pair]
+
+    base = bench(original_clean_htmltag, sentences, options.repeat)
+    onepass = bench(html.clean_htmltag, sentences, options.repeat)
+    if onepass[1] != base[1]:
+        print >> sys.stderr, "one pass clean differs from the original"
+        return 1
+
+    fallback = sum(1 for sentence in sentences if u'<' in sentence and html.strip_tags(sentence) is None)
+    print "{0} sentences, {1} with tags, {2} cleaned by patterns".format(
+        len(sentences), sum(1 for sentence in sentences if u'<' in sentence), fallback)
+    print "original  {0:7.2f}s".format(base[0])
+    print "one pass  {0:7.2f}s  {1:.2f}x".format(onepass[0], base[0] / onepass[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
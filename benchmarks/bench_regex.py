@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, 2013 Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+
+# pylint: disable=I0011,C0301,C0103
+
+"""Benchmark of the regex clean step.
+
+Compare the compiled rules of RegexClean, which resolve action, repl, apply_to and log once and scan
+a sentence at most once per rule, with the per-call dispatch on re step dicts, which runs search,
+finditer and sub for one logged replacement. Both clean the same pairs, the cleaned pairs and the
+log messages are checked to be identical.
+
+The default rules are a typical rule file of a localization corpus, the pairs are generated.
+Use your own rule file (a clean steps config with a regex step) and bitext corpus by options.
+
+Command line Syntax::
+
+    Usage: bench_regex.py [options]
+
+    Options:
+      -h, --help            show this help message and exit
+      -s FILE, --steps=FILE
+                            clean steps config, the rules of its first regex step are used
+      -i FILE, --corpus=FILE
+                            bitext corpus, default is generated pairs
+      -n N, --pairs=N       number of generated pairs
+      -l N, --literals=N    add N literal rules of product names and boilerplate strings
+      -r N, --repeat=N      repeat N times and take the best time
+
+Sample results (python 2.7)::
+
+    $ bench_regex.py
+    16 rules, 20000 pairs, 46987 log messages
+    dispatch     4.03s
+    compiled     2.23s  1.81x
+
+    $ bench_regex.py --literals 100
+    116 rules, 20000 pairs, 48944 log messages
+    dispatch    12.93s
+    compiled     3.45s  3.75x
+"""
+
+import json
+import random
+import sys
+import time
+
+from optparse import OptionParser
+from corpustoolkit import bitextio
+from corpustoolkit.cleantools.regex import RegexClean
+
+RULES = [
+    {"description": "cdata", "action": "delete", "pattern": u"<!\\[CDATA\\[|\\]\\]>", "log": "detail"},
+    {"description": "ph tag", "action": "replace", "pattern": u"<ph[^>]*>(\\{\\d+\\})</ph>", "repl": u" \\1 ", "log": "detail"},
+    {"description": "bpt/ept tag", "action": "delete", "pattern": u"</?(?:bpt|ept|it)[^>]*>", "log": "detail"},
+    {"description": "html tag", "action": "delete", "pattern": u"</?(?:b|i|u|span|font|br)\\b[^>]*>", "log": "detail"},
+    {"description": "placeholder only", "action": "delete_line", "pattern": u"^\\s*(?:\\{\\d+\\}\\s*)+$", "log": "lineno"},
+    {"description": "todo", "action": "delete_line", "pattern": u"\\bTODO\\b", "case_sensitive": True, "log": "lineno"},
+    {"description": "do not translate", "action": "delete_line", "pattern": u"\\bdo not translate\\b", "log": "detail"},
+    {"description": "lorem ipsum", "action": "delete_line", "pattern": u"\\blorem ipsum\\b", "log": "lineno"},
+    {"description": "email", "action": "replace", "pattern": u"\\b[\\w.+-]+@[\\w-]+\\.[\\w.]+\\b", "repl": u"<email>", "log": "detail"},
+    {"description": "version", "action": "replace", "pattern": u"\\b\\d+(?:\\.\\d+){2,}\\b", "repl": u"<version>", "log": "detail"},
+    {"description": "number", "action": "replace", "pattern": u"(\\d+)", "repl": u" \\1 ", "apply_to": u"source", "log": "lineno"},
+    {"description": "nbsp", "action": "replace", "pattern": u"\\u00a0", "repl": u" "},
+    {"description": "ellipsis", "action": "replace", "pattern": u"\\.{3,}", "repl": u"…", "log": "lineno"},
+    {"description": "quotes", "action": "replace", "pattern": u"[“”]", "repl": u"\"", "apply_to": u"target"},
+    {"description": "space before punct", "action": "delete", "pattern": u"\\s+(?=[,.;:!?])", "apply_to": u"source"},
+    {"description": "multi space", "action": "replace", "pattern": u"\\s{2,}", "repl": u" ", "case_sensitive": True},
+]
+
+WORDS = u"the file could not be opened click save to continue select a folder and try again settings " \
+        u"server update your account password is invalid download install restart the application".split()
+
+PIECES = [u"<ph x=\"1\">{1}</ph>", u"<b>", u"</b>", u"<bpt i=\"1\">", u"<ept i=\"1\">", u"user@example.com",
+          u"2.4.10", u"42", u"...", u" ", u"“OK”", u"<![CDATA[", u"]]>", u" ,"]
+
+DROPS = [u"TODO", u"Do not translate", u"{1} {2}", u"lorem ipsum dolor"]
+
+# the patterns of literal rules, some of them are in the generated pairs.
+LITERALS = []
+
+
+class ListLogger(object):
+    """Keep the log messages in a list."""
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        """Keep a message."""
+        self.messages.extend(message.split('\n'))
+
+
+class DispatchRegexClean(RegexClean):
+    """RegexClean looking up the re step dict for every sentence and rule, as before compiled rules."""
+    def relist_clean_pair(self, source, target):
+        for re_step in self.relist:
+            self.restep = re_step
+            source = source.strip()
+            target = target.strip()
+            if len(source) == 0 or len(target) == 0:
+                return (source, target)
+
+            if 'apply_to' in re_step:
+                if re_step["apply_to"] == u"source":
+                    source = self.re_clean(source)
+                elif re_step["apply_to"] == u"target":
+                    target = self.re_clean(target)
+            else:
+                source = self.re_clean(source)
+                target = self.re_clean(target)
+        return (source.strip(), target.strip())
+
+    def re_clean(self, sentence):
+        pattern = self.restep["pattern"]
+        if self.restep["action"] == "delete_line":
+            return self.re_del(sentence, pattern)
+        else:
+            if self.restep["action"] == "replace":
+                repl = self.restep["repl"]
+            elif self.restep["action"] == "delete":
+                repl = u''
+            return self.re_repl(sentence, pattern, repl)
+
+    def re_del(self, sentence, pattern):
+        if pattern.search(sentence):
+            if "log" in self.restep:
+                if self.restep["log"] == u"detail":
+                    self.logger.info(
+                        "Line {ln}: Desc={desc}: {match}".format(ln=self.lineno, desc=self.restep["description"],
+                                                                 match=pattern.search(sentence).group(0).encode('utf-8'))
+                        )
+                elif self.restep["log"] == u"lineno":
+                    self.logger.info("Line {ln}: Desc={desc}".format(ln=self.lineno, desc=self.restep["description"]))
+            return u''
+        else:
+            return sentence
+
+    def re_repl(self, sentence, pattern, repl):
+        if "log" in self.restep and pattern.search(sentence):
+            if  self.restep["log"] == u"detail":
+                for match in pattern.finditer(sentence):
+                    self.logger.info(
+                        "Line {ln}: Desc={desc}: {match}".format(ln=self.lineno, desc=self.restep["description"],
+                                                                 match=match.group(0).encode('utf-8'))
+                    )
+            elif self.restep["log"] == u"lineno":
+                self.logger.info("Line {ln}: Desc={desc}".format(ln=self.lineno, desc=self.restep["description"]))
+
+        return pattern.sub(repl, sentence)
+
+
+def generate_pairs(count):
+    """Return a list of generated pairs with some markup to clean."""
+    rand = random.Random(2013)
+    pairs = []
+    for _ in xrange(count):
+        sentences = []
+        for _ in range(2):
+            words = [rand.choice(WORDS) for _ in range(rand.randint(5, 25))]
+            for _ in range(rand.randint(0, 3)):
+                words.insert(rand.randint(0, len(words)), rand.choice(PIECES))
+            if rand.random() < 0.03:
+                words.insert(rand.randint(0, len(words)), rand.choice(DROPS))
+            if LITERALS and rand.random() < 0.05:
+                words.insert(rand.randint(0, len(words)), rand.choice(LITERALS))
+            sentences.append(u' '.join(words))
+        pairs.append(tuple(sentences))
+    return pairs
+
+
+def literal_rules(count):
+    """Return count literal rules, the generated pairs contain some of the literals."""
+    rules = []
+    for index in range(count):
+        if index % 2 == 0:
+            rule = {"description": "product", "action": "replace", "pattern": u"Product{0} Suite".format(index),
+                    "repl": u"<product>", "log": "lineno"}
+        else:
+            rule = {"description": "boilerplate", "action": "delete_line",
+                    "pattern": u"All rights reserved {0}".format(index), "log": "lineno"}
+        if index % 3 == 0:
+            rule["case_sensitive"] = True
+        rules.append(rule)
+        LITERALS.append(rule["pattern"])
+    return rules
+
+
+def read_rules(filename):
+    """Return the rules of the first regex step in clean steps config."""
+    with open(filename) as fp:
+        steps = json.load(fp)
+    for step in steps:
+        if step["name"] == "regex":
+            return step["list"]
+    raise SystemExit("no regex step in {0}".format(filename))
+
+
+def bench(cls, rules, pairs, repeat):
+    """Clean the pairs with RegexClean class, return (best seconds, cleaned pairs, log messages)."""
+    best = None
+    for _ in range(repeat):
+        logger = ListLogger()
+        regexclean = cls(None, {"ext": "re", "list": rules, "logger": logger})
+        regexclean.compile_relist()
+        start = time.time()
+        cleaned = [regexclean.clean_pair(source, target) for source, target in pairs]
+        regexclean.close()
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+    return (best, cleaned, logger.messages)
+
+
+def main(argv):
+    """entry function."""
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("-s", "--steps", metavar="FILE", dest="steps", type="string",
+                      help="clean steps config, the rules of its first regex step are used")
+    parser.add_option("-i", "--corpus", metavar="FILE", dest="corpus", type="string",
+                      help="bitext corpus, default is generated pairs")
+    parser.add_option("-n", "--pairs", metavar="N", dest="pairs", type="int", default=20000,
+                      help="number of generated pairs")
+    parser.add_option("-l", "--literals", metavar="N", dest="literals", type="int", default=0,
+                      help="add N literal rules of product names and boilerplate strings")
+    parser.add_option("-r", "--repeat", metavar="N", dest="repeat", type="int", default=3,
+                      help="repeat N times and take the best time")
+    (options, _) = parser.parse_args(argv)
+
+    rules = RULES if options.steps is None else read_rules(options.steps)
+    rules = rules + literal_rules(options.literals)
+    if options.corpus is None:
+        pairs = generate_pairs(options.pairs)
+    else:
+        with bitextio.BitextReader(options.corpus) as reader:
+            pairs = list(reader.pairs())
+
+    base = bench(DispatchRegexClean, rules, pairs, options.repeat)
+    compiled = bench(RegexClean, rules, pairs, options.repeat)
+    if compiled[1:] != base[1:]:
+        print >> sys.stderr, "compiled rules differ from dispatch"
+        return 1
+
+    print "{0} rules, {1} pairs, {2} log messages".format(len(rules), len(pairs), len(base[2]))
+    print "dispatch  {0:7.2f}s".format(base[0])
+    print "compiled  {0:7.2f}s  {1:.2f}x".format(compiled[0], base[0] / compiled[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
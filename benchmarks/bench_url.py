@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, 2013 Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301,C0103
+
+"""Benchmark of the url clean.
+
+Compare the url detector, which tries the url pattern only near the anchors of urls, with the
+original clean, which searches the url pattern in the whole sentence. Both clean the same sentences,
+the matches are checked to be identical.
+
+The sentences are generated: plain text, text with dotted words which are not urls (abbreviations,
+versions, file names), and text with urls, domains and ip addresses. Use your own bitext corpus
+by option, both sides of pairs are cleaned.
+
+Command line Syntax::
+
+    Usage: bench_url.py [options]
+
+    Options:
+      -h, --help            show this help message and exit
+      -i FILE, --corpus=FILE
+                            bitext corpus, default is generated sentences
+      -n N, --sentences=N   number of generated sentences
+      -r N, --repeat=N      repeat N times and take the best time
+
+Sample results (python 2.7)::
+
+    $ bench_url.py
+    50000 sentences, 4480 with urls
+    original     1.21s
+    detector     0.13s  9.15x
+"""
+
+import logging
+import random
+import sys
+import time
+
+from optparse import OptionParser
+from corpustoolkit import bitextio
+from corpustoolkit.cleantools import url
+
+WORDS = u"the file could not be opened click save to continue select a folder and try again settings " \
+        u"printer network connection account password update download".split()
+
+DOTTED = [u"e.g.", u"i.e.", u"v{0}.{1}", u"{0}.{1}.{2}", u"setup.exe", u"readme.txt", u"Fig.{0}", u"U.S.", u"{0}.{1}%"]
+
+URLS = [u"http://www.example.com/", u"https://support.example.org/kb/{0}?lang=en", u"www.example.co.uk",
+        u"ftp://ftp.example.net/pub/file{0}.zip", u"example.com", u"http://localhost:{0}{1}{2}/",
+        u"192.168.{0}.{1}", u"mail.example.de:8080/index.html", u"(see http://example.info)", u"docs.example.io"]
+
+
+def generate_sentences(count):
+    """Generate sentences: 80% plain text, 10% with dotted words, 10% with urls."""
+    rng = random.Random(1)
+    sentences = []
+    for i in xrange(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 20))]
+        if i % 10 == 1:
+            words[rng.randrange(len(words))] = rng.choice(DOTTED).format(*[rng.randint(0, 255) for _ in range(3)])
+        elif i % 10 == 2:
+            words[rng.randrange(len(words))] = rng.choice(URLS).format(*[rng.randint(0, 9) for _ in range(3)])
+        sentences.append(u" ".join(words) + u".")
+    return sentences
+
+
+def bench(clean, sentences, repeat):
+    """Clean the sentences, return (best seconds, cleaned sentences)."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        cleaned = [clean(sentence) for sentence in sentences]
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+    return (best, cleaned)
+
+
+def main(argv):
+    """entry function."""
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("-i", "--corpus", metavar="FILE", dest="corpus", type="string",
+                      help="bitext corpus, default is generated sentences")
+    parser.add_option("-n", "--sentences", metavar="N", dest="sentences", type="int", default=50000,
+                      help="number of generated sentences")
+    parser.add_option("-r", "--repeat", metavar="N", dest="repeat", type="int", default=3,
+                      help="repeat N times and take the best time")
+    (options, _) = parser.parse_args(argv)
+
+    if options.corpus is None:
+        sentences = generate_sentences(options.sentences)
+    else:
+        with bitextio.BitextReader(options.corpus) as reader:
+            sentences = [sentence for pair in reader.pairs() for sentence in pair]
+
+    urlclean = url.URLClean(None, {"ext": "url", "repl": u"", "logger": logging.getLogger("bench_url")})
+    urlclean.prepare_pattern()
+    detector = urlclean.detector
+
+    base = bench(lambda sentence: detector.pattern.sub(u"", sentence), sentences, options.repeat)
+    detect = bench(lambda sentence: urlclean.urlclean_line(sentence, 0), sentences, options.repeat)
+    if detect[1] != base[1]:
+        print >> sys.stderr, "url detector differs from the original"
+        return 1
+    for sentence in sentences:
+        if [match.span() for match in detector.matches(sentence)] != [match.span() for match in detector.pattern.finditer(sentence)]:
+            print >> sys.stderr, "url detector differs from the original: " + sentence.encode('utf-8')
+            return 1
+
+    print "{0} sentences, {1} with urls".format(len(sentences), sum(1 for base_line, line in zip(sentences, base[1]) if base_line != line))
+    print "original  {0:7.2f}s".format(base[0])
+    print "detector  {0:7.2f}s  {1:.2f}x".format(detect[0], base[0] / detect[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -39,8 +39,8 @@ _corpustk_completion()
 {
     cur=${COMP_WORDS[COMP_CWORD]}
     COMMANDS='\
-        tmx2bitext tmx2db bitext2tmx\
-        clean'
+        tmx2bitext tmx2db bitext2tmx lineindex\
+        clean corpusbatch'
     case "${cur}" in
        *) __corpustk_comp "$COMMANDS" ;;
     esac
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+
+# pylint: disable=I0011,C0301
+
+"""
+Asynchronous Log Module
+
+Write the match logs of clean steps by a background thread. The clean loop appends a record to a
+batch, a full batch is put into a bounded queue, the writer thread formats the records and writes
+the batch into the step logger in bulk. The clean loop blocks if the writer falls behind by the size
+of queue, so the memory is bounded.
+
+A record is a message string, or a tuple (template, lineno, description, match) which is formatted
+by the writer into unicode as ``template.format(ln=lineno, desc=description, match=match)``, the
+logger of step writes it in UTF-8.
+"""
+
+import Queue
+import sys
+import threading
+
+# number of records in a batch.
+BATCH_SIZE = 1024
+
+# number of batches waiting for the writer.
+QUEUE_SIZE = 16
+
+
+def format_record(record):
+    """Return the message of record."""
+    if isinstance(record, tuple):
+        template, lineno, description, match = record
+        return template.format(ln=lineno, desc=description, match=match)
+    return record
+
+
+class AsyncLog(object):
+    """Batch the records of a step log and write them into logger by a background thread.
+
+    The thread is started when the first batch is full. The records are written in order, as
+    one message of many lines if bulk is True, otherwise one message per record, e.g. when the
+    logger adds a prefix to every message.
+
+    """
+    def __init__(self, logger, bulk=True, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE):
+        self.logger = logger
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.queue = Queue.Queue(queue_size)
+        self.records = []
+        self.thread = None
+        self.error = None
+
+    def info(self, message):
+        """Log a message, as the info() of logger."""
+        self.append(message)
+
+    def append(self, record):
+        """Log a record."""
+        self.records.append(record)
+        if len(self.records) >= self.batch_size:
+            self.push()
+
+    def push(self):
+        """Put the batch of records into queue."""
+        self.check()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="asynclog")
+            self.thread.daemon = True
+            self.thread.start()
+        self.queue.put(self.records)
+        self.records = []
+
+    def run(self):
+        """Writer thread, write the batches until None is got."""
+        while True:
+            records = self.queue.get()
+            try:
+                if records is None:
+                    return
+                if self.error is None:
+                    self.write(records)
+            except Exception:           # pylint: disable=I0011,W0703
+                self.error = sys.exc_info()
+            finally:
+                self.queue.task_done()
+
+    def write(self, records):
+        """Write a batch of records into logger."""
+        if self.bulk:
+            self.logger.info(u'\n'.join(format_record(record) for record in records))
+        else:
+            for record in records:
+                self.logger.info(format_record(record))
+
+    def check(self):
+        """Raise the error of writer thread in the clean loop."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error[0], error[1], error[2]
+
+    def flush(self):
+        """Write all of the records logged, wait until they are written."""
+        if self.thread is None:
+            if len(self.records) > 0:
+                self.write(self.records)
+                self.records = []
+            return
+        if len(self.records) > 0:
+            self.push()
+        self.queue.join()
+        self.check()
+
+    def close(self):
+        """Flush the records and stop the writer thread."""
+        try:
+            self.flush()
+        finally:
+            if self.thread is not None:
+                self.queue.put(None)
+                self.thread.join()
+                self.thread = None
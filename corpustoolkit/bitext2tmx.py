@@ -43,9 +43,9 @@ import errno
 import os
 import sys
 
-import codecs
 from xml.sax import saxutils
 
+from corpustoolkit.bitextio import BitextReader, BitextWriter, split_suffix
 from corpustoolkit.language_code import LanguageCode
 
 def main(argv):
@@ -75,7 +75,7 @@ def validateFilepath(filepath):
         print >> sys.stderr, "Please specify a bitext file as input."
         sys.exit(errno.ENOENT)
 
-    namelist = os.path.basename(filepath).split('.')
+    namelist = split_suffix(os.path.basename(filepath))[0].split('.')
     if len(namelist) != 3:
         print >> sys.stderr, "The input bitext file should be named like 'resource.en-zh.bitext'."
         sys.exit(errno.ENOENT)
@@ -97,14 +97,17 @@ def validateFilepath(filepath):
         print >> sys.stderr, "Invalid language ID."
         sys.exit(errno.EINVAL)
 
-def valdiateContent(filepath):
+def validateContent(filepath):
     pass
 
 def bi2tmx(filepath):
-    """convert the bitext file to tmx file."""
+    """convert the bitext file to tmx file.
+
+    The tmx file is compressed in the same format if bitext file is named with a compression suffix.
+    """
 
     dirpath = os.path.dirname(filepath)
-    filename = os.path.basename(filepath)
+    (filename, compression) = split_suffix(os.path.basename(filepath))
     namelist = filename.split('.')
     namestem = namelist[0]
     langpair = namelist[1]
@@ -114,10 +117,12 @@ def bi2tmx(filepath):
     suffix = namelist[2]
 
     tmxfilename = namestem + "." + suffix + ".tmx"
+    if compression is not None:
+        tmxfilename = tmxfilename + "." + compression
     tmxfilename = os.path.join(dirpath, tmxfilename)
 
-    bitext_fp = codecs.open(filepath, 'r', encoding="UTF-8")
-    tmx_fp = codecs.open(tmxfilename, 'w', encoding="UTF-8")
+    bitext_fp = BitextReader(filepath)
+    tmx_fp = BitextWriter(tmxfilename)
 
     tmx_head = """<?xml version="1.0" encoding="UTF-8"?>
 <tmx version="1.4">
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Bitext I/O Module
+
+Buffered reader and writer of UTF-8 bitext files. The reader reads the file in big byte blocks
+and decodes a block at once, the writer joins the lines into a big buffer before encoding and
+writing it. Both are much faster than the line by line codecs reader and writer.
+
+The lines are split in the same way as the codecs reader does, i.e. unicode.splitlines().
+
+Files compressed with gzip, bzip2 or xz are decompressed and compressed on the fly. The format of
+a file to read is detected by its magic bytes, the format of a file to write by its suffix.
+The xz format needs the module lzma (backports.lzma on Python 2).
+"""
+
+import bz2
+import gzip
+import os
+import shutil
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+from corpustoolkit import fileutil
+
+# size of the blocks read from file and of the write buffer.
+BLOCK_SIZE = 1 << 20
+
+# compression formats: (suffix, magic bytes).
+COMPRESSIONS = [("gz", b'\x1f\x8b'), ("bz2", b'BZh'), ("xz", b'\xfd7zXZ\x00')]
+
+
+def split_suffix(filename):
+    """Split the compression suffix from filename, return (filename, format) or (filename, None)."""
+    (root, ext) = os.path.splitext(filename)
+    for name, magic in COMPRESSIONS:     # pylint: disable=I0011,W0612
+        if ext == '.' + name:
+            return (root, name)
+    return (filename, None)
+
+
+def compression(filename):
+    """Return the compression format of an existing file by its magic bytes, None if not compressed."""
+    with open(filename, 'rb') as fp:
+        head = fp.read(6)
+    for name, magic in COMPRESSIONS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_file(filename, mode='rb'):
+    """Open a file in binary mode, decompress it on read or compress it on write if necessary."""
+    fmt = compression(filename) if mode.startswith('r') else split_suffix(filename)[1]
+    if fmt is None:
+        return open(filename, mode)
+    elif fmt == "gz":
+        return gzip.GzipFile(filename, mode, 6)
+    elif fmt == "bz2":
+        return bz2.BZ2File(filename, mode)
+    elif lzma is None:
+        raise IOError("Can't open {}: the module lzma (backports.lzma) is required for xz format.".format(filename))
+    return lzma.LZMAFile(filename, mode)
+
+
+def convert_file(src, dst):
+    """Copy src into dst, src is decompressed and dst is compressed according to their formats.
+
+    dst is replaced atomically, it can be the same file as src.
+
+    """
+    (root, fmt) = split_suffix(dst)
+    tmpname = fileutil.temp_filename(root) + ("" if fmt is None else "." + fmt)
+    fileutil.remove(tmpname)
+    srcfp = open_file(src, 'rb')
+    dstfp = open_file(tmpname, 'wb')
+    try:
+        shutil.copyfileobj(srcfp, dstfp, BLOCK_SIZE)
+    finally:
+        srcfp.close()
+        dstfp.close()
+    os.rename(tmpname, dst)
+
+
+def split_line(line):
+    """Split a bitext line into pair (source, target), the line terminator is removed."""
+    [source, target] = line.rstrip(u'\r\n').split(u'\t')
+    return (source, target)
+
+
+def join_pair(source, target):
+    """Join the pair into a bitext line."""
+    return source + u'\t' + target + os.linesep
+
+
+class BitextReader(object):
+    """Read the unicode lines of a UTF-8 bitext file.
+
+    :param fp:          file name or a file object opened in binary mode. A compressed file is decompressed.
+    :param start:       byte offset to start reading, must be at a line boundary. Not for compressed file.
+    :param end:         byte offset to stop reading, must be at a line boundary. None to read to the end of file.
+    :param blocksize:   size of blocks read from file.
+
+    """
+    def __init__(self, fp, start=0, end=None, blocksize=BLOCK_SIZE):
+        self.owner = isinstance(fp, basestring)
+        self.fp = open_file(fp, 'rb') if self.owner else fp
+        self.start = start
+        self.end = end
+        self.blocksize = blocksize
+
+    def __iter__(self):
+        return self.lines()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def blocks(self):
+        """Yield the decoded blocks of file, every block ends with a complete line."""
+        if self.start:
+            self.fp.seek(self.start)
+        remain = None if self.end is None else self.end - self.start
+        tail = b''
+        while remain is None or remain > 0:
+            block = self.fp.read(self.blocksize if remain is None else min(self.blocksize, remain))
+            if not block:
+                break
+            if remain is not None:
+                remain = remain - len(block)
+            # cut the block after last '\n', a multi-byte character or '\r\n' is never split.
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                tail = tail + block
+                continue
+            yield (tail + block[:cut]).decode('UTF-8')
+            tail = block[cut:]
+        if tail:
+            yield tail.decode('UTF-8')
+
+    def lines(self):
+        """Yield the lines of file, the line terminators are kept."""
+        for block in self.blocks():
+            for line in block.splitlines(True):
+                yield line
+
+    def pairs(self):
+        """Yield the pairs (source, target) of file."""
+        for line in self.lines():
+            yield split_line(line)
+
+    def close(self):
+        if self.owner:
+            self.fp.close()
+
+
+class BitextWriter(object):
+    """Write unicode text into a UTF-8 file with a big buffer.
+
+    :param fp:          file name or a file object opened in binary mode. The file is compressed if
+                        the name ends with .gz, .bz2 or .xz.
+    :param bufsize:     the buffer is flushed when it holds more characters than bufsize.
+
+    """
+    def __init__(self, fp, bufsize=BLOCK_SIZE):
+        self.owner = isinstance(fp, basestring)
+        self.fp = open_file(fp, 'wb') if self.owner else fp
+        self.bufsize = bufsize
+        self.buffer = []
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.size = self.size + len(text)
+        if self.size >= self.bufsize:
+            self._write_buffer()
+
+    def write_pair(self, source, target):
+        self.write(join_pair(source, target))
+
+    def _write_buffer(self):
+        # don't flush the file object here, a flush of compressor would hurt the compression ratio.
+        if self.buffer:
+            self.fp.write(u''.join(self.buffer).encode('UTF-8'))
+            self.buffer = []
+            self.size = 0
+
+    def flush(self):
+        self._write_buffer()
+        self.fp.flush()
+
+    def close(self):
+        if self.owner:
+            self._write_buffer()
+            self.fp.close()
+        else:
+            self.flush()
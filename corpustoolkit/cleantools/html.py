@@ -35,50 +35,81 @@
 HTML Clean Module
 
 Unescape the HTML entity (name or codepoint form) to unicode char, remove html
-tags.
+tags. The tags are removed in one pass over the tags of sentence, the patterns of
+tags are run one by one only on the markup which they don't match as tags.
 """
 
-import codecs
-import os
 import re
-from xml.sax import saxutils
-import HTMLParser
+import htmlentitydefs
+
+from corpustoolkit import features
+from corpustoolkit import pipeline
 
 def validate(step):
     return True
 
-def run(clean_config, corpustools_config, step):        # pylint: disable=I0011,W0613
-    """entry function."""
-    filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
-    filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"]))
+def triggers(step):         # pylint: disable=I0011,W0613
+    """Return the features of the pairs which the step changes: tags, entities, line breaks or whitespace to strip."""
+    return features.LT | features.AMP | features.BREAK | features.EDGE
+
+def deterministic(step):    # pylint: disable=I0011,W0613
+    """Return True, the step depends on the pair only and writes no log, its results can be kept in memo."""
+    return True
 
-    infp = codecs.open(filename, 'r', 'UTF-8')
-    outfp = codecs.open(filename_ext, 'w', 'UTF-8')
+def run(clean_config, corpustools_config, step):
+    """entry function."""
+    pipeline.run_step(clean_config, corpustools_config, step)
 
-    parser = HTMLParser.HTMLParser()
 
-    for line in infp:
-        [source, target] = line.split(u'\t')
-        source = clean_html(parser, source)
-        target = clean_html(parser, target)
-        cleanline = u'\t'.join([source, target]) + os.linesep
-        outfp.write(cleanline)
+def stage(clean_config, corpustools_config, step):         # pylint: disable=I0011,W0613
+    """Return the function cleaning a pair of sentences."""
+    def clean_pair(source, target):
+        return (clean_html(source), clean_html(target))
 
-    infp.close()
-    outfp.close()
+    return clean_pair
 
 
-def clean_html(parser, line):
+def clean_html(line):
     """Unescape xml escape sequences, html entities and clean html tags."""
-
-    # We need to use saxutils unescape() to convert the &amp; first.
-    # use case: &amp;nbsp;
-    line = saxutils.unescape(line)
-    line = u" ".join(parser.unescape(line).splitlines())
+    line = u" ".join(unescape(line).splitlines())
     line = clean_htmltag(line)
     return line.strip()
 
 
+# html entities, HTMLParser supports apos which is not part of html 4.
+ENTITIES = dict((name, unichr(code)) for name, code in htmlentitydefs.name2codepoint.iteritems())
+ENTITIES['apos'] = u"'"
+
+# an html entity or numeric character reference, maybe escaped as xml, e.g. &amp;nbsp;
+# The \w is ASCII as in HTMLParser.
+ENTITY_PATTERN = re.compile(r'&(?:amp;)?(#?[xX]?(?:[0-9a-fA-F]+|\w{1,8}));')
+
+
+def unescape(line):
+    """Unescape xml escape sequences and html entities in one pass.
+
+    The result is the same as HTMLParser.unescape() after saxutils.unescape(), i.e. an entity escaped
+    once more as xml is unescaped too. A numeric character reference out of range is kept.
+
+    """
+    if u'&' not in line:
+        return line
+    return ENTITY_PATTERN.sub(unescape_entity, line)
+
+
+def unescape_entity(match):
+    """Return the character of an entity match, or the entity if it's unknown."""
+    name = match.group(1)
+    if name[0] == u'#':
+        try:
+            if name[1] in u'xX':
+                return unichr(int(name[2:], 16))
+            return unichr(int(name[1:]))
+        except (ValueError, OverflowError):
+            return u'&' + name + u';'
+    return ENTITIES.get(name, u'&' + name + u';')
+
+
 # remove table, form, frame, embedded object.
 COMPLEX_TAGS = ['address',
                 'applet',
@@ -183,40 +214,197 @@ DELETE_SINGLE_TAGS = ['base',
 ]
 
 
-def clean_htmltag(line):
-    """clean html tags."""
-    if re.search(ur'<(%s).*?>.*</\1>' % '|'.join(COMPLEX_TAGS), line, re.IGNORECASE):
-        return u''
-    if re.search(ur'<(%s).*?/>' % '|'.join(COMPLEX_SINGLE_TAGS), line, re.IGNORECASE):
-        return u''
-    pattern_comment = ur'<!--(.*?)-->'
-    pattern_doctype = ur'(?i)<!DOCTYPE.+?>'
-    line = re.sub(pattern_comment, ur'\1', line)
-    line = re.sub(pattern_doctype, u'', line)
+# patterns of the complex markup, the sentence is removed if it has one.
+COMPLEX_PATTERN = re.compile(ur'<(%s).*?>.*</\1>' % '|'.join(COMPLEX_TAGS), re.IGNORECASE)
+COMPLEX_SINGLE_PATTERN = re.compile(ur'<(%s).*?/>' % '|'.join(COMPLEX_SINGLE_TAGS), re.IGNORECASE)
+COMMENT_PATTERN = re.compile(ur'<!--(.*?)-->')
+DOCTYPE_PATTERN = re.compile(ur'(?i)<!DOCTYPE.+?>')
+
+# a tag: closing slash, name, attributes and the slash of a single tag.
+TAG_PATTERN = re.compile(ur'<(/?)([a-zA-Z][a-zA-Z0-9]*)([^<>]*)>')
 
+# tags stripped in pairs: replacement of the tags, and whether the pairs may be nested in themselves.
+PAIRED_TAGS = {}
+PAIRED_TAGS.update((tag, (u'', False)) for tag in INLINE_TAGS)
+PAIRED_TAGS.update((tag, (u' ', False)) for tag in STRUCT_TAGS)
+PAIRED_TAGS.update((tag, (u' ', True)) for tag in ['div', 'span'])
+
+# tag names with the tags of patterns which match them, the patterns match the tag names by prefix.
+PREFIXES = {}
+
+
+def compile_tag_subs():
+    """Return the list of (pattern, repl, nested) to clean tags one by one, see sub_tags()."""
+    subs = []
     # <code>...<code >
     for tag in DELETE_TAGS:
-        line = re.sub(ur'<(?i){tag}.*?>.*?</{tag} ?>'.format(tag=tag), u'', line)
+        subs.append((re.compile(ur'<(?i){tag}.*?>.*?</{tag} ?>'.format(tag=tag)), u'', False))
     for tag in DELETE_SINGLE_TAGS:
-        line = re.sub(ur'<(?i){tag}.*?/>'.format(tag=tag), u'', line)
+        subs.append((re.compile(ur'<(?i){tag}.*?/>'.format(tag=tag)), u'', False))
 
     # <A ...>...<a >
     for tag in INLINE_TAGS:
-        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur'\1', line)
+        subs.append((re.compile(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)), ur'\1', False))
 
     for tag in STRUCT_TAGS:
-        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur' \1 ', line)
+        subs.append((re.compile(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)), ur' \1 ', False))
 
     # Remove the div and span even they are embedded themselves.
-    # The following code works if have correct div/span pairs in sentence.
-    # Otherwise some div/span will be left there, maybe not the correct standalone one.
     for tag in ['div', 'span']:
-        pattern = ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)
-        result = re.sub(pattern, ur' \1 ', line, count=1)
-        while line != result:
-            line = result
-            result = re.sub(pattern, ur' \1 ', line, count=1)
+        subs.append((re.compile(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)), ur' \1 ', True))
+
+    subs.append((re.compile(ur'<br.*?/>'), ur' ', False))
+    return subs
 
-    line = re.sub(ur'<br.*?/>', ur' ', line)
+TAG_SUBS = compile_tag_subs()
 
+
+def clean_htmltag(line):
+    """clean html tags."""
+    if u'<' not in line:
+        return line
+    if COMPLEX_PATTERN.search(line):
+        return u''
+    if COMPLEX_SINGLE_PATTERN.search(line):
+        return u''
+    line = COMMENT_PATTERN.sub(ur'\1', line)
+    line = DOCTYPE_PATTERN.sub(u'', line)
+
+    result = strip_tags(line)
+    return result if result is not None else sub_tags(line)
+
+
+def sub_tags(line):
+    """Clean the tags by the patterns of tags one by one."""
+    for pattern, repl, nested in TAG_SUBS:
+        if nested:
+            # The following code works if have correct div/span pairs in sentence.
+            # Otherwise some div/span will be left there, maybe not the correct standalone one.
+            result = pattern.sub(repl, line, count=1)
+            while line != result:
+                line = result
+                result = pattern.sub(repl, line, count=1)
+        else:
+            line = pattern.sub(repl, line)
     return line
+
+
+def prefixes(name):
+    """Return the tags of patterns in sub_tags() which match the tag name, except br."""
+    if name not in PREFIXES:
+        PREFIXES[name] = [tag for tag in DELETE_TAGS + DELETE_SINGLE_TAGS + PAIRED_TAGS.keys() if name.startswith(tag)]
+    return PREFIXES[name]
+
+
+def strip_tags(line):       # pylint: disable=I0011,R0912,R0914
+    """Clean the tags in one pass over the tags of sentence, the result is the same as sub_tags().
+
+    The tags are paired as the patterns of sub_tags() do: an opening tag with the first closing tag
+    after it, the nested div and span with the closing tags in the order of opening tags. The pairs
+    of delete tags are removed with their content in the order of DELETE_TAGS, then the other pairs
+    and the single tags are replaced.
+
+    Return None if sub_tags() doesn't act on the markup as tags, e.g. a stray '<', a tag matched by
+    the pattern of a shorter tag name before its closing tag, a single tag without '/' which the pattern
+    extends to another tag.
+
+    """
+    if u'\n' in line:
+        return None
+
+    # (start, end, name, closing, single, raw name) of tags.
+    tags = []
+    # name -> start of the last closing tag.
+    closes = {}
+    found = 0
+    for match in TAG_PATTERN.finditer(line):
+        found = found + 1
+        (slash, raw, attrs) = match.groups()
+        if slash and attrs != u'' and attrs != u' ':
+            # not a closing tag for the patterns, it's text.
+            continue
+        name = raw.lower()
+        if slash:
+            closes[name] = match.start()
+        tags.append((match.start(), match.end(), name, bool(slash), attrs.endswith(u'/'), raw))
+
+    if line.count(u'<') != found:
+        return None
+    stray_gt = line.count(u'>') != found
+
+    # the tags of patterns: name -> indexes of tags.
+    names = {}
+    for index, (_, end, name, closing, single, raw) in enumerate(tags):
+        if closing:
+            if name in PAIRED_TAGS or name in DELETE_TAGS:
+                names.setdefault(name, []).append(index)
+            continue
+        for tag in prefixes(name):
+            if tag != name and (tag in DELETE_SINGLE_TAGS or closes.get(tag, -1) >= end):
+                return None
+        if raw.startswith('br') and raw != 'br':
+            return None
+        if not single and (name in DELETE_SINGLE_TAGS or raw == 'br') and (stray_gt or u'/>' in line[end:]):
+            return None
+        if name in PAIRED_TAGS or name in DELETE_TAGS:
+            names.setdefault(name, []).append(index)
+
+    dead = [False] * len(tags)
+    skip = {}
+    repl = {}
+    # <code>...<code >, the content is removed with the tags.
+    for tag in DELETE_TAGS:
+        if tag not in closes or tag not in names:
+            continue
+        opening = None
+        for index in names[tag]:
+            if dead[index]:
+                continue
+            if tags[index][3]:
+                if opening is not None:
+                    skip[opening] = index
+                    for inner in xrange(opening, index + 1):
+                        dead[inner] = True
+                    opening = None
+            elif opening is None:
+                opening = index
+
+    for index, (_, _, name, closing, single, raw) in enumerate(tags):
+        if not dead[index] and not closing and single:
+            if name in DELETE_SINGLE_TAGS:
+                repl[index] = u''
+            elif raw == 'br':
+                repl[index] = u' '
+
+    for tag, (text, nested) in PAIRED_TAGS.iteritems():
+        if tag not in closes or tag not in names:
+            continue
+        # the opening tags waiting for closing tags from head, only one if the pairs are not nested.
+        opening = []
+        head = 0
+        for index in names[tag]:
+            if dead[index]:
+                continue
+            if not tags[index][3]:
+                if nested or head == len(opening):
+                    opening.append(index)
+            elif head < len(opening):
+                repl[opening[head]] = text
+                repl[index] = text
+                head = head + 1
+
+    pieces = []
+    pos = 0
+    index = 0
+    while index < len(tags):
+        if index in skip:
+            pieces.append(line[pos:tags[index][0]])
+            index = skip[index]
+            pos = tags[index][1]
+        elif index in repl:
+            pieces.append(line[pos:tags[index][0]])
+            pieces.append(repl[index])
+            pos = tags[index][1]
+        index = index + 1
+    pieces.append(line[pos:])
+    return u''.join(pieces)
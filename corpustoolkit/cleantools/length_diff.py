@@ -34,9 +34,16 @@
 Predicate Module: Length Distance
 """
 
+from corpustoolkit import lengths
+
 def validate(step):
     return True
 
+def batch(clean_config, corpustools_config, step):
+    """Return the function dropping the pairs of a batch whose distance between source and target is beyond the limit."""
+    diff = step["diff"]
+    return lengths.LengthFilter([lambda source_counts, target_counts: lengths.diff_mask(source_counts, target_counts, diff)])
+
 def predicate(source, target, constraint):
     """Return True if the distance between source and target is beyond the limit."""
     len_s = len(source.split(' '))
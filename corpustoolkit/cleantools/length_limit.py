@@ -34,9 +34,22 @@
 Predicate Module: Length Limit
 """
 
+from corpustoolkit import lengths
+
 def validate(step):
     return True
 
+def batch(clean_config, corpustools_config, step):
+    """Return the function dropping the pairs of a batch whose length of source and/or target is beyond the limit."""
+    constraints = []
+    if "source" in step:
+        (low, high) = tuple(step["source"])
+        constraints.append(lambda source_counts, target_counts: lengths.limit_mask(source_counts, low, high))
+    if "target" in step:
+        (low_t, high_t) = tuple(step["target"])
+        constraints.append(lambda source_counts, target_counts: lengths.limit_mask(target_counts, low_t, high_t))
+    return lengths.LengthFilter(constraints)
+
 def predicate(source, target, constraint):
     """
     Return True if the length of source and/or target is beyond the limit.
@@ -34,45 +34,184 @@
 Regular expression clean module.
 """
 
-import codecs
-from itertools import izip
-import os
+from collections import deque
+from itertools import groupby, izip
 import re
+import sre_parse
+
+from corpustoolkit import asynclog
+from corpustoolkit import features
+from corpustoolkit import pipeline
+from corpustoolkit import rulestats
+
+# templates of log records.
+DETAIL = u"Line {ln}: Desc={desc}: {match}"
+LINENO = u"Line {ln}: Desc={desc}"
+
+# compiled patterns shared by the regex cleans in process, a plan of many corpora compiles them once.
+PATTERNS = {}
+
+# the patterns with back references or inline flags change their meaning in a combined pattern.
+UNCOMBINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[iLmsux]+\)')
+
+# python re supports at most 100 groups in a pattern.
+MAX_GROUPS = 99
+
+# the literal rules are served by an automaton if there are so many of them, a few are faster in re.
+MIN_LITERALS = 8
 
 def validate(step):
     return True
 
+def triggers(step):
+    """Return the features of the pairs which the step changes, 0 if a rule may match any pair.
+
+    A rule is triggered by the features of the literals which every match of its pattern contains,
+    the pairs are stripped by the step anyway.
+
+    """
+    mask = features.EDGE
+    for item in step["list"]:
+        flag = rule_flag(item)
+        feature = 0
+        for literal in required_literals(sre_parse.parse(item["pattern"], flag).data):
+            feature = feature | features.literal_features(literal, flag & re.IGNORECASE)
+        if feature == 0:
+            return 0
+        mask = mask | feature
+    return mask
+
+def deterministic(step):
+    """Return True if no rule of the step writes log, so its results can be kept in memo."""
+    return all("log" not in item for item in step["list"])
+
+def rule_flag(re_step):
+    """Return the flags of pattern of a re step."""
+    flag = 0
+    if 'unicode' not in re_step or re_step["unicode"] == True:
+        flag = flag | re.UNICODE
+    if 'case_sensitive' not in re_step or re_step["case_sensitive"] == False:
+        flag = flag | re.IGNORECASE
+    return flag
+
+def compile_pattern(pattern, flag):
+    """Return the compiled pattern, compile it only once in process."""
+    key = (pattern, flag)
+    if key not in PATTERNS:
+        PATTERNS[key] = re.compile(pattern, flag)
+    return PATTERNS[key]
+
+def plan_relist(relist, automaton=None):
+    """Group the compiled re steps into a plan, a list of (re_steps, gate).
+
+    A run of consecutive delete_line steps is put into one group with a gate, a run of other steps
+    is put into one group without gate (None). The literal steps served by automaton are not gated.
+
+    """
+    def combinable(re_step):
+        """Return True if re step is a delete_line step which can be combined into a gate."""
+        if re_step["action"] != "delete_line" or UNCOMBINABLE.search(re_step["pattern"].pattern):
+            return False
+        return automaton is None or literal_of(re_step["pattern"]) is None
+
+    plan = []
+    for gated, re_steps in groupby(relist, combinable):
+        re_steps = list(re_steps)
+        plan.append((re_steps, DeleteLineGate(re_steps) if gated and len(re_steps) > 1 else None))
+    return plan
+
+def plan_rules(rules, gate):
+    """Return an item of compiled plan, a tuple of (rules, gate, fixed, by_key).
+
+    fixed is the indexes of rules which are always applied, by_key maps the key of literal to the
+    indexes of literal rules, None if there is no literal rule in group.
+
+    """
+    fixed = [index for index, rule in enumerate(rules) if rule[3] is None]
+    by_key = {}
+    for index, rule in enumerate(rules):
+        if rule[3] is not None:
+            by_key.setdefault(rule[3], []).append(index)
+    return (rules, gate, fixed, by_key or None)
+
+def split_bounds(pattern, flags):
+    """Split the word boundaries at both ends of pattern, return (lead, body, trail).
+
+    The alternation of bare bodies lets re skip the branches by the first literal, one with \\b
+    in front is tried char by char. A pattern with alternation at top level is not split.
+
+    """
+    items = sre_parse.parse(pattern, flags).data
+    if len(items) < 2:
+        return (u'', pattern, u'')
+    lead = trail = u''
+    if items[0] == (sre_parse.AT, sre_parse.AT_BOUNDARY) and pattern.startswith(u'\\b'):
+        lead, pattern = u'\\b', pattern[2:]
+    escapes = len(pattern[:-1]) - len(pattern[:-1].rstrip(u'\\'))
+    if items[-1] == (sre_parse.AT, sre_parse.AT_BOUNDARY) and pattern.endswith(u'\\b') and escapes % 2 == 1:
+        trail, pattern = u'\\b', pattern[:-2]
+    return (lead, pattern, trail)
+
+def required_literals(items):
+    """Return the literal strings which every match of a parsed pattern contains."""
+    literals = []
+    chars = []
+    for op, value in items:
+        if op == sre_parse.LITERAL:
+            chars.append(unichr(value))
+            continue
+        if len(chars) > 0:
+            literals.append(u''.join(chars))
+            chars = []
+        if op == sre_parse.SUBPATTERN:
+            literals.extend(required_literals(value[1].data))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and value[0] > 0:
+            literals.extend(required_literals(value[2].data))
+    if len(chars) > 0:
+        literals.append(u''.join(chars))
+    return literals
+
+def literal_of(pattern):
+    """Return the unicode string matched by a pure literal re object, or None."""
+    items = sre_parse.parse(pattern.pattern, pattern.flags).data
+    if len(items) == 0 or any(op != sre_parse.LITERAL for op, _ in items):
+        return None
+    return u''.join(unichr(char) for _, char in items)
+
 def run(clean_config, corpustools_config, step):                # pylint: disable=I0011,W0613
     """entry function."""
     reclean = RegexClean(clean_config, step)
     reclean.run()
 
 
+def stage(clean_config, corpustools_config, step):              # pylint: disable=I0011,W0613
+    """Return the function cleaning a pair of sentences."""
+    reclean = RegexClean(clean_config, step)
+    reclean.compile_relist()
+    return reclean.clean_pair
+
+
 class RegexClean(object):
     """Class RegexClean run regular expression clean on source and target corpus."""
     def __init__(self, clean, step):
+        self.step = step
         self.ext = step["ext"]
-        if hasattr(step, "logger"):
+        self.match_log = None
+        if "logger" in step:
             self.logger = step["logger"]
+            self.match_log = asynclog.AsyncLog(self.logger, bulk=clean is None or not clean.stream)
         self.clean = clean
         self.relist = step["list"]
         self.restep = None
+        self.plan = None
+        self.automaton = None
+        self.rule_stats = [] if clean is not None and clean.rule_stats else None
         self.lineno = 0
 
     def run(self):
         """clean the corpus."""
         self.compile_relist()
-
-        filename = os.path.join(self.clean.working_dir, self.clean.corpus_filename())
-        filename_ext = os.path.join(self.clean.working_dir, self.clean.corpus_filename(self.ext))
-
-        infp = codecs.open(filename, 'r', 'UTF-8')
-        outfp = codecs.open(filename_ext, 'w', 'UTF-8')
-
-        for line in infp:
-            self.lineno = self.lineno + 1
-            cleanline = self.relist_clean(line)
-            outfp.write(cleanline + os.linesep)
+        pipeline.run_segment(self.clean, [pipeline.Stage(self.step, self.clean_pair)])
 
         # # Don't use built-in function zip(). Use the iterator version izip() to avoid the MemoryError.
         # for source_line, target_line in izip(source_fp, target_fp):
@@ -82,44 +221,182 @@ class RegexClean(object):
         #         source_ext_fp.write(source_line + os.linesep)
         #         target_ext_fp.write(target_line + os.linesep)
 
-        infp.close()
-        outfp.close()
+    def clean_pair(self, source, target):
+        """Clean a pair of sentences, return the cleaned pair."""
+        self.lineno = self.lineno + 1
+        return self.relist_clean_pair(source, target)
 
+    def close(self):
+        """Write the logs left in the asynchronous log."""
+        if self.match_log is not None:
+            self.match_log.close()
 
     def compile_relist(self):
         """Compile the regular expressions to re objects before using them to improve performance.
-        The compiled pattern is assigned back to clean step to replace the string form of pattern.
+        The compiled pattern replaces the string form of pattern in a copy of re steps, the clean step
+        itself is kept untouched, so that the same step can be compiled again, e.g. in another shard.
+        The literal patterns share one automaton if there are MIN_LITERALS of them at least.
+        If rule statistics are asked, every rule is counted and timed instead.
 
         """
+        relist = []
         for item in self.relist:
-            pattern = item["pattern"]
-            flag = 0
-            if 'unicode' not in item or item["unicode"] == True:
-                flag = flag | re.UNICODE
-            if 'case_sensitive' not in item or item["case_sensitive"] == False:
-                flag = flag | re.IGNORECASE
-            item["pattern"] = re.compile(pattern, flag)
+            relist.append(dict(item, pattern=compile_pattern(item["pattern"], rule_flag(item))))
+        self.relist = relist
+        if self.rule_stats is not None:
+            # every rule is applied and measured by itself, without gates and automaton.
+            self.rule_stats = []
+            rules = []
+            for re_step in relist:
+                on_source, on_target, clean, key = self.compile_rule(re_step)
+                stats = rulestats.RuleStats(re_step.get("description"), re_step["pattern"].pattern)
+                self.rule_stats.append(stats)
+                rules.append((on_source, on_target, stats.counted(clean), key))
+            self.plan = [plan_rules(rules, None)]
+            return
+
+        literals = [literal for literal in (literal_of(re_step["pattern"]) for re_step in relist) if literal is not None]
+        if len(literals) >= MIN_LITERALS:
+            self.automaton = LiteralAutomaton(literals)
+        self.plan = [plan_rules([self.compile_rule(re_step) for re_step in re_steps], gate)
+                     for re_steps, gate in plan_relist(relist, self.automaton)]
 
     def relist_clean(self, line):
         """Clean the line with a list of re steps."""
         [source, target] = line.split(u'\t')
+        return u'\t'.join(self.relist_clean_pair(source, target))
 
-        for re_step in self.relist:
-            self.restep = re_step
-            source = source.strip()
-            target = target.strip()
-            if len(source) == 0 or len(target) == 0:
-                return u'\t'.join([source, target])
-
-            if 'apply_to' in re_step:
-                if re_step["apply_to"] == u"source":
-                    source = self.re_clean(source)
-                elif re_step["apply_to"] == u"target":
-                    target = self.re_clean(target)
+    def relist_clean_pair(self, source, target):
+        """Clean the pair of sentences with a list of re steps.
+
+        A group of delete_line steps is skipped if its gate tells none of them matches.
+        Otherwise the compiled rules in group are applied one by one as usual, except the literal
+        rules whose literals are not found by the automaton. The literals are searched again when
+        a rule changes the sentence. A changed sentence is stripped at once, so an unchanged one
+        needn't be stripped and checked again before every rule.
+
+        """
+        automaton = self.automaton
+        source_hits = target_hits = None
+        source = source.strip()
+        target = target.strip()
+        if len(source) == 0 or len(target) == 0:
+            return (source, target)
+
+        for rules, gate, fixed, by_key in self.plan:
+            if gate is not None and not gate.match(source, target):
+                continue
+
+            start = 0
+            while start is not None:
+                if by_key is None:
+                    indexes = fixed[start:] if start > 0 else fixed
+                else:
+                    if source_hits is None:
+                        source_hits = automaton.search(source)
+                    if target_hits is None:
+                        target_hits = automaton.search(target)
+                    indexes = [index for index in fixed if index >= start]
+                    for key in source_hits | target_hits:
+                        indexes.extend(index for index in by_key.get(key, ()) if index >= start)
+                    indexes.sort()
+
+                start = None
+                for index in indexes:
+                    on_source, on_target, clean, key = rules[index]
+                    changed = False
+                    if on_source and (key is None or key in source_hits):
+                        cleaned = clean(source)
+                        if cleaned is not source:
+                            source, source_hits, changed = cleaned.strip(), None, True
+                    if on_target and (key is None or key in target_hits):
+                        cleaned = clean(target)
+                        if cleaned is not target:
+                            target, target_hits, changed = cleaned.strip(), None, True
+                    if changed:
+                        if len(source) == 0 or len(target) == 0:
+                            return (source, target)
+                        if by_key is not None:
+                            start = index + 1
+                            break
+        return (source, target)
+
+    def compile_rule(self, re_step):
+        """Compile a re step to a rule, a tuple of (on_source, on_target, clean, key).
+
+        The action, repl, apply_to and log of step are resolved once here, clean is a function of
+        sentence which scans the sentence at most once. key is the key of literal in automaton if
+        the pattern is a literal served by automaton, otherwise None.
+
+        """
+        apply_to = re_step.get("apply_to")
+        if re_step["action"] == "replace":
+            repl = re_step["repl"]
+        else:
+            repl = u''
+        clean = self.rule_function(re_step["pattern"], re_step["action"] == "delete_line", repl,
+                                   re_step.get("log"), re_step.get("description"))
+        key = None
+        if self.automaton is not None:
+            literal = literal_of(re_step["pattern"])
+            if literal is not None:
+                key = self.automaton.keys[literal.lower()]
+        return (apply_to in (None, u"source"), apply_to in (None, u"target"), clean, key)
+
+    def rule_function(self, pattern, delete_line, repl, log, description):
+        """Return the function cleaning a sentence with pattern.
+
+        :param pattern:      re object.
+        :param delete_line:  True to return empty string if pattern matched, otherwise substitute.
+        :param repl:         unicode string, the replacement.
+        :param log:          "detail", "lineno" or None.
+        :param description:  description of the re step in log.
+
+        The matches are logged as records into the asynchronous log of step, formatted by its writer.
+
+        """
+        search = pattern.search
+        sub = pattern.sub
+        subn = pattern.subn
+        log_record = self.match_log.append if self.match_log is not None else None
+
+        if delete_line:
+            if log == u"detail":
+                def clean(sentence):
+                    match = search(sentence)
+                    if match is None:
+                        return sentence
+                    log_record((DETAIL, self.lineno, description, match.group(0)))
+                    return u''
+            elif log == u"lineno":
+                def clean(sentence):
+                    if search(sentence) is None:
+                        return sentence
+                    log_record((LINENO, self.lineno, description, None))
+                    return u''
             else:
-                source = self.re_clean(source)
-                target = self.re_clean(target)
-        return u'\t'.join([source.strip(), target.strip()])
+                def clean(sentence):
+                    if search(sentence) is None:
+                        return sentence
+                    return u''
+            return clean
+
+        if log == u"detail":
+            # log every match in the callback of sub, instead of scanning the sentence again.
+            template = sre_parse.parse_template(repl, pattern)
+            def expand(match):
+                log_record((DETAIL, self.lineno, description, match.group(0)))
+                return sre_parse.expand_template(template, match)
+            return lambda sentence: sub(expand, sentence)
+        elif log == u"lineno":
+            def clean(sentence):
+                sentence, count = subn(repl, sentence)
+                if count > 0:
+                    log_record((LINENO, self.lineno, description, None))
+                return sentence
+            return clean
+        else:
+            return lambda sentence: sub(repl, sentence)
 
     def re_clean(self, sentence):
         """Clean the sentence with clean step, return cleaned corpus sentence.
@@ -142,16 +419,7 @@ class RegexClean(object):
             }
 
         """
-        pattern = self.restep["pattern"]
-        if self.restep["action"] == "delete_line":
-            return self.re_del(sentence, pattern)
-        else:
-            if self.restep["action"] == "replace":
-                repl = self.restep["repl"]
-            elif self.restep["action"] == "delete":
-                repl = u''
-            return self.re_repl(sentence, pattern, repl)
-
+        return self.compile_rule(self.restep)[2](sentence)
 
     def re_del(self, sentence, pattern):
         """Return empty string if pattern matched.
@@ -159,18 +427,8 @@ class RegexClean(object):
         :param sentence:  unicode string, corpus sentence.
         :param pattern:   re object.
         """
-        if pattern.search(sentence):
-            if "log" in self.restep:
-                if self.restep["log"] == u"detail":
-                    self.logger.info(
-                        "Line {ln}: Desc={desc}: {match}".format(ln=self.lineno, desc=self.restep["description"],
-                                                                 match=pattern.search(sentence).group(0).encode('utf-8'))
-                        )
-                elif self.restep["log"] == u"lineno":
-                    self.logger.info("Line {ln}: Desc={desc}".format(ln=self.lineno, desc=self.restep["description"]))
-            return u''
-        else:
-            return sentence
+        return self.rule_function(pattern, True, None, self.restep.get("log"),
+                                  self.restep.get("description"))(sentence)
 
     def re_repl(self, sentence, pattern, repl):
         """Return substituted sentence.
@@ -180,14 +438,120 @@ class RegexClean(object):
         :param repl:      unicode string.
 
         """
-        if "log" in self.restep and pattern.search(sentence):
-            if  self.restep["log"] == u"detail":
-                for match in pattern.finditer(sentence):
-                    self.logger.info(
-                        "Line {ln}: Desc={desc}: {match}".format(ln=self.lineno, desc=self.restep["description"],
-                                                                 match=match.group(0).encode('utf-8'))
-                    )
-            elif self.restep["log"] == u"lineno":
-                self.logger.info("Line {ln}: Desc={desc}".format(ln=self.lineno, desc=self.restep["description"]))
-
-        return pattern.sub(repl, sentence)
+        return self.rule_function(pattern, False, repl, self.restep.get("log"),
+                                  self.restep.get("description"))(sentence)
+
+
+class DeleteLineGate(object):
+    """Combined patterns of delete_line steps, tell whether any of the steps may match a pair.
+
+    The patterns of the same flags are joined into an alternation, one for source side and one for
+    target side according to apply_to of steps. A pattern with too many groups is split into parts.
+
+    """
+    def __init__(self, re_steps):
+        self.source = self.combine([re_step["pattern"] for re_step in re_steps
+                                    if re_step.get("apply_to", u"source") == u"source"])
+        self.target = self.combine([re_step["pattern"] for re_step in re_steps
+                                    if re_step.get("apply_to", u"target") == u"target"])
+
+    @staticmethod
+    def combine(patterns):
+        """Return the list of combined patterns."""
+        groups = {}
+        for pattern in patterns:
+            lead, body, trail = split_bounds(pattern.pattern, pattern.flags)
+            groups.setdefault((pattern.flags, lead, trail), []).append((body, pattern.groups))
+
+        combined = []
+        for flags, lead, trail in sorted(groups):
+            parts = [[]]
+            ngroups = 0
+            for body, nbody in groups[(flags, lead, trail)]:
+                if ngroups + nbody > MAX_GROUPS and len(parts[-1]) > 0:
+                    parts.append([])
+                    ngroups = 0
+                parts[-1].append(body)
+                ngroups = ngroups + nbody
+            for part in parts:
+                try:
+                    combined.append(compile_pattern(lead + u'(?:' + u'|'.join(part) + u')' + trail, flags))
+                except re.error:
+                    # e.g. the same group name in two patterns, search the patterns one by one.
+                    combined.extend(compile_pattern(lead + body + trail, flags) for body in part)
+        return combined
+
+    def match(self, source, target):
+        """Return True if any of the steps may match the pair."""
+        for pattern in self.source:
+            if pattern.search(source):
+                return True
+        for pattern in self.target:
+            if pattern.search(target):
+                return True
+        return False
+
+
+class LiteralAutomaton(object):
+    """Aho-Corasick automaton of literals, find all of the literals in a text by one scan.
+
+    The literals and the text are compared in lower case, as re does with IGNORECASE and UNICODE flags,
+    so that the automaton tells the literals which may match in either case. A text without any literal
+    is rejected by a combined pattern before the scan.
+
+    """
+    def __init__(self, literals):
+        self.keys = {}
+        for literal in literals:
+            self.keys.setdefault(literal.lower(), len(self.keys))
+        self.anchor = re.compile(u'|'.join(re.escape(literal) for literal in sorted(self.keys, key=len, reverse=True)),
+                                 re.UNICODE)
+
+        # goto[state] maps char to the next state, out[state] is the keys of literals ending at state.
+        goto = [{}]
+        out = [()]
+        for literal, key in self.keys.iteritems():
+            state = 0
+            for char in literal:
+                if char not in goto[state]:
+                    goto.append({})
+                    out.append(())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            out[state] = out[state] + (key,)
+
+        # breadth first, the fail state of every state is known before its children.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].itervalues())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].iteritems():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                out[child] = out[child] + out[fail[child]]
+
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+
+    def search(self, text):
+        """Return the set of keys of literals found in text."""
+        hits = set()
+        text = text.lower()
+        if self.anchor.search(text) is None:
+            return hits
+
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
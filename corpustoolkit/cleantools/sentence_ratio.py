@@ -33,9 +33,17 @@
 """
 Predicate Module: Sentences Ratio
 """
+
+from corpustoolkit import lengths
+
 def validate(step):
     return True
 
+def batch(clean_config, corpustools_config, step):
+    """Return the function dropping the pairs of a batch whose sentences ratio is beyond the threshold."""
+    ratio = step["ratio"]
+    return lengths.LengthFilter([lambda source_counts, target_counts: lengths.ratio_mask(source_counts, target_counts, ratio)])
+
 def predicate(source, target, constraint):
     """Return True if the sentences ratio is beyond the threshold.
 
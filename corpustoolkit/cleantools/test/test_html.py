@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+import random
+import re
+
+import HTMLParser
+from xml.sax import saxutils
+
+from corpustoolkit.cleantools import html
+from corpustoolkit.cleantools.html import COMPLEX_TAGS, COMPLEX_SINGLE_TAGS, DELETE_TAGS, DELETE_SINGLE_TAGS, INLINE_TAGS, STRUCT_TAGS
+
+
+def original_clean_htmltag(line):
+    """The tag clean by patterns one by one before the one pass clean, the reference of results."""
+    if re.search(ur'<(%s).*?>.*</\1>' % '|'.join(COMPLEX_TAGS), line, re.IGNORECASE):
+        return u''
+    if re.search(ur'<(%s).*?/>' % '|'.join(COMPLEX_SINGLE_TAGS), line, re.IGNORECASE):
+        return u''
+    pattern_comment = ur'<!--(.*?)-->'
+    pattern_doctype = ur'(?i)<!DOCTYPE.+?>'
+    line = re.sub(pattern_comment, ur'\1', line)
+    line = re.sub(pattern_doctype, u'', line)
+
+    for tag in DELETE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>.*?</{tag} ?>'.format(tag=tag), u'', line)
+    for tag in DELETE_SINGLE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?/>'.format(tag=tag), u'', line)
+
+    for tag in INLINE_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur'\1', line)
+
+    for tag in STRUCT_TAGS:
+        line = re.sub(ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag), ur' \1 ', line)
+
+    for tag in ['div', 'span']:
+        pattern = ur'<(?i){tag}.*?>(.*?)</{tag} ?>'.format(tag=tag)
+        result = re.sub(pattern, ur' \1 ', line, count=1)
+        while line != result:
+            line = result
+            result = re.sub(pattern, ur' \1 ', line, count=1)
+
+    line = re.sub(ur'<br.*?/>', ur' ', line)
+
+    return line
+
+
+# tag names of the random markup: tags of every table, upper case, prefixes of other tags, unknown tags.
+NAMES = ['a', 'b', 'i', 'p', 's', 'u', 'q', 'em', 'div', 'span', 'code', 'del', 'pre', 'br', 'BR', 'Br',
+         'hr', 'meta', 'link', 'base', 'basefont', 'abbr', 'body', 'big', 'strong', 'sub', 'td', 'li',
+         'dd', 'dt', 'h1', 'head', 'html', 'font', 'table', 'tr', 'img', 'ul', 'embed', 'x', 'brx',
+         'Span', 'DIV', 'script', 'title', 'tt']
+
+TEXTS = [u"x", u"word", u" ", u"  ", u"text here", u"1", u"caf\xe9"]
+
+STRAYS = [u"<", u">", u"/>", u"a < b", u"<!--", u"-->", u"<!DOCTYPE html>", u"</a x>", u"</b/>", u"<3"]
+
+
+def random_markup(rng, names, size):
+    """Return a random sentence of tags and text."""
+    pieces = []
+    for _ in xrange(size):
+        name = rng.choice(names)
+        r = rng.random()
+        if r < 0.25:
+            pieces.append(u"<%s>" % name)
+        elif r < 0.45:
+            pieces.append(u"</%s>" % name)
+        elif r < 0.5:
+            pieces.append(u"</%s >" % name)
+        elif r < 0.58:
+            pieces.append(u"<%s/>" % name)
+        elif r < 0.63:
+            pieces.append(u"<%s class=\"c\">" % name)
+        elif r < 0.66:
+            pieces.append(u"<%s />" % name)
+        elif r < 0.68:
+            pieces.append(rng.choice(STRAYS))
+        else:
+            pieces.append(rng.choice(TEXTS))
+    return u"".join(pieces)
+
+
+class TestHtmlTag():
+    def setup(self):
+        self.lines = [u"plain text without markup",
+                      u"<b>bold</b> and <i>italic</i>",
+                      u"<a href=\"http://example.com/\">link</a> text",
+                      u"<B>Upper</B > case",
+                      u"line<br/>break<br />again<BR/>",
+                      u"<b>Note:</b> line<br/>break",
+                      u"line<br/>break <b>bold</b>",
+                      u"<p>para</p><li>item</li>",
+                      u"<div><div>a</div>b</div><span>c<span>d</span></span>",
+                      u"<div a>x<div b>y</div>",
+                      u"<b>a<b>c</b>d</b>",
+                      u"<code>x = 1</code> and <del>old</del> new",
+                      u"<code><code>x</code>y</code>",
+                      u"<s>a<code>b</s>c</code>",
+                      u"<meta charset=\"utf-8\"/> text <hr/>",
+                      u"<meta charset=\"utf-8\"> text <hr/>",
+                      u"<abbr>x</abbr> <a href=y>z</a>",
+                      u"<!-- comment <b>b</b> --> text",
+                      u"<!DOCTYPE html><html><body>page</body></html>",
+                      u"<table><tr><td>cell</td></tr></table>",
+                      u"<img src=\"a.png\"/> picture",
+                      u"a < b and c > d",
+                      u"<unknown>text</unknown>",
+                      u"</b>close first<b>",
+                      u"<span>caf\xe9</span>",
+                      u"<strong>a</strong></s>"
+                      ]
+
+    def test_same_as_original(self):
+        for line in self.lines:
+            assert html.clean_htmltag(line) == original_clean_htmltag(line), line
+
+    def test_random_markup_same_as_original(self):
+        rng = random.Random(0)
+        for _ in xrange(3000):
+            line = random_markup(rng, NAMES, rng.randint(1, 14))
+            assert html.clean_htmltag(line) == original_clean_htmltag(line), line
+
+    def test_random_nested_same_as_original(self):
+        rng = random.Random(1)
+        names = ['b', 'i', 'div', 'span', 'div', 'span', 'code', 'del', 'p', 'li', 'br', 'a', 'DIV', 'Span']
+        for _ in xrange(1000):
+            line = random_markup(rng, names, rng.randint(10, 60))
+            assert html.clean_htmltag(line) == original_clean_htmltag(line), line
+
+    def test_one_pass(self):
+        assert html.strip_tags(u"<b>bold</b> and <i>italic</i>") == u"bold and italic"
+        assert html.strip_tags(u"<div><div>a</div>b</div>") == u"  a b "
+        assert html.strip_tags(u"<code>x</code>y<hr/>z<br/>") == u"yz "
+
+    def test_by_patterns(self):
+        # the pattern of b matches <br/>, and a stray '<' may join a tag when text is removed.
+        assert html.strip_tags(u"line<br/>break <b>bold</b>") is None
+        assert html.strip_tags(u"a < b") is None
+        assert html.clean_htmltag(u"line<br/>break <b>bold</b>") == u"linebreak <b>bold"
+
+    def test_deep_nested(self):
+        line = u"".join(u"<div class=\"c\">{0} ".format(i) for i in range(200)) + u"x" + u"</div>" * 200
+        assert html.clean_htmltag(line) == original_clean_htmltag(line)
+
+    def test_stage(self):
+        clean_pair = html.stage(None, None, {})
+        assert clean_pair(u"&lt;b&gt;bold&lt;/b&gt; &amp;nbsp;x", u"<p>para</p>") == (u"bold \xa0x", u"para")
+
+    def test_clean_html(self):
+        assert html.clean_html(u"<span>a&#10;b</span>") == u"a b"
+
+
+def original_unescape(line):
+    """The unescape by saxutils and HTMLParser before the one pass unescape, the reference of results."""
+    return HTMLParser.HTMLParser().unescape(saxutils.unescape(line))
+
+
+class TestUnescape():
+    def setup(self):
+        self.rng = random.Random(1)
+
+    def test_unescape(self):
+        assert html.unescape(u"no entity") == u"no entity"
+        assert html.unescape(u"&lt;b&gt; &amp;nbsp;&#65;&#x42;&apos;") == u"<b> \xa0AB'"
+        assert html.unescape(u"&amp;amp;lt; &amp;lt; &unknown; &#xzz; &#x110000;") == u"&lt; < &unknown; &#xzz; &#x110000;"
+
+    def test_overflow(self):
+        assert html.unescape(u"&#99999999999999999999;") == u"&#99999999999999999999;"
+
+    def test_random(self):
+        pieces = [u"&", u"amp;", u"lt;", u"gt;", u"nbsp;", u"#", u"x", u"X", u"41", u"1f600", u"zz", u"apos",
+                  u";", u"a", u" ", u"<", u"\n", u"abcdefghij"]
+        for _ in range(3000):
+            line = u"".join(self.rng.choice(pieces) for _ in range(self.rng.randint(1, 12)))
+            assert html.unescape(line) == original_unescape(line), repr(line)
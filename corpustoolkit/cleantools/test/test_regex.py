@@ -30,7 +30,9 @@
 
 # pylint: disable=I0011,C0111
 import re
-from corpustoolkit.cleantools.regex import RegexClean
+from corpustoolkit import features
+from corpustoolkit.cleantools import regex
+from corpustoolkit.cleantools.regex import RegexClean, LiteralAutomaton, literal_of, plan_relist, plan_rules, split_bounds
 
 class TestRegexClean():
     def __init__(self):
@@ -208,3 +210,113 @@ class TestRegexClean():
         pattern = re.compile(pattern)
         source = self.regexclean.re_repl(source, pattern, repl)
         assert source == target
+
+
+class ListLogger(object):
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.extend(message.split('\n'))
+
+
+class TestDeleteLineGate():
+    def setup(self):
+        self.relist = [
+            {"description": "a", "action": "delete_line", "pattern": u"\\bfoo\\b", "log": "lineno"},
+            {"description": "b", "action": "delete_line", "pattern": u"\\bBAR\\b", "case_sensitive": True,
+             "apply_to": u"target", "log": "lineno"},
+            {"description": "c", "action": "delete_line", "pattern": u"(\\w+) \\1", "log": "lineno"},
+            {"description": "d", "action": "replace", "pattern": u"(\\d+)", "repl": u"<\\1>"},
+            {"description": "e", "action": "delete_line", "pattern": u"baz|qux\\b", "log": "lineno"},
+            {"description": "f", "action": "delete_line", "pattern": u"\\b<1>", "apply_to": u"source",
+             "log": "lineno"},
+            {"description": "g", "action": "delete_line", "pattern": u"x\\\\b", "log": "lineno"}]
+        self.pairs = [(u"a foo b", u"c"), (u"Foo", u"bar"), (u"a", u"BAR"), (u"no no", u"x"),
+                      (u"1 qux", u"y"), (u"bazooka", u"z"), (u"1", u"2"), (u"food", u"barn"),
+                      (u"x\\b", u"t"), (u" 2 ", u" 3 ")]
+
+    def clean(self, gated):
+        logger = ListLogger()
+        regexclean = RegexClean(None, {"ext": "re", "list": self.relist, "logger": logger})
+        regexclean.compile_relist()
+        if not gated:
+            regexclean.automaton = None
+            regexclean.plan = [plan_rules([regexclean.compile_rule(re_step)], None) for re_step in regexclean.relist]
+        pairs = []
+        for lineno, (source, target) in enumerate(self.pairs, 1):
+            regexclean.lineno = lineno
+            pairs.append(regexclean.relist_clean_pair(source, target))
+        regexclean.close()
+        return pairs, logger.messages
+
+    def test_plan(self):
+        regexclean = RegexClean(None, {"ext": "re", "list": self.relist})
+        regexclean.compile_relist()
+        plan = plan_relist(regexclean.relist)
+        assert [len(re_steps) for re_steps, gate in plan] == [2, 2, 3]
+        assert [gate is None for re_steps, gate in plan] == [False, True, False]
+
+    def test_gated_same_as_sequential(self):
+        assert self.clean(True) == self.clean(False)
+
+    def test_split_bounds(self):
+        assert split_bounds(u"\\bfoo\\b", re.UNICODE) == (u"\\b", u"foo", u"\\b")
+        assert split_bounds(u"\\bfoo|bar\\b", 0) == (u"", u"\\bfoo|bar\\b", u"")
+        assert split_bounds(u"foo\\\\b", 0) == (u"", u"foo\\\\b", u"")
+
+
+class TestLiteralAutomaton():
+    def test_search(self):
+        automaton = LiteralAutomaton([u"he", u"She", u"his", u"hers", u"é"])
+        keys = automaton.keys
+        assert automaton.search(u"USHERS") == set([keys[u"he"], keys[u"she"], keys[u"hers"]])
+        assert automaton.search(u"this É") == set([keys[u"his"], keys[u"é"]])
+        assert automaton.search(u"nothing") == set()
+
+    def test_literal_of(self):
+        assert literal_of(re.compile(u"CDATA", re.IGNORECASE)) == u"CDATA"
+        assert literal_of(re.compile(u"a\\.b")) == u"a.b"
+        assert literal_of(re.compile(u"a.b")) is None
+        assert literal_of(re.compile(u"\\bab")) is None
+        assert literal_of(re.compile(u"")) is None
+
+    def test_literal_rules_same_as_re(self):
+        relist = [{"description": "lit%d" % index, "action": "delete", "pattern": u"word%d" % index, "log": "lineno"}
+                  for index in range(10)]
+        relist[3] = dict(relist[3], case_sensitive=True)
+        relist[5] = dict(relist[5], action="replace", pattern=u"foo", repl=u"word7")
+        relist[8] = dict(relist[8], action="delete_line", apply_to=u"target")
+        relist.append({"description": "re", "action": "replace", "pattern": u"(\\d)x", "repl": u"word9"})
+        pairs = [(u"a WORD1 b", u"word3 WORD3"), (u"foo", u"foo word8"), (u"c 1x", u"d word2word0"),
+                 (u"word4", u"x")]
+
+        cleaned = []
+        for min_literals in (8, 100):
+            logger = ListLogger()
+            regexclean = RegexClean(None, {"ext": "re", "list": relist, "logger": logger})
+            regex.MIN_LITERALS, saved = min_literals, regex.MIN_LITERALS
+            try:
+                regexclean.compile_relist()
+            finally:
+                regex.MIN_LITERALS = saved
+            assert (regexclean.automaton is not None) == (min_literals == 8)
+            pairs_cleaned = [regexclean.clean_pair(source, target) for source, target in pairs]
+            regexclean.close()
+            cleaned.append((pairs_cleaned, logger.messages))
+        assert cleaned[0] == cleaned[1]
+        assert cleaned[0][0] == [(u"a  b", u"WORD3"), (u"", u"word8"), (u"c word9", u"d"), (u"", u"x")]
+
+
+class TestTriggers():
+    def test_required_literals(self):
+        parse = lambda pattern: regex.sre_parse.parse(pattern).data
+        assert regex.required_literals(parse(u"<br>")) == [u"<br>"]
+        assert regex.required_literals(parse(u"a(&amp;)+b?c")) == [u"a", u"&amp;", u"c"]
+        assert regex.required_literals(parse(u"(?:x)*|y")) == []
+
+    def test_triggers(self):
+        step = {"ext": "re", "list": [{"pattern": u"&nbsp;"}, {"pattern": u"(<br>)+", "case_sensitive": True}]}
+        assert regex.triggers(step) == features.AMP | features.LT | features.EDGE
+        step["list"].append({"pattern": u"\\s+"})
+        assert regex.triggers(step) == 0
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+import logging
+import random
+
+from corpustoolkit.cleantools import url
+
+
+class TestURLDetector():
+    def setup(self):
+        self.urlclean = url.URLClean(None, {"ext": "url", "repl": u"<\\g<0>>", "logger": logging.getLogger("test_url")})
+        self.urlclean.prepare_pattern()
+        self.detector = self.urlclean.detector
+
+    def same_matches(self, line):
+        return [match.span() for match in self.detector.matches(line)] == [match.span() for match in self.detector.pattern.finditer(line)]
+
+    def test_anchors(self):
+        assert self.detector.anchors(u"see http://example.com. and 10.0.0.1 or v1.2") == [8, 18, 30]
+        assert self.detector.anchors(u"e.g. readme.txt") == []
+
+    def test_matches(self):
+        for line in [u"see http://www.example.com/a?b=1, then ftp://host:21/x.",
+                     u"www.example.co.uk and example.info!", u"ip 192.168.0.1 and 1234.5.6.7 end",
+                     u"xhttp://a.com", u"a.1.2.3.4", u"mail.example.de:8080/index.html (ok)",
+                     u"no url here.", u"version 1.2.3, e.g. this"]:
+            assert self.same_matches(line), line
+
+    def test_random(self):
+        rng = random.Random(1)
+        pieces = [u"http", u"://", u"www", u".", u"com", u"in", u"info", u"int", u"example", u"-", u"1", u"192",
+                  u":", u"/", u"8080", u"?", u"&", u"\\w", u" ", u",", u"!", u"(", u"\"", u"\xe9", u"x"]
+        for _ in range(3000):
+            line = u"".join(rng.choice(pieces) for _ in range(rng.randint(1, 20)))
+            assert self.same_matches(line), repr(line)
+
+    def test_root_not_token(self):
+        urlclean = url.URLClean(None, {"ext": "url", "repl": u"", "country": [u"co.jp"], "logger": logging.getLogger("test_url")})
+        urlclean.prepare_pattern()
+        assert urlclean.detector.roots is None
+        assert urlclean.clean_line(u"see www.example.co.jp now") == u"see  now"
+
+    def test_urlclean_line(self):
+        assert self.urlclean.urlclean_line(u"at http://example.com/x, ok", 1) == u"at <http://example.com/x>, ok"
+        assert self.urlclean.urlclean_line(u"plain text", 1) == u"plain text"
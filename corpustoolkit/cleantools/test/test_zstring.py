@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+import random
+import re
+import StringIO
+import sys
+from xml.sax import saxutils
+
+from corpustoolkit.cleantools import zstring
+
+
+def original_zstring_unescape(line, zdict):
+    """The unescape by saxutils and patterns before the one pass unescape, the reference of results."""
+    line = u" ".join(saxutils.unescape(line, zdict).splitlines())
+    pattern = ur'#\{U\+([0-9a-fA-F]{4})\}'
+    line = re.sub(pattern,
+                  lambda m: unichr(int(m.group(1), 16)),
+                  line)
+    return u" ".join(line.splitlines())
+
+
+class TestUnescaper():
+    def setup(self):
+        self.unescaper = zstring.Unescaper(zstring.ESCAPESEQ_TABLE)
+
+    def test_unescape(self):
+        assert self.unescaper.unescape(u"#{quot}a#{quot}^Q #{eacute}#{U+00e9} &lt;&amp;") == u"\"a\"\" \xe9\xe9 <&"
+        assert self.unescaper.unescape(u"a#{endl}b #{unknown} &foo;") == u"a b #{unknown} &foo;"
+
+    def test_escaped_amp(self):
+        assert self.unescaper.unescape(u"#{amp}amp; #{amp}lt; &amp;lt; #{U+0026}amp;") == u"& &lt; &lt; &amp;"
+
+    def test_number_break(self):
+        line = u"a#{cr}#{U+000A}b#{U+000D}#{lf}c"
+        assert self.unescaper.unescape(line) == original_zstring_unescape(line, zstring.ESCAPESEQ_TABLE)
+
+    def test_random(self):
+        rng = random.Random(1)
+        pieces = [u"&", u"amp;", u"lt;", u"#{", u"}", u"#{amp}", u"#{U+", u"000A", u"000D", u"00e9", u"0026",
+                  u"quot", u"^", u"Q", u"a", u" ", u"\n", u"\r", u"\u2028"] + zstring.ESCAPESEQ_TABLE.keys()
+        for _ in range(3000):
+            line = u"".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+            assert self.unescaper.unescape(line) == original_zstring_unescape(line, zstring.ESCAPESEQ_TABLE), repr(line)
+
+    def test_zstring15(self):
+        unescaper = zstring.Unescaper(zstring.TABLES[u"zstring1.5"])
+        assert unescaper.unescape(u"^[a^] ^^Q \\\\n\\n^C #{quot}") == u"\u201ca\u201d ^Q \\n \xa9 \""
+
+
+class TestZStringStep():
+    def test_stage(self):
+        clean_pair = zstring.stage(None, None, {"ext": "zstr"})
+        assert clean_pair(u" #{quot}a#{quot}#{endl}", u"^Qb^Q ") == (u"\"a\"", u"\"b\"")
+        clean_pair = zstring.stage(None, None, {"ext": "zstr", "escapes": u"zstring1.5"})
+        assert clean_pair(u"^Ca", u"\\\"b\\\"") == (u"\xa9a", u"\"b\"")
+
+    def test_validate(self):
+        assert zstring.validate({"ext": "zstr", "escapes": u"zstring1.5"})
+        stderr = sys.stderr
+        sys.stderr = StringIO.StringIO()
+        try:
+            assert not zstring.validate({"ext": "zstr", "escapes": u"zstring2"})
+            message = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        assert message == "The escapes of step zstr must be one of zstring, zstring1.5.\n"
+
+    def test_triggers(self):
+        assert zstring.triggers({}) != 0
+        assert zstring.triggers({"escapes": u"zstring1.5"}) == 0
@@ -35,19 +35,61 @@
 URL Clean Module
 
 Clean the URL-like text as I can.
+
+The url pattern is tried only near the anchors of urls (see URLDetector), the text without any
+anchor is passed by one scan of a simple pattern.
 """
 
-import codecs
 import re
-import os
+import sre_parse
+import string
+
+from corpustoolkit import asynclog
+from corpustoolkit import features
+from corpustoolkit import pipeline
+from corpustoolkit import rulestats
+
+# templates of log records.
+DETAIL = u"Line {ln}: {match}"
+LINENO = u"Line {ln}"
+
+# url detectors by the extra country domains, shared by the url cleans in process.
+DETECTORS = {}
+
+# the chars in domain of url: protocol, subdomains, root domain or ip address.
+DOMAIN_CHARS = string.ascii_letters + string.digits + u'-_.:/'
+
+# a '.' and the token after it, which may be a root domain or an octet of ip address.
+DOT_TOKEN = re.compile(ur'\.([-\w]+)')
+# the octets of ip address after the first one.
+IP_OCTETS = re.compile(ur'\.\d{1,3}\.\d{1,3}\.\d')
+
+# a root domain which is a token of domain chars.
+ROOT_TOKEN = re.compile(ur'[-\w]+$')
 
 def validate(step):
     return True
 
-def run(clean_config, corpustools_config, step):    # pylint: disable=I0011,W0613
+def triggers(step):
+    """Return the features of the pairs which the step changes: a url has '://' or a '.' before its domain."""
+    if any(re.match(ur'[0-9A-Za-z]', root) is None for root in step.get("country") or []):
+        return 0
+    return features.SCHEME | features.DOMAIN | features.EDGE
+
+def deterministic(step):
+    """Return True if the step writes no log of urls, so its results can be kept in memo."""
+    return "log" not in step
+
+def run(clean_config, corpustools_config, step):
     """entry function."""
+    pipeline.run_step(clean_config, corpustools_config, step)
+
+
+def stage(clean_config, corpustools_config, step):  # pylint: disable=I0011,W0613
+    """Return the function cleaning a pair of sentences."""
     urlclean = URLClean(clean_config, step)
-    urlclean.run()
+    urlclean.prepare_pattern()
+    return urlclean.clean_pair
 
 
 class URLClean(object):
@@ -68,45 +110,58 @@ class URLClean(object):
 
     def __init__(self, clean, step):
         """init function."""
+        self.step = step
         self.ext = step["ext"]
         self.country = step["country"] if "country" in step else None
         self.clean = clean
         self.logger = step["logger"]
+        self.match_log = asynclog.AsyncLog(self.logger, bulk=clean is None or not clean.stream)
         self.log = step["log"] if "log" in step else None
         self.repl = step["repl"]
 
-        self.pattern = None
-
+        self.detector = None
+        self.template = None
+        self.literal = None
+        self.lineno = 0
+        self.rule_stats = None
+        if clean is not None and clean.rule_stats:
+            stats = rulestats.RuleStats(step["description"], u"url")
+            self.rule_stats = [stats]
+            self.clean_line = stats.counted(self.clean_line)
 
     def run(self):
         """run URL clean process."""
-        clean = self.clean
         self.prepare_pattern()
+        pipeline.run_segment(self.clean, [pipeline.Stage(self.step, self.clean_pair)])
 
-        filename = os.path.join(self.clean.working_dir, self.clean.corpus_filename())
-        filename_ext = os.path.join(self.clean.working_dir, self.clean.corpus_filename(self.ext))
-
-        infp = codecs.open(filename, 'r', 'UTF-8')
-        outfp = codecs.open(filename_ext, 'w', 'UTF-8')
-
-        lineno = 0
-        for line in infp:
-            lineno = lineno + 1
-            [source, target] = line.split(u'\t')
-            source = self.urlclean_line(source, lineno)
-            target = self.urlclean_line(target, lineno)
-            outfp.write(u'\t'.join([source.strip(), target.strip()]) + os.linesep )
+    def clean_pair(self, source, target):
+        """Clean the url-like text from a pair of sentences."""
+        self.lineno = self.lineno + 1
+        source = self.clean_line(source)
+        target = self.clean_line(target)
+        return (source.strip(), target.strip())
 
-        infp.close()
-        outfp.close()
+    def clean_line(self, line):
+        """Clean the url-like text from a sentence of current line."""
+        return self.urlclean_line(line, self.lineno)
 
     def prepare_pattern(self):
-        # prepare the re pattern.
+        """Prepare the url detector and the template of replacement."""
+        # compile the pattern only once in process for the same country domains.
+        country = tuple(self.country) if self.country is not None else ()
+        if country not in DETECTORS:
+            DETECTORS[country] = URLDetector(self.compile_pattern(country),
+                                             self.GENERAL_ROOT + self.COUNTRY_ROOT + list(country))
+        self.detector = DETECTORS[country]
+        self.template = sre_parse.parse_template(self.repl, self.detector.pattern)
+        if len(self.template[0]) == 0:
+            self.literal = u''.join(literal for literal in self.template[1] if literal is not None)
+
+    def compile_pattern(self, country):
+        """Return the url pattern with extra country domains."""
         proto_list = "|".join(self.PROTOCAL)
         groot_list = "|".join(self.GENERAL_ROOT)
-        if self.country is not None:
-            self.COUNTRY_ROOT.extend(self.country)
-        croot_list = "|".join(self.COUNTRY_ROOT)
+        croot_list = "|".join(self.COUNTRY_ROOT + list(country))
 
         proto = ur'((?#Protocal)({proto})://)'.format(proto=proto_list)
         user = ur'(?:\\w+:\\w+@)?'
@@ -125,19 +180,89 @@ class URLClean(object):
         suffix = ur"""(?=([{}<>'"()\[\]|]|[.,;?!](?=(\s|$|[{}<>'"()\[\]|]))|(?<![.,;?!])(\s|$)))"""
 
         url_pattern = ''.join([domain, user, port, path, suffix])
-        self.pattern = re.compile(url_pattern)
+        return re.compile(url_pattern)
+
+
+    def urlclean_line(self, line, lineno):
+        """Clean the url-like text from a sentence, replace the urls found by detector in one pass.
+
+        The matches are logged as records into the asynchronous log of step.
+        """
+        matches = self.detector.matches(line)
+        if len(matches) == 0:
+            return line
+        if self.log == u'detail':
+            for match in matches:
+                self.match_log.append((DETAIL, lineno, None, match.group(0)))
+        elif self.log == u'lineno':
+            self.match_log.append((LINENO, lineno, None, None))
+
+        pieces = []
+        pos = 0
+        for match in matches:
+            pieces.append(line[pos:match.start()])
+            pieces.append(self.literal if self.literal is not None else sre_parse.expand_template(self.template, match))
+            pos = match.end()
+        pieces.append(line[pos:])
+        return u''.join(pieces)
+
+    def close(self):
+        """Write the logs left in the asynchronous log."""
+        self.match_log.close()
+
+
+class URLDetector(object):
+    """Find the urls in sentence as finditer() of url pattern, but try the pattern only near anchors.
+
+    Every url has an anchor in its domain: the ':' of '://', the '.' before its root domain, looked
+    up in a set, or the '.' after the first octet of its ip address. The chars from the start of url
+    to the anchor are domain chars, so a url can only start in the run of domain chars before an
+    anchor. If a root domain isn't a token of domain chars, the pattern is searched in the whole
+    sentence.
 
-
-    def urlclean_line(self, line, lineno):     # pylint: disable=I0011,R0914
-
-        if self.log is not None and self.pattern.search(line):
-            if self.log == u'detail':
-                for match in self.pattern.finditer(line):
-                    self.logger.info(
-                        "Line {ln}: {match}".format(ln=lineno,
-                                                    match=match.group(0).encode('utf-8'))
-                    )
-            elif self.log == u'lineno':
-                self.logger.info("Line {ln}".format(ln=lineno))
-
-        return self.pattern.sub(self.repl, line)
+    """
+    def __init__(self, pattern, roots):
+        self.pattern = pattern
+        self.roots = None
+        if all(ROOT_TOKEN.match(root) for root in roots):
+            self.roots = frozenset(roots)
+
+    def anchors(self, line):
+        """Return the sorted list of the positions of anchors in line."""
+        anchors = []
+        for token in DOT_TOKEN.finditer(line):
+            name = token.group(1)
+            if name in self.roots or (name[0] in string.digits and IP_OCTETS.match(line, token.start())):
+                anchors.append(token.start())
+        scheme = line.find(u'://')
+        if scheme >= 0:
+            while scheme >= 0:
+                anchors.append(scheme)
+                scheme = line.find(u'://', scheme + 1)
+            anchors.sort()
+        return anchors
+
+    def matches(self, line):
+        """Return the list of matches of url pattern in line, the same as its finditer()."""
+        if self.roots is None:
+            return list(self.pattern.finditer(line))
+        anchors = self.anchors(line)
+        if len(anchors) == 0:
+            return []
+
+        match = self.pattern.match
+        matches = []
+        start = 0
+        for anchor in anchors:
+            if anchor < start:
+                continue
+            # the positions before start are tried or in a url already.
+            start = max(start, len(line[:anchor].rstrip(DOMAIN_CHARS)))
+            while start <= anchor:
+                found = match(line, start)
+                if found is None:
+                    start = start + 1
+                else:
+                    matches.append(found)
+                    start = found.end()
+        return matches
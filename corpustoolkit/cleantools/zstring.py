@@ -34,33 +34,14 @@
 """ZString Sequence Clean Module
 
 Support conversion for Adobe's ZString escape sequence.
+
+The escape sequences, the xml escapes and the number form #{U+XXXX} are unescaped in one pass of
+a pattern, the sequences are looked up in the table. The escape sequences of zstring 1.5 are added
+into the table if the step asks for them by "escapes": "zstring1.5".
 """
 
-ESCAPESEQ_TABLE = {     # zstring1.5
-    # ur"\\" : u"\u005C",     # REVERSE SOLIDUS
-    # ur"\"" : u"\u0022",     # QUOTATION MARK  APL quote
-    # ur"\n" : u"\u000A",     # LINE FEED
-    # ur"\r" : u"\u000D",     # CARRIAGE RETURN
-    # ur"\t" : u"\u0009",     # HORIZONTAL TABULATION
-    # ur"\b" : u"\u0008",     # BACK SPACE
-    # ur"\v" : u" ",
-    # ur"\f" : u" ",
-
-    # ur"^^" : u"\u005E",     # ^ CIRCUMFLEX ACCENT
+ESCAPESEQ_TABLE = {
     ur"^Q" : u"\u0022",     # " QUOTATION MARK  APL quote
-    # ur"^[" : u"\u201C",     # “ LEFT DOUBLE QUOTATION MARK  DOUBLE TURNED COMMA QUOTATION MARK
-    # ur"^]" : u"\u201D",     # ” RIGHT DOUBLE QUOTATION MARK DOUBLE COMMA QUOTATOIN MARK
-    # ur"^{" : u"\u2018",     # ‘ LEFT SINGLE QUOTATION MARK  SINGLE TURNED COMMA QUOTATION MARK
-    # ur"^}" : u"\u2019",     # ’ RIGHT SINGLE QUOTATION MARK SINGLE COMMA QUOTATION MARK
-    # ur"^C" : u"\u00A9",     # © COPYRIGHT SIGN
-    # ur"^R" : u"\u00AE",     # ® REGISTERED SIGN REGISTERED TRADE MARK SIGN
-    # ur"^T" : u"\u2122",     # ™ TRADEMARK SIGN
-    # ur"^D" : u"\u00B0",     # ° DEGREE SIGN
-    # ur"^B" : u"\u2022",     # • BULLET  black small circle
-    # ur"^#" : u"\u2318",     # ⌘ PLACE OF INTEREST SIGN  COMMAND KEY
-    # ur"^!" : u"\u00AC",     # ¬ NOT SIGN
-    # ur"^|" : u"\u2206",     # ∆ INCREMENT   Laplace operator forward difference
-    # ur"^S" : u"\u2211",     # ∑ N-ARY SUMMATION summation sign
 
     ur"#{endl}"     : u"\u000A", # \n
     ur"#{tab}"      : u" ",      # \t  horizontal tabulation => ' '
@@ -199,39 +180,143 @@ ESCAPESEQ_TABLE = {     # zstring1.5
     ur"#{euro}"     : u"\u20AC"  # €   U+20AC  euro sign
 }
 
-import codecs
-import os
+
+# The escape sequences added in zstring 1.5, unescaped only if the step asks for them.
+ZSTRING15_ESCAPES = {
+    ur"\\" : u"\u005C",     # REVERSE SOLIDUS
+    ur"\"" : u"\u0022",     # QUOTATION MARK  APL quote
+    ur"\n" : u"\u000A",     # LINE FEED
+    ur"\r" : u"\u000D",     # CARRIAGE RETURN
+    ur"\t" : u" ",          # HORIZONTAL TABULATION => ' ', a tab would split the pair
+    ur"\b" : u"\u0008",     # BACK SPACE
+    ur"\v" : u" ",
+    ur"\f" : u" ",
+
+    ur"^^" : u"\u005E",     # ^ CIRCUMFLEX ACCENT
+    ur"^[" : u"\u201C",     # “ LEFT DOUBLE QUOTATION MARK  DOUBLE TURNED COMMA QUOTATION MARK
+    ur"^]" : u"\u201D",     # ” RIGHT DOUBLE QUOTATION MARK DOUBLE COMMA QUOTATOIN MARK
+    ur"^{" : u"\u2018",     # ‘ LEFT SINGLE QUOTATION MARK  SINGLE TURNED COMMA QUOTATION MARK
+    ur"^}" : u"\u2019",     # ’ RIGHT SINGLE QUOTATION MARK SINGLE COMMA QUOTATION MARK
+    ur"^C" : u"\u00A9",     # © COPYRIGHT SIGN
+    ur"^R" : u"\u00AE",     # ® REGISTERED SIGN REGISTERED TRADE MARK SIGN
+    ur"^T" : u"\u2122",     # ™ TRADEMARK SIGN
+    ur"^D" : u"\u00B0",     # ° DEGREE SIGN
+    ur"^B" : u"\u2022",     # • BULLET  black small circle
+    ur"^#" : u"\u2318",     # ⌘ PLACE OF INTEREST SIGN  COMMAND KEY
+    ur"^!" : u"\u00AC",     # ¬ NOT SIGN
+    ur"^|" : u"\u2206",     # ∆ INCREMENT   Laplace operator forward difference
+    ur"^S" : u"\u2211",     # ∑ N-ARY SUMMATION summation sign
+}
+
 import re
-from xml.sax import saxutils
+import sys
+
+from corpustoolkit import features
+from corpustoolkit import pipeline
+
+# the tables of escape sequences by the value of "escapes" in step.
+TABLES = {u"zstring": ESCAPESEQ_TABLE,
+          u"zstring1.5": dict(ESCAPESEQ_TABLE.items() + ZSTRING15_ESCAPES.items())}
+
+# the xml escapes, unescaped after the escape sequences, so #{amp}amp; is unescaped to '&' too.
+XML_ESCAPES = {u"&lt;": u"<", u"&gt;": u">", u"&amp;": u"&", u"#{amp}amp;": u"&"}
+
+# the name form of escape sequence.
+NAME_KEY = re.compile(ur'#\{[A-Za-z0-9]+\}$')
+
+# unescapers by the value of "escapes", shared by the zstring cleans in process.
+UNESCAPERS = {}
 
 def validate(step):
+    if step.get("escapes", u"zstring") not in TABLES:
+        print >> sys.stderr, "The escapes of step {ext} must be one of zstring, zstring1.5.".format(ext=step["ext"])
+        return False
+    return True
+
+def triggers(step):
+    """Return the features of the pairs which the step changes: escape sequences, entities, line breaks or whitespace to strip.
+
+    The escape sequences of zstring 1.5 have no feature, the step is triggered by any pair then.
+
+    """
+    if step.get("escapes", u"zstring") != u"zstring":
+        return 0
+    return features.AMP | features.ZSTRING | features.CARET_Q | features.BREAK | features.EDGE
+
+def deterministic(step):    # pylint: disable=I0011,W0613
+    """Return True, the step depends on the pair only and writes no log, its results can be kept in memo."""
     return True
 
-def run(clean_config, corpustool_config, step):     # pylint: disable=I0011,W0613
+def run(clean_config, corpustool_config, step):
     """entry function."""
-    zstring_dict = ESCAPESEQ_TABLE
+    pipeline.run_step(clean_config, corpustool_config, step)
 
-    filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
-    filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"]))
 
-    infp = codecs.open(filename, 'r', 'UTF-8')
-    outfp = codecs.open(filename_ext, 'w', 'UTF-8')
+def stage(clean_config, corpustool_config, step):       # pylint: disable=I0011,W0613
+    """Return the function cleaning a pair of sentences."""
+    escapes = step.get("escapes", u"zstring")
+    if escapes not in UNESCAPERS:
+        UNESCAPERS[escapes] = Unescaper(TABLES[escapes])
+    unescape = UNESCAPERS[escapes].unescape
 
-    for line in infp:
-        [source, target] = line.split(u'\t')
-        source = zstring_unescape(source, zstring_dict)
-        target = zstring_unescape(target, zstring_dict)
-        outfp.write(u'\t'.join([source.strip(), target.strip()]) + os.linesep)
+    def clean_pair(source, target):
+        return (unescape(source).strip(), unescape(target).strip())
 
-    infp.close()
-    outfp.close()
+    return clean_pair
 
 
-def zstring_unescape(line, zdict):
+def zstring_unescape(line, zdict=ESCAPESEQ_TABLE):
     """unescape the zstring name form and number form of escape sequence."""
-    line = u" ".join(saxutils.unescape(line, zdict).splitlines())
-    pattern = ur'#\{U\+([0-9a-fA-F]{4})\}'
-    line = re.sub(pattern,
-                  lambda m: unichr(int(m.group(1), 16)),
-                  line)
-    return u" ".join(line.splitlines())
+    return Unescaper(zdict).unescape(line)
+
+
+class Unescaper(object):
+    """Unescape the escape sequences of a table, the xml escapes and the number form in one pass.
+
+    The line breaks are joined by spaces. The number form is unescaped after the line breaks of other
+    sequences are joined, so if a number form is a line break, e.g. #{U+000A}, the line is unescaped
+    again in two passes to join the line breaks as that order.
+
+    """
+    def __init__(self, table):
+        self.table = dict(table.items() + XML_ESCAPES.items())
+        others = sorted([key for key in table if not NAME_KEY.match(key)], key=len, reverse=True)
+        self.pattern = re.compile(u'|'.join([ur'(?:#\{amp\}|&)amp;', ur'&[lg]t;', ur'#\{U\+([0-9a-fA-F]{4})\}',
+                                             ur'#\{[A-Za-z0-9]+\}'] + [re.escape(key) for key in others]))
+        self.chars = frozenset(key[0] for key in self.table)
+        self.number_break = False
+
+    def unescape(self, line):
+        """Return the unescaped line, whose line breaks are joined by spaces."""
+        if not any(char in line for char in self.chars):
+            return u" ".join(line.splitlines())
+        self.number_break = False
+        result = self.pattern.sub(self.unescape_match, line)
+        if self.number_break:
+            result = self.pattern.sub(self.unescape_name, line)
+            result = NUMBER_PATTERN.sub(unescape_number, u" ".join(result.splitlines()))
+        return u" ".join(result.splitlines())
+
+    def unescape_match(self, match):
+        """Return the char of an escape sequence match, or the sequence if it's unknown."""
+        if match.group(1) is not None:
+            char = unichr(int(match.group(1), 16))
+            if features.BREAK_PATTERN.match(char):
+                self.number_break = True
+            return char
+        sequence = match.group(0)
+        return self.table.get(sequence, sequence)
+
+    def unescape_name(self, match):
+        """Return the char of an escape sequence match, the number form is kept."""
+        sequence = match.group(0)
+        return self.table.get(sequence, sequence)
+
+
+# the number form of escape sequence.
+NUMBER_PATTERN = re.compile(ur'#\{U\+([0-9a-fA-F]{4})\}')
+
+
+def unescape_number(match):
+    """Return the char of a number form match."""
+    return unichr(int(match.group(1), 16))
@@ -42,6 +42,8 @@ import os
 import os.path
 import sys
 
+from corpustoolkit import fileutil
+
 
 class CorpusCleanConfig(object):
     """Corpus clean configuration to store the info of a clean process.
@@ -58,6 +60,18 @@ class CorpusCleanConfig(object):
         infile_dir:         input directory.
         working_dir:        working directory in which intermediate files are placed.
         outfile_dir:        output directory.
+        fuse:               run consecutive in-memory steps in a single pass over the corpus.
+        keep_steps:         keep the result file of every step when steps are fused.
+        jobs:               number of worker processes to run the steps on shards of corpus.
+        cache_size:         size cap of step cache in bytes, None if step cache is off.
+        backup:             keep the original corpus in working directory.
+        compression:        compression format of input corpus: gz, bz2, xz, None if not compressed.
+        stream:             read the corpus from stdin and write the clean corpus into stdout.
+        log_file:           the log file of all steps in stream mode, None for stderr.
+        rule_stats:         keep the statistics of every rule of regex and url steps.
+        top_rules:          number of the most expensive rules listed with the dead rules, None for no list.
+        dry_run:            number of pairs sampled to try the steps on, None if not a dry run.
+        sample_first:       sample the first pairs of corpus in dry run rather than a random sample.
 
     Reference:
         A `sample configuration`_ of clean steps.
@@ -69,6 +83,18 @@ class CorpusCleanConfig(object):
     def __init__(self):
         """initialize the clean config."""
         self._steps = None
+        self._fuse = False
+        self._keep_steps = False
+        self._jobs = 1
+        self._cache_size = None
+        self._backup = True
+        self._compression = None
+        self._stream = False
+        self._log_file = None
+        self._rule_stats = False
+        self._top_rules = None
+        self._dry_run = None
+        self._sample_first = False
 
     def read_cleansteps(self, filename):
         try:
@@ -93,7 +119,7 @@ class CorpusCleanConfig(object):
         """Validate the modules and the config of clean steps.
 
         The function would check whether can import the clean modules, and whether each module
-        have the essential functions: validate, run/predicate. And it would run the function
+        have the essential functions: validate, run/predicate/batch. And it would run the function
         validate() from each module to validate the config. Return False if anything wrong.
 
         """
@@ -111,18 +137,26 @@ class CorpusCleanConfig(object):
                 ret = False
                 continue
 
-            # module must have functions: validate, run or predicate.
+            # module must have functions: validate, run, predicate or batch.
             module = sys.modules[module_name]
             if not hasattr(module, "validate"):
                 ret = False
                 continue
-            elif not ( hasattr(module, "run") or hasattr(module, "predicate") ):
+            elif not ( hasattr(module, "run") or hasattr(module, "predicate") or hasattr(module, "batch") ):
                 ret = False
                 continue
 
             if module.validate(step) == False:
                 ret = False
 
+            if "memo" in step:
+                if not (hasattr(module, "deterministic") and module.deterministic(step)):
+                    print >> sys.stderr, "The step {ext} can't keep a memo, it's not deterministic or it writes log.".format(ext=step["ext"])
+                    ret = False
+                elif not isinstance(step["memo"], int) or step["memo"] < 1:
+                    print >> sys.stderr, "The memo of step {ext} must be a size in MB.".format(ext=step["ext"])
+                    ret = False
+
         return ret
 
     @property
@@ -173,6 +207,102 @@ class CorpusCleanConfig(object):
     def working_dir(self, value):
         self._working_dir = value
 
+    @property
+    def fuse(self):
+        return self._fuse
+
+    @fuse.setter
+    def fuse(self, value):
+        self._fuse = value
+
+    @property
+    def keep_steps(self):
+        return self._keep_steps
+
+    @keep_steps.setter
+    def keep_steps(self, value):
+        self._keep_steps = value
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    @jobs.setter
+    def jobs(self, value):
+        self._jobs = value
+
+    @property
+    def cache_size(self):
+        return self._cache_size
+
+    @cache_size.setter
+    def cache_size(self, value):
+        self._cache_size = value
+
+    @property
+    def backup(self):
+        return self._backup
+
+    @backup.setter
+    def backup(self, value):
+        self._backup = value
+
+    @property
+    def compression(self):
+        return self._compression
+
+    @compression.setter
+    def compression(self, value):
+        self._compression = value
+
+    @property
+    def stream(self):
+        return self._stream
+
+    @stream.setter
+    def stream(self, value):
+        self._stream = value
+
+    @property
+    def log_file(self):
+        return self._log_file
+
+    @log_file.setter
+    def log_file(self, value):
+        self._log_file = value
+
+    @property
+    def rule_stats(self):
+        return self._rule_stats
+
+    @rule_stats.setter
+    def rule_stats(self, value):
+        self._rule_stats = value
+
+    @property
+    def top_rules(self):
+        return self._top_rules
+
+    @top_rules.setter
+    def top_rules(self, value):
+        self._top_rules = value
+
+    @property
+    def dry_run(self):
+        return self._dry_run
+
+    @dry_run.setter
+    def dry_run(self, value):
+        self._dry_run = value
+
+    @property
+    def sample_first(self):
+        return self._sample_first
+
+    @sample_first.setter
+    def sample_first(self, value):
+        self._sample_first = value
+
     def corpus_filename(self, ext=None):
         """Return corpus filename."""
         namelist = [self.corpus_name, '-'.join([self.source_lang, self.target_lang])]
@@ -181,13 +311,31 @@ class CorpusCleanConfig(object):
         namelist.append("bitext")
         return '.'.join(namelist)
 
+    def infile_filename(self, ext=None):
+        """Return corpus filename with the suffix of compression format."""
+        filename = self.corpus_filename(ext)
+        return filename if self.compression is None else '.'.join([filename, self.compression])
+
     def logger(self, ext):
-        """instantiate logger for specified clean step."""
+        """instantiate logger for specified clean step.
+
+        In stream mode, the logs of steps are passed to the root logger and share its output.
+        """
         logger = logging.getLogger(ext)     # ext name is unique for each step.
+        if self.stream:
+            logger.setLevel(logging.INFO)
+            return logger
         logger.propagate = False
         logger.setLevel(logging.INFO)
-        handler = logging.FileHandler(filename=os.path.join(self.working_dir, ext + '.log'),
-                                      mode='w', encoding='utf-8', delay=True)
+        # drop the handler of the corpus cleaned before in this process.
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        # the log of last run is removed here rather than truncated when opened, so that the log merged
+        # from shards by parallel pipeline is appended by the logger, e.g. the rule statistics.
+        filename = os.path.join(self.working_dir, ext + '.log')
+        fileutil.remove(filename)
+        handler = logging.FileHandler(filename=filename, mode='a', encoding='utf-8', delay=True)
         formatter = logging.Formatter('%(message)s')
         handler.setFormatter(formatter)
         logger.addHandler(handler)
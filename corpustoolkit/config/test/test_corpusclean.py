@@ -46,3 +46,16 @@ class TestCorpusCleanConfig():
     def test_corpus_filename_noext(self):
         path = self.config.corpus_filename()
         assert(path == "corpus.en-fr.bitext")
+
+    def test_validate_steps_memo(self):
+        self.config.steps = [{"name": "html", "ext": "html", "memo": 16},
+                             {"name": "regex", "ext": "re", "memo": 16, "list": [{"pattern": u"a"}]}]
+        assert self.config.validate_steps() is True
+
+    def test_validate_steps_memo_fail(self):
+        self.config.steps = [{"name": "url", "ext": "url", "log": "detail", "memo": 16}]
+        assert self.config.validate_steps() is False
+        self.config.steps = [{"name": "length_diff", "ext": "ldiff", "diff": 3, "memo": 16}]
+        assert self.config.validate_steps() is False
+        self.config.steps = [{"name": "html", "ext": "html", "memo": 0}]
+        assert self.config.validate_steps() is False
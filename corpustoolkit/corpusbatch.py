@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2012, 2013 Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301,C0103
+
+"""Corpus Batch Clean Tool
+
+Clean many bitext files with the same clean steps. The corpus files are given as a directory, then all
+files named like 'filename.en-zhcn.bitext[.gz|.bz2|.xz]' in it are cleaned, or as a manifest file which
+lists the paths of corpus files one per line (empty lines and lines starting with '#' are skipped,
+relative paths are relative to the manifest file).
+
+The clean steps are read, validated and compiled only once, then the corpora are cleaned by a pool of
+worker processes, at most N corpora at the same time. Every corpus is cleaned as corpusclean does, in its
+own working directory named after the corpus, e.g. 'DIR/filename.en-zhcn/'. The status of every corpus
+is printed when all corpora are done.
+
+Command line Syntax::
+
+    Usage: corpusbatch.py [options] corpus_dir|manifest clean_steps_conf
+
+    Options:
+      --version             show program's version number and exit
+      -h, --help            show this help message and exit
+      -c FILE, --config=FILE
+                            external corpus tools config
+      -w DIR, --working-dir=DIR
+                            directory of working directories, default is the directory of corpus
+      -o DIR, --output-dir=DIR
+                            output directory, default is the directory of corpus
+      -j N, --jobs=N        clean N corpora at the same time
+      -F, --fuse            run consecutive in-memory steps in a single pass
+      -k, --keep-steps      keep the result file of every fused step
+      --cache               reuse the cached results of unchanged steps
+      --cache-size=MB       size cap of step cache in working directory of every corpus
+      --no-backup           don't keep the original corpus in working directory
+      --rule-stats          report the statistics of every regex/url rule in the log of step
+      --top-rules=N         list the dead rules and the N most expensive rules, implies --rule-stats
+      --summary=FILE        write the status of corpora into a JSON file
+
+    Args:
+        corpus_dir|manifest:    The directory of corpus files, or a file listing the corpus files.
+        clean_steps_conf:       Configuration file of clean steps.
+"""
+
+import copy
+import errno
+import json
+import logging
+import multiprocessing
+import os
+import os.path
+import sys
+import time
+import traceback
+
+from optparse import OptionParser
+from corpustoolkit import corpusclean
+from corpustoolkit import pipeline
+from corpustoolkit.config.corpustools import CorpusToolsConfig
+from corpustoolkit.config.corpusclean import CorpusCleanConfig
+
+__version__ = 1.0
+__years__ = "2013"
+__author__ = "Leo Jiang <leo.jiang.dev@gmail.com>"
+
+# the plan of batch shared with worker processes by fork:
+# (corpustools_config, clean_config, working_root, output_dir).
+_plan = None
+
+
+def main(argv):    # pylint: disable=I0011,W0102
+    """entry function."""
+    corpustools_config, clean_config, corpora, options = argv2conf(argv)
+    compile_plan(corpustools_config, clean_config)
+    results = run_batch(corpustools_config, clean_config, corpora, options.working_dir,
+                        options.output_dir, options.jobs)
+
+    for line in summary(results):
+        print line
+    if options.summary is not None:
+        with open(options.summary, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+def argv2conf(argv):
+    """Parse command line arguments, construct the configurations and the list of corpus files.
+
+    :returns:
+        Exit program if arguments wrong. Else return a tuple (corpustools_config, clean_config, corpora, options).
+        The clean_config holds the options and steps shared by all corpora.
+
+    """
+    usage = "Usage: %prog [options] corpus_dir|manifest clean_steps"
+    num_args = 2
+    version = "%prog {version} (c) {years} {author}".format(version=__version__,
+                                                            years=__years__,
+                                                            author=__author__
+                                                            )
+    parser = OptionParser(usage=usage, version=version)
+
+    parser.add_option("-c", "--config", metavar="FILE", dest="config",
+                      type="string", help="external corpus tools config")
+    parser.add_option("-w", "--working-dir", metavar="DIR", dest="working_dir",
+                      type="string", help="directory of working directories, default is the directory of corpus")
+    parser.add_option("-o", "--output-dir", metavar="DIR", dest="output_dir",
+                      type="string", help="output directory, default is the directory of corpus")
+    parser.add_option("-j", "--jobs", metavar="N", dest="jobs", type="int", default=multiprocessing.cpu_count(),
+                      help="clean N corpora at the same time")
+    parser.add_option("-F", "--fuse", dest="fuse", action="store_true", default=False,
+                      help="run consecutive in-memory steps in a single pass")
+    parser.add_option("-k", "--keep-steps", dest="keep_steps", action="store_true", default=False,
+                      help="keep the result file of every fused step")
+    parser.add_option("--cache", dest="cache", action="store_true", default=False,
+                      help="reuse the cached results of unchanged steps")
+    parser.add_option("--cache-size", metavar="MB", dest="cache_size", type="int", default=10240,
+                      help="size cap of step cache in working directory of every corpus")
+    parser.add_option("--no-backup", dest="backup", action="store_false", default=True,
+                      help="don't keep the original corpus in working directory")
+    parser.add_option("--rule-stats", dest="rule_stats", action="store_true", default=False,
+                      help="report the statistics of every regex/url rule in the log of step")
+    parser.add_option("--top-rules", metavar="N", dest="top_rules", type="int",
+                      help="list the dead rules and the N most expensive rules, implies --rule-stats")
+    parser.add_option("--summary", metavar="FILE", dest="summary", type="string",
+                      help="write the status of corpora into a JSON file")
+
+    (options, args) = parser.parse_args(argv[1:])
+    if len(args) != num_args:
+        parser.error("Too few/many arguments. Expected {num_args}".format(num_args=num_args))
+
+    if options.jobs < 1:
+        parser.error("-j --jobs should be followed by a positive number.")
+
+    if options.top_rules is not None and options.top_rules < 1:
+        parser.error("--top-rules should be followed by a positive number.")
+
+    if options.config is not None:
+        options.config = os.path.abspath(os.path.expanduser(options.config))
+        if not os.path.isfile(options.config):
+            parser.error("-c --config should be followed by a corpus tools config file.")
+
+    for option in ["working_dir", "output_dir"]:
+        if getattr(options, option) is not None:
+            setattr(options, option, os.path.abspath(os.path.expanduser(getattr(options, option))))
+            if not os.path.isdir(getattr(options, option)):
+                parser.error("--{} should be followed by an existed directory.".format(option.replace('_', '-')))
+
+    if options.summary is not None:
+        options.summary = os.path.abspath(os.path.expanduser(options.summary))
+
+    corpustools_config = CorpusToolsConfig()
+    if options.config is not None:
+        corpustools_config.readfile(options.config)
+
+    pathname = os.path.abspath(os.path.expanduser(args[0]))
+    steps_filename = os.path.abspath(os.path.expanduser(args[1]))
+    if not os.path.exists(pathname):
+        parser.error("corpus directory or manifest not exists: {}".format(pathname))
+    if not os.path.isfile(steps_filename):
+        parser.error("config file not exists: {}".format(steps_filename))
+
+    corpora = list_corpora(pathname)
+    if len(corpora) == 0:
+        parser.error("No corpus file is found in {}".format(pathname))
+    names = set()
+    for path in corpora:
+        corpus = corpusclean.parse_corpus_filename(os.path.basename(path))
+        if not os.path.isfile(path):
+            parser.error("corpus file not exists: {}".format(path))
+        if corpus is None:
+            parser.error("The corpus filename isn't correct, it should be like filename.en-zhcn.bitext[.gz|.bz2|.xz] : {}".format(path))
+        # the working directories and output files are named after the corpus.
+        if corpus[:2] in names:
+            parser.error("More than one corpus named {}.{}".format(corpus[0], corpus[1]))
+        names.add(corpus[:2])
+
+    clean_config = CorpusCleanConfig()
+    clean_config.fuse = options.fuse
+    clean_config.keep_steps = options.keep_steps
+    clean_config.backup = options.backup
+    clean_config.rule_stats = options.rule_stats or options.top_rules is not None
+    clean_config.top_rules = options.top_rules
+    if options.cache:
+        clean_config.cache_size = options.cache_size << 20
+
+    clean_config.read_cleansteps(steps_filename)
+    if clean_config.validate_steps() is False:
+        sys.exit(errno.EINVAL)
+
+    return (corpustools_config, clean_config, corpora, options)
+
+
+def list_corpora(pathname):
+    """Return the paths of corpus files in a directory, or listed in a manifest file."""
+    if os.path.isdir(pathname):
+        return sorted(os.path.join(pathname, name) for name in os.listdir(pathname)
+                      if corpusclean.parse_corpus_filename(name) is not None
+                      and os.path.isfile(os.path.join(pathname, name)))
+
+    corpora = []
+    with open(pathname) as fp:
+        for line in fp:
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            path = os.path.join(os.path.dirname(pathname), os.path.expanduser(line))
+            corpora.append(os.path.abspath(path))
+    return corpora
+
+
+def compile_plan(corpustools_config, clean_config):
+    """Prepare the clean steps once for all corpora.
+
+    The clean modules are imported and their patterns are compiled into the module-level caches
+    (see cleantools.regex and cleantools.url), which the worker processes inherit.
+
+    """
+    for step in clean_config.steps:
+        if pipeline.is_fusable(step):
+            pipeline.make_stage(clean_config, corpustools_config, dict(step, logger=logging.getLogger(step["ext"])))
+
+
+def corpus_config(clean_config, path, working_root, output_dir):
+    """Return the clean config of a corpus, the working directory is created if not exists."""
+    config = copy.copy(clean_config)
+    config.steps = copy.deepcopy(clean_config.steps)
+
+    (corpus_name, langpair, compression) = corpusclean.parse_corpus_filename(os.path.basename(path))
+    config.corpus_name = corpus_name
+    [config.source_lang, config.target_lang] = langpair.split('-')
+    config.compression = compression
+    config.infile_dir = os.path.dirname(path)
+    config.outfile_dir = config.infile_dir if output_dir is None else output_dir
+    root = config.infile_dir if working_root is None else working_root
+    config.working_dir = os.path.join(root, '.'.join([corpus_name, langpair]))
+    if not os.path.isdir(config.working_dir):
+        os.makedirs(config.working_dir)
+    return config
+
+
+def _clean_one(path):
+    """Worker function: clean a corpus, return its status."""
+    corpustools_config, clean_config, working_root, output_dir = _plan
+    start = time.time()
+    result = {"corpus": path, "status": "ok", "output": None, "error": None,
+              "lines_in": None, "lines_out": None}
+    try:
+        config = corpus_config(clean_config, path, working_root, output_dir)
+        clean_report = corpusclean.clean_corpus(corpustools_config, config)
+        result["output"] = os.path.join(config.outfile_dir, config.infile_filename('clean'))
+        steps = [item for item in clean_report.steps if not item["cached"]]
+        if len(steps) > 0:
+            result["lines_in"] = steps[0]["lines_in"]
+            result["lines_out"] = steps[-1]["lines_out"]
+    except Exception:       # pylint: disable=I0011,W0703
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+    result["seconds"] = time.time() - start
+    return result
+
+
+def run_batch(corpustools_config, clean_config, corpora, working_root, output_dir, jobs):
+    """Clean the corpora in a pool of jobs worker processes, return the status of corpora in order."""
+    global _plan
+    _plan = (corpustools_config, clean_config, working_root, output_dir)
+    pool = multiprocessing.Pool(min(jobs, len(corpora))) if jobs > 1 else None
+    results = {}
+    try:
+        if pool is None:
+            finished = (_clean_one(path) for path in corpora)
+        else:
+            finished = pool.imap_unordered(_clean_one, corpora)
+        for result in finished:
+            results[result["corpus"]] = result
+            print >> sys.stderr, "[{done}/{total}] {status} {corpus}".format(done=len(results), total=len(corpora),
+                                                                           status=result["status"], corpus=result["corpus"])
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        # the workers are stopped if the loop is interrupted, e.g. by Ctrl-C.
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        _plan = None
+    return [results[path] for path in corpora]
+
+
+def summary(results):
+    """Return the status table of corpora as a list of lines."""
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    header = "{:<7} {:>9} {:>11} {:>11}  {}".format("status", "time(s)", "lines in", "lines out", "corpus")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append("{:<7} {:>9} {:>11} {:>11}  {}".format(result["status"],
+                                                          fmt(result["seconds"], ".1f"),
+                                                          fmt(result["lines_in"], "d"),
+                                                          fmt(result["lines_out"], "d"),
+                                                          result["corpus"]))
+        if result["error"] is not None:
+            lines.append("        " + result["error"].strip().splitlines()[-1])
+    failed = len([result for result in results if result["status"] != "ok"])
+    lines.append("-" * len(header))
+    lines.append("{ok} succeeded, {failed} failed.".format(ok=len(results) - failed, failed=failed))
+    return lines
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
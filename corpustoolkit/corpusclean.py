@@ -35,12 +35,14 @@
 """Corpus Clean Tool
 
 Clean a bitext file according to clean steps. The corpus file should be like 'path/filename.en-zhcn.bitext'.
+The corpus file can be compressed with gzip, bzip2 or xz, e.g. 'filename.en-zhcn.bitext.gz', then it's read
+directly without a decompressed copy and the clean corpus is compressed in the same format.
 The config file of clean steps is a json style file. A working directory as well as output directory can be
 specified in command line, otherwise all intermediate result files will be put in same folder as bitext file.
 
 Users can implement their own cleanup modules with python language, and put modules into folder "corpustools.clean".
 Most of cleanup steps can be implemented as regular expression clean, some of them can be implemented as
-predicate clean. Sometimes, we need to run tokenization and lowercasing in cleanup steps. These steps are implemented
+predicate clean, or as batch clean which processes a list of lines at once. Sometimes, we need to run tokenization and lowercasing in cleanup steps. These steps are implemented
 by calling external tools.
 
 Current support external tools:
@@ -62,22 +64,45 @@ Command line Syntax::
                             working directory
       -o DIR, --output-dir=DIR
                             output directory
+      -F, --fuse            run consecutive in-memory steps in a single pass
+      -k, --keep-steps      keep the result file of every fused step
+      -j N, --jobs=N        run the steps on shards of corpus with N processes
+      --cache               reuse the cached results of unchanged steps
+      --cache-size=MB       size cap of step cache in working directory
+      --no-backup           don't keep the original corpus in working directory, needs
+                            a working directory other than the directory of corpus
+      -l XX-YY, --langpair=XX-YY
+                            language pair of corpus read from stdin
+      --log=FILE            log file of cleaning corpus from stdin, default is stderr
+      --rule-stats          report the statistics of every regex/url rule in the log of step
+      --top-rules=N         list the dead rules and the N most expensive rules, implies --rule-stats
+      --dry-run=N           run the steps on a random sample of N pairs, report the changes and the time
+      --sample-first        sample the first N pairs in dry run
 
     Args:
-        corpus_file:        The path to corpus file.
+        corpus_file:        The path to corpus file, or '-' to read the corpus from stdin and write the
+                            clean corpus into stdout. All steps run in a single pass without any file.
+                            In dry run, the steps run on a sample of corpus in memory, no file is written,
+                            the report is written into stdout.
         clean_steps_conf:   Configuration file of clean steps.
 """
 
-import codecs
 import errno
 from itertools import izip
 import logging
 import os
 import os.path
-import shutil
 import sys
 
 from optparse import OptionParser
+from corpustoolkit import bitextio
+from corpustoolkit import dryrun
+from corpustoolkit import fileutil
+from corpustoolkit import parallel
+from corpustoolkit import pipeline
+from corpustoolkit import report
+from corpustoolkit import rulestats
+from corpustoolkit import stepcache
 from corpustoolkit.config.corpustools import CorpusToolsConfig
 from corpustoolkit.config.corpusclean import CorpusCleanConfig
 
@@ -89,7 +114,16 @@ __author__ = "Leo Jiang <leo.jiang.dev@gmail.com>"
 def main(argv):    # pylint: disable=I0011,W0102
     """entry function."""
     corpustools_config, corpusclean_config = argv2conf(argv)
-    clean_corpus(corpustools_config, corpusclean_config)
+    if corpusclean_config.dry_run is not None:
+        filename = os.path.join(corpusclean_config.infile_dir, corpusclean_config.infile_filename())
+        for line in dryrun.dry_run(corpustools_config, corpusclean_config, filename):
+            print line.encode('utf-8')
+    elif corpusclean_config.stream:
+        stream_corpus(corpustools_config, corpusclean_config)
+    else:
+        clean_report = clean_corpus(corpustools_config, corpusclean_config)
+        for line in clean_report.summary():
+            print >> sys.stderr, line
 
 
 def argv2conf(argv):
@@ -121,11 +155,47 @@ def argv2conf(argv):
                       type="string", help="working directory")
     parser.add_option("-o", "--output-dir", metavar="DIR", dest="output_dir",
                       type="string", help="output directory")
+    parser.add_option("-F", "--fuse", dest="fuse", action="store_true", default=False,
+                      help="run consecutive in-memory steps in a single pass")
+    parser.add_option("-k", "--keep-steps", dest="keep_steps", action="store_true", default=False,
+                      help="keep the result file of every fused step")
+    parser.add_option("-j", "--jobs", metavar="N", dest="jobs", type="int", default=1,
+                      help="run the steps on shards of corpus with N processes")
+    parser.add_option("--cache", dest="cache", action="store_true", default=False,
+                      help="reuse the cached results of unchanged steps")
+    parser.add_option("--cache-size", metavar="MB", dest="cache_size", type="int", default=10240,
+                      help="size cap of step cache in working directory")
+    parser.add_option("--no-backup", dest="backup", action="store_false", default=True,
+                      help="don't keep the original corpus in working directory")
+    parser.add_option("-l", "--langpair", metavar="XX-YY", dest="langpair", type="string",
+                      help="language pair of corpus read from stdin")
+    parser.add_option("--log", metavar="FILE", dest="log", type="string",
+                      help="log file of cleaning corpus from stdin, default is stderr")
+    parser.add_option("--rule-stats", dest="rule_stats", action="store_true", default=False,
+                      help="report the statistics of every regex/url rule in the log of step")
+    parser.add_option("--top-rules", metavar="N", dest="top_rules", type="int",
+                      help="list the dead rules and the N most expensive rules, implies --rule-stats")
+    parser.add_option("--dry-run", metavar="N", dest="dry_run", type="int",
+                      help="run the steps on a random sample of N pairs, report the changes and the time")
+    parser.add_option("--sample-first", dest="sample_first", action="store_true", default=False,
+                      help="sample the first N pairs in dry run")
 
     (options, args) = parser.parse_args(argv[1:])
     if len(args) != num_args:
         parser.error("Too few/many arguments. Expected {num_args}".format(num_args=num_args))
 
+    if options.jobs < 1:
+        parser.error("-j --jobs should be followed by a positive number.")
+
+    if options.top_rules is not None and options.top_rules < 1:
+        parser.error("--top-rules should be followed by a positive number.")
+
+    if options.dry_run is not None and options.dry_run < 1:
+        parser.error("--dry-run should be followed by a positive number.")
+
+    if options.sample_first and options.dry_run is None:
+        parser.error("--sample-first can only be used with --dry-run.")
+
     if options.config is not None:
         options.config = os.path.abspath(os.path.expanduser(options.config))
         if not os.path.isfile(options.config):
@@ -147,37 +217,90 @@ def argv2conf(argv):
     if options.config is not None:
         corpustools_config.readfile(options.config)
 
-    path = os.path.expanduser(args[0])
-    path = os.path.abspath(path)
     steps_filename = os.path.expanduser(args[1])
     steps_filename = os.path.abspath(steps_filename)
 
-    if not os.path.isfile(path):
-        parser.error("corpus file not exists: {}".format(path))
-
-    if not os.path.isfile(path):
+    if not os.path.isfile(steps_filename):
         parser.error("config file not exists: {}".format(steps_filename))
 
     clean_config = CorpusCleanConfig()
-    clean_config.infile_dir = os.path.dirname(path)
-    clean_config.outfile_dir = clean_config.infile_dir if options.output_dir is None else options.output_dir
-    clean_config.working_dir = clean_config.infile_dir if options.working_dir is None else options.working_dir
-
-    filename = os.path.basename(path)
-    namelist = filename.split('.')
-    if len(namelist) != 3 :
-        parser.error("The corpus filename isn't correct. The pattern of filename should be like filename.en-zhcn.bitext .")
-    basename, langpair, ext = tuple(namelist)
+    compression = None
+    if args[0] == '-':
+        # streaming mode: read the corpus from stdin and write the clean corpus into stdout.
+        if options.langpair is None or len(options.langpair.split('-')) != 2:
+            parser.error("-l --langpair should be given like en-zhcn to read corpus from stdin.")
+        if options.working_dir is not None or options.output_dir is not None or options.cache or options.jobs > 1:
+            parser.error("-w, -o, -j and --cache can't be used to read corpus from stdin.")
+        if options.dry_run is not None:
+            parser.error("--dry-run can't be used to read corpus from stdin.")
+        clean_config.stream = True
+        if options.log is not None:
+            clean_config.log_file = os.path.abspath(os.path.expanduser(options.log))
+        clean_config.corpus_name = "stdin"
+        langpair = options.langpair
+    else:
+        path = os.path.expanduser(args[0])
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            parser.error("corpus file not exists: {}".format(path))
+
+        clean_config.infile_dir = os.path.dirname(path)
+        clean_config.outfile_dir = clean_config.infile_dir if options.output_dir is None else options.output_dir
+        clean_config.working_dir = clean_config.infile_dir if options.working_dir is None else options.working_dir
+        if not options.backup and options.dry_run is None and in_place(clean_config):
+            parser.error("--no-backup needs -w --working-dir other than the directory of corpus, otherwise the corpus is overwritten.")
+
+        corpus = parse_corpus_filename(os.path.basename(path))
+        if corpus is None:
+            parser.error("The corpus filename isn't correct. The pattern of filename should be like filename.en-zhcn.bitext[.gz|.bz2|.xz] .")
+        (clean_config.corpus_name, langpair, compression) = corpus
 
-    clean_config.corpus_name = basename
     [clean_config.source_lang, clean_config.target_lang] = langpair.split('-')
+    clean_config.fuse = options.fuse
+    clean_config.keep_steps = options.keep_steps
+    clean_config.jobs = options.jobs
+    clean_config.backup = options.backup
+    clean_config.compression = compression
+    clean_config.rule_stats = options.rule_stats or options.top_rules is not None
+    clean_config.top_rules = options.top_rules
+    clean_config.dry_run = options.dry_run
+    clean_config.sample_first = options.sample_first
+    if options.cache:
+        clean_config.cache_size = options.cache_size << 20
 
     clean_config.read_cleansteps(steps_filename)
     if clean_config.validate_steps() is False:
         sys.exit(errno.EINVAL)
 
+    if clean_config.stream or clean_config.dry_run is not None:
+        for step in clean_config.steps:
+            if not pipeline.is_fusable(step):
+                parser.error("The step {} can't clean the corpus from stdin or in dry run.".format(step["name"]))
+
     return (corpustools_config, clean_config)
 
+def in_place(clean_config):
+    """Return True if the working directory is the directory of input corpus.
+
+    The corpus file in working directory is the input corpus file then, it's replaced by the result of
+    every step, only the backup keeps the original corpus.
+
+    """
+    return os.path.samefile(clean_config.working_dir, clean_config.infile_dir)
+
+def parse_corpus_filename(filename):
+    """Parse the corpus filename like 'filename.en-zhcn.bitext[.gz]'.
+
+    Return a tuple (corpus_name, langpair, compression), None if the filename isn't correct.
+
+    """
+    (filename, compression) = bitextio.split_suffix(filename)
+    namelist = filename.split('.')
+    if len(namelist) != 3 or namelist[2] != "bitext" or len(namelist[1].split('-')) != 2:
+        return None
+    return (namelist[0], namelist[1], compression)
+
+
 def clean_corpus(corpustools_config, clean_config):
     """
     Clean the bitext file.
@@ -185,54 +308,217 @@ def clean_corpus(corpustools_config, clean_config):
     Copy the corpus file into working directory, run the user-specified clean steps, keep the result for
     every steps, finally put the clean corpus file into output directory.
 
+    The corpus files are linked rather than copied where the filesystem allows (see fileutil), so the
+    result files are never written in place: the output files of a step are removed before it runs.
+    The backup copy with ext name 'orig' is skipped if backup is off, which is refused if the working
+    directory is the directory of input corpus, see in_place().
+
+    If fuse mode is on, consecutive predicate/stage steps run in a single pass over the corpus, only the
+    result of the last step in the pass is kept unless keep_steps is set. Consecutive predicate steps run in
+    a single pass in any mode (see pipeline.segments), the result of every step is kept without fuse mode.
+    If more than one job is given, predicate/stage steps run on shards of the corpus in a process pool. If
+    step cache is on, the leading steps whose input and config are unchanged since last run are skipped,
+    their cached results are used.
+
     """
-    # copy the corpus into working directory.
-    if not os.path.samefile(clean_config.infile_dir, clean_config.working_dir):
-        shutil.copy(os.path.join(clean_config.infile_dir, clean_config.corpus_filename()), clean_config.working_dir)
+    if not clean_config.backup and in_place(clean_config):
+        raise IOError("Can't clean {} without backup in its own directory, the corpus would be overwritten.".format(clean_config.infile_filename()))
 
-    # backup the corpus to keep an original version.
+    # link the corpus into working directory. A compressed corpus is linked as it is, the first step
+    # decompresses it on the fly.
+    infile = os.path.join(clean_config.infile_dir, clean_config.infile_filename())
     filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
-    filename_orig = os.path.join(clean_config.working_dir, clean_config.corpus_filename('orig'))
-    shutil.copy(filename, filename_orig)
+    fileutil.link(infile, filename)
+
+    # backup the corpus to keep an original version.
+    if clean_config.backup:
+        filename_orig = os.path.join(clean_config.working_dir, clean_config.infile_filename('orig'))
+        fileutil.link(filename, filename_orig)
+
+    # initialize root logger. The handler is removed when done, so that more corpora can be cleaned
+    # one after another in a process, see corpusbatch.
+    handler = logging.FileHandler(os.path.join(clean_config.working_dir, "clean.log"), mode="w")
+    handler.setFormatter(logging.Formatter("%(levelname)s: %(asctime)s %(message)s", "%Y-%m-%d %I:%M:%S %p"))
+    root_logger = logging.getLogger()
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    try:
+        clean_report = clean_steps(corpustools_config, clean_config)
+    finally:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+    # Suffix the final output with ext name 'clean'.
+    filename_clean = os.path.join(clean_config.working_dir, clean_config.corpus_filename('clean'))
+    fileutil.link(filename, filename_clean)
+
+    # Link the final cleaned corpus into output directory, copy if it's on another filesystem.
+    # Compress it in the format of input corpus if input is compressed.
+    if clean_config.compression is not None:
+        bitextio.convert_file(filename_clean, os.path.join(clean_config.outfile_dir, clean_config.infile_filename('clean')))
+    elif not os.path.samefile(clean_config.working_dir, clean_config.outfile_dir):
+        fileutil.link(filename_clean, clean_config.outfile_dir)
+
+    return clean_report
 
-    # initialize root logger.
-    logging.basicConfig(filename=os.path.join(clean_config.working_dir, "clean.log"),
-                        filemode="w",
-                        level=logging.INFO,
-                        format="%(levelname)s: %(asctime)s %(message)s",
-                        datefmt="%Y-%m-%d %I:%M:%S %p")
+
+def clean_steps(corpustools_config, clean_config):
+    """Run the clean steps on the corpus file in working directory, return the clean report."""
+    infile = os.path.join(clean_config.infile_dir, clean_config.infile_filename())
+    filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
 
     logging.info("START cleaning corpus ...")
+    steps = clean_config.steps
+    clean_report = report.CleanReport()
+
+    # skip the leading steps whose results are in step cache.
+    cache = None
+    if clean_config.cache_size is not None:
+        cache = stepcache.StepCache(os.path.join(clean_config.working_dir, "cache"), clean_config.cache_size)
+        input_key = cache.input_key(infile)
+        keys = dict(zip([step["ext"] for step in steps], stepcache.step_keys(input_key, steps)))
+        done = cache.lookup([keys[step["ext"]] for step in steps])
+        for step in steps[:done]:
+            logging.info("SKIP " + step["description"] + ", reuse the cached result.")
+            clean_report.skip_step(step)
+        if done > 0:
+            ext = steps[done - 1]["ext"]
+            filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(ext))
+            cache.restore(keys[ext], filename_ext, os.path.join(clean_config.working_dir, ext + '.log'))
+            fileutil.link(filename_ext, filename)
+        steps = steps[done:]
+
     # every clean step works on the bitext file except for some steps need the plain text, e.g. tokenization.
     # output corpus suffix with ext name, then copy output corpus into input corpus files for next steps.
-    for step in clean_config.steps:
+    # In fuse mode, consecutive in-memory steps are run as stages in one pass, the output is suffixed
+    # with ext name of the last step in segment.
+    for segment in pipeline.segments(steps, clean_config.fuse):
+        for step in segment:
+            logging.info("START " + step["description"])
+            step["logger"] = clean_config.logger(step["ext"])
+            fileutil.remove(os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"])))
+
+        # a module which owns its file loop may not read a compressed file, decompress it first.
+        if not pipeline.is_fusable(segment[0]) and bitextio.compression(filename) is not None:
+            bitextio.convert_file(filename, filename)
+
+        clean_report.start_segment()
+        bytes_in = os.path.getsize(filename)
+        stats = run_segment(corpustools_config, clean_config, segment)
+
+        for step in segment:
+            logging.info("END " + step["description"])
+
+        # only the last step of a fused segment has its output file unless keep_steps is set.
+        produced = segment if keep_steps(clean_config) or len(segment) == 1 else segment[-1:]
+        bytes_out = [report.file_size(os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"])))
+                     if step in produced else None for step in segment]
+        clean_report.end_segment(segment, stats, bytes_in, bytes_out)
+        log_rule_stats(clean_config, segment, stats)
+
+        if cache is not None:
+            for step in produced:
+                filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"]))
+                if os.path.isfile(filename_ext):
+                    for handler in step["logger"].handlers:
+                        handler.flush()
+                    cache.store(keys[step["ext"]], filename_ext, os.path.join(clean_config.working_dir, step["ext"] + '.log'))
+
+        # prepare the bitext for next step: link the output ext version of corpus file to no ext version.
+        filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(segment[-1]["ext"]))
+        fileutil.link(filename_ext, filename)
+
+    logging.info("END cleaning corpus.")
+    clean_report.dump(os.path.join(clean_config.working_dir, "clean.report.json"))
+    for line in clean_report.summary():
+        logging.info(line)
+    return clean_report
+
+
+def stream_corpus(corpustools_config, clean_config):
+    """
+    Clean the bitext read from stdin, write the clean bitext into stdout.
+
+    All steps run as stages in a single pass, no file is created. The main log, the logs of steps
+    and the performance report are written into the log file, or stderr if no log file is given.
+
+    """
+    logging.basicConfig(filename=clean_config.log_file,
+                        level=logging.INFO,
+                        format="%(levelname)s: %(asctime)s [%(name)s] %(message)s",
+                        datefmt="%Y-%m-%d %I:%M:%S %p")
+
+    logging.info("START cleaning corpus from stdin ...")
+    steps = clean_config.steps
+    for step in steps:
         logging.info("START " + step["description"])
         step["logger"] = clean_config.logger(step["ext"])
 
-        # The module must can be imported as I had validated them in config validation.
-        module_name = "corpustoolkit.cleantools." + step["name"]
-        __import__(module_name)
+    clean_report = report.CleanReport()
+    clean_report.start_segment()
+    stages = [pipeline.make_stage(clean_config, corpustools_config, step) for step in steps]
+    infp = bitextio.BitextReader(sys.stdin)
+    outfp = bitextio.BitextWriter(sys.stdout)
+    if len(stages) > 0:
+        pipeline.run_stages(infp, stages, [None] * (len(stages) - 1) + [outfp])
+    else:
+        for line in infp:
+            outfp.write(line)
+    outfp.close()
+
+    for stage in stages:
+        stage.close()
+        stage.finish()
+        logging.info("END " + stage.step["description"])
+    if len(stages) > 0:
+        stats = [stage.stats() for stage in stages]
+        clean_report.end_segment(steps, stats, None, [None] * len(steps))
+        log_rule_stats(clean_config, steps, stats)
 
-        module = sys.modules[module_name]
-        if hasattr(module, 'predicate'):
-            predicate_clean(clean_config, step, module.predicate)
-        elif hasattr(module, 'run'):
-            module.run(clean_config, corpustools_config, step)
+    logging.info("END cleaning corpus.")
+    for line in clean_report.summary():
+        logging.info(line)
 
-        logging.info("END " + step["description"])
 
-        # prepare the bitext for next step: copy the output ext version of corpus file to no ext version.
-        filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(step["ext"]))
-        shutil.copy(filename_ext, filename)
+def log_rule_stats(clean_config, steps, stats):
+    """Write the report of rule statistics into the log of step, if the stats of step have them."""
+    for step, step_stats in zip(steps, stats or []):
+        if "rules" in step_stats:
+            for line in rulestats.report(step["ext"], step_stats["rules"], clean_config.top_rules):
+                step["logger"].info(line)
 
-    logging.info("END cleaning corpus.")
-    # Suffix the final output with ext name 'clean'.
-    filename_clean = os.path.join(clean_config.working_dir, clean_config.corpus_filename('clean'))
-    shutil.copy(filename, filename_clean)
 
-    # Copy the final cleaned corpus into output directory.
-    if not os.path.samefile(clean_config.working_dir, clean_config.outfile_dir):
-        shutil.copy(filename_clean, clean_config.outfile_dir)
+def keep_steps(clean_config):
+    """Return True if the output file of every step in a segment is kept.
+
+    Without fuse mode a segment has more than one step only if they are predicate steps, their output
+    files are kept as the steps run in a pass each.
+
+    """
+    return clean_config.keep_steps or not clean_config.fuse
+
+
+def run_segment(corpustools_config, clean_config, segment):
+    """Run a segment of clean steps on the corpus file in working directory.
+
+    Return the stats of steps, or None if the step runs by the run() of module.
+
+    """
+    # The module must can be imported as I had validated them in config validation.
+    module = pipeline.import_module(segment[0])
+    filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
+    # the shards are byte ranges of file, a compressed file can't be sharded.
+    if clean_config.jobs > 1 and pipeline.is_fusable(segment[0]) and bitextio.compression(filename) is None:
+        return parallel.run_segment(clean_config, corpustools_config, segment, clean_config.jobs,
+                                    keep_steps(clean_config))
+    elif len(segment) > 1 or hasattr(module, 'batch') or hasattr(module, 'stage'):
+        stages = [pipeline.make_stage(clean_config, corpustools_config, step) for step in segment]
+        return pipeline.run_segment(clean_config, stages, keep_steps(clean_config))
+    elif hasattr(module, 'predicate'):
+        return predicate_clean(clean_config, segment[0], module.predicate)
+    else:
+        module.run(clean_config, corpustools_config, segment[0])
+        return None
 
 
 def predicate_clean(clean_config, step, predicate):   # pylint: disable=I0011,R0914
@@ -247,26 +533,26 @@ def predicate_clean(clean_config, step, predicate):   # pylint: disable=I0011,R0
     filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
     filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(ext))
 
-    infp = codecs.open(filename, 'r', encoding="UTF-8")
-    outfp = codecs.open(filename_ext, 'w', encoding="UTF-8")
+    infp = bitextio.BitextReader(filename)
+    outfp = bitextio.BitextWriter(filename_ext)
 
-    lineno = 0
-    droplines = 0
+    # the stage counts and logs the dropped lines.
+    stage = pipeline.PredicateStage(step, predicate)
 
     # Don't use built-in function zip(). Use the iterator version izip() to avoid the MemoryError.
     for line in infp:
-        lineno = lineno + 1
-        if not predicate(line, step):
+        stage.lines = stage.lines + 1
+        [source, target] = line.split(u'\t')
+        if stage.process(source, target) is not None:
             outfp.write(line)
         else:
-            droplines = droplines + 1
-            if "log" in step and step["log"] == "lineno":
-                step["logger"].info("Line {ln}".format(ln=lineno))
+            stage.drops = stage.drops + 1
 
-    logging.info("Totally {drop} lines are removed in step of {step}".format(drop=droplines, step=step["name"]))
+    stage.finish()
 
     infp.close()
     outfp.close()
+    return [stage.stats()]
 
 
 if __name__ == "__main__":
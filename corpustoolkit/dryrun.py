@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+
+# pylint: disable=I0011,C0301
+
+"""
+Dry Run Module
+
+Try the clean steps on a sample of corpus, to develop the rules of steps without a full run. The sample
+is drawn in one pass over the corpus, a random reservoir sample or the first pairs. The steps run in
+memory on the sample, no file is written. The report shows the pairs dropped and modified by every
+step as a diff, the drop rates, and the time of a full run extrapolated from the time of steps on the
+sample and the time of the sampling pass.
+"""
+
+from itertools import islice, izip
+import logging
+import random
+import time
+
+from corpustoolkit import bitextio
+from corpustoolkit import pipeline
+from corpustoolkit import rulestats
+
+# seed of the random sample, the same corpus gives the same sample in every dry run.
+SEED = 1
+
+
+def reservoir_sample(lines, size, rng=None):
+    """Draw a random sample of lines in one pass by reservoir sampling.
+
+    Return a tuple (sample, total), sample is a list of (lineno, line) in the order of lines,
+    total is the number of lines.
+
+    """
+    rng = random.Random(SEED) if rng is None else rng
+    sample = []
+    total = 0
+    for total, line in enumerate(lines, 1):
+        if total <= size:
+            sample.append((total, line))
+        else:
+            index = rng.randrange(total)
+            if index < size:
+                sample[index] = (total, line)
+    sample.sort()
+    return (sample, total)
+
+
+def first_sample(lines, size):
+    """Take the first lines as sample, count the rest. Return a tuple (sample, total) as reservoir_sample()."""
+    lines = iter(lines)
+    sample = list(islice(enumerate(lines, 1), size))
+    total = len(sample)
+    for _ in lines:
+        total = total + 1
+    return (sample, total)
+
+
+def run_sample(stages, pairs):
+    """Run the stages on the sample one after another.
+
+    :param stages:      list of stages.
+    :param pairs:       list of (lineno, (source, target)).
+
+    Return a list of changes for every stage, a change is a tuple (lineno, pair, result) where result
+    is None if the pair is dropped.
+
+    """
+    timer = time.time
+    changes = []
+    for stage in stages:
+        stage_changes = []
+        kept = []
+        for start in xrange(0, len(pairs), pipeline.BATCH_SIZE):
+            batch = pairs[start:start + pipeline.BATCH_SIZE]
+            begin = timer()
+            results = stage.process_batch([pair for _, pair in batch])
+            stage.seconds = stage.seconds + timer() - begin
+
+            for (lineno, pair), result in izip(batch, results):
+                if result is None:
+                    stage.drops = stage.drops + 1
+                    stage_changes.append((lineno, pair, None))
+                    continue
+                if result[0] != pair[0] or result[1] != pair[1]:
+                    stage.modified = stage.modified + 1
+                    stage_changes.append((lineno, pair, result))
+                kept.append((lineno, result))
+        stage.close()
+        stage.finish()
+        changes.append(stage_changes)
+        pairs = kept
+    return changes
+
+
+def null_logger(ext):
+    """Return a logger of step which drops the logs, the changes of step are shown in the diff."""
+    logger = logging.getLogger("dryrun." + ext)
+    logger.propagate = False
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def percent(part, whole):
+    return 100.0 * part / whole if whole > 0 else 0.0
+
+
+def summary(stats, size, total, read_seconds):
+    """Return the table of drop rates and extrapolated time of steps as a list of lines."""
+    scale = float(total) / size if size > 0 else 0.0
+    header = "{:<12} {:>9} {:>9} {:>7} {:>9} {:>7} {:>9} {:>11} {:>12}".format(
+        "step", "lines in", "dropped", "drop%", "modified", "mod%", "sample(s)", "lines/s", "est. full(s)")
+    lines = [header, "-" * len(header)]
+    estimated = 0.0
+    for ext, stat in stats:
+        seconds = stat["seconds"]
+        estimated = estimated + seconds * scale
+        lines.append("{:<12} {:>9d} {:>9d} {:>7.1f} {:>9d} {:>7.1f} {:>9.3f} {:>11} {:>12.2f}".format(
+            ext[:12], stat["lines_in"], stat["lines_dropped"], percent(stat["lines_dropped"], stat["lines_in"]),
+            stat["lines_modified"], percent(stat["lines_modified"], stat["lines_in"]), seconds,
+            format(stat["lines_in"] / seconds, ".0f") if seconds > 0 else "-", seconds * scale))
+    lines.append("-" * len(header))
+    lines_out = stats[-1][1]["lines_out"] if stats else size
+    lines.append("Sampled {size} of {total} pairs, {out} pairs left ({rate:.1f}%), about {full:.0f} pairs in a full run.".format(
+        size=size, total=total, out=lines_out, rate=percent(lines_out, size), full=lines_out * scale))
+    lines.append("Estimated full run: {steps:.2f}s in steps, plus {read:.2f}s to read the corpus in every pass.".format(
+        steps=estimated, read=read_seconds))
+    return lines
+
+
+def diff(ext, changes):
+    """Return the diff of pairs changed by a step as a list of lines."""
+    lines = ["=== {ext}: {dropped} dropped, {modified} modified".format(
+        ext=ext, dropped=sum(1 for change in changes if change[2] is None),
+        modified=sum(1 for change in changes if change[2] is not None))]
+    for lineno, pair, result in changes:
+        lines.append(u"- Line {ln}: {source} ||| {target}".format(ln=lineno, source=pair[0], target=pair[1]))
+        if result is not None:
+            lines.append(u"+ Line {ln}: {source} ||| {target}".format(ln=lineno, source=result[0], target=result[1]))
+    return lines
+
+
+def dry_run(corpustools_config, clean_config, filename):
+    """Run the clean steps on a sample of the corpus file, return the report as a list of lines.
+
+    The steps must be able to run as stages. The line numbers in the report are the line numbers in corpus.
+
+    """
+    start = time.time()
+    infp = bitextio.BitextReader(filename)
+    if clean_config.sample_first:
+        (sample, total) = first_sample(infp, clean_config.dry_run)
+    else:
+        (sample, total) = reservoir_sample(infp, clean_config.dry_run)
+    infp.close()
+    read_seconds = time.time() - start
+
+    steps = clean_config.steps
+    for step in steps:
+        step["logger"] = null_logger(step["ext"])
+    stages = [pipeline.make_stage(clean_config, corpustools_config, step) for step in steps]
+    changes = run_sample(stages, [(lineno, bitextio.split_line(line)) for lineno, line in sample])
+    stats = [(stage.step["ext"], stage.stats()) for stage in stages]
+
+    lines = ["Dry run on {kind} {size} pairs.".format(
+        kind="the first" if clean_config.sample_first else "a random sample of", size=len(sample))]
+    lines.extend(summary(stats, len(sample), total, read_seconds))
+    for (ext, stat), stage_changes in zip(stats, changes):
+        lines.append("")
+        lines.extend(diff(ext, stage_changes))
+        if "rules" in stat:
+            lines.extend(rulestats.report(ext, stat["rules"], clean_config.top_rules))
+    return lines
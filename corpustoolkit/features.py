@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Line Features Module
+
+The features of a pair of sentences are the cheap facts which a clean step needs to change the pair,
+e.g. a '<' for html tags or a '#{' for zstring escape sequences. They are kept in a bitmask computed
+once per pair by the pipeline, and computed again only when a step changes the pair.
+
+A clean module declares the features which trigger the step by triggers(step). The pipeline passes the
+pairs without any of them through the step unchanged, the step is not called for them.
+"""
+
+import re
+
+LT = 1          # '<' of html tags.
+AMP = 2         # '&' of xml and html entities.
+ZSTRING = 4     # '#{' of zstring escape sequences.
+CARET_Q = 8     # '^Q' of zstring quotation mark.
+SCHEME = 16     # '://' of urls.
+DOMAIN = 32     # '.' followed by an ASCII letter or digit, of domain names and ip addresses.
+BREAK = 64      # line breaks, which splitlines() splits the sentence at.
+EDGE = 128      # leading or trailing whitespace, which strip() removes.
+
+ALL = LT | AMP | ZSTRING | CARET_Q | SCHEME | DOMAIN | BREAK | EDGE
+
+# features found as substrings.
+SUBSTRINGS = [(u'<', LT), (u'&', AMP), (u'#{', ZSTRING), (u'^Q', CARET_Q), (u'://', SCHEME)]
+
+DOMAIN_PATTERN = re.compile(ur'\.[0-9A-Za-z]')
+BREAK_PATTERN = re.compile(u'[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+
+def line_features(line, wanted=ALL):
+    """Return the bitmask of features of a sentence, only the wanted features are looked for."""
+    mask = 0
+    for substring, feature in SUBSTRINGS:
+        if feature & wanted and substring in line:
+            mask = mask | feature
+    if DOMAIN & wanted and DOMAIN_PATTERN.search(line):
+        mask = mask | DOMAIN
+    if BREAK & wanted and BREAK_PATTERN.search(line):
+        mask = mask | BREAK
+    if EDGE & wanted and (line[:1].isspace() or line[-1:].isspace()):
+        mask = mask | EDGE
+    return mask
+
+
+def pair_features(source, target, wanted=ALL):
+    """Return the bitmask of features of a pair of sentences.
+
+    The features but EDGE are looked for in the sentences joined by a tab, which no feature contains.
+
+    """
+    mask = line_features(source + u'\t' + target, wanted & ~EDGE)
+    if EDGE & wanted and (source[:1].isspace() or source[-1:].isspace() or target[:1].isspace() or target[-1:].isspace()):
+        mask = mask | EDGE
+    return mask
+
+
+def literal_features(literal, ignore_case=False):
+    """Return the features found in every sentence containing the literal.
+
+    If the literal is matched ignoring case, the features containing letters are not counted.
+
+    """
+    mask = 0
+    for substring, feature in SUBSTRINGS:
+        if substring in literal and not (ignore_case and any(char.isalpha() for char in substring)):
+            mask = mask | feature
+    return mask
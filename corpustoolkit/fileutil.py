@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+File Utility Module
+
+Manage the corpus files in working directory without copying the content if possible.
+
+Files are shared with hard links, or cloned with reflinks on filesystems which support
+copy-on-write (btrfs, xfs). The content is copied only if neither is possible, e.g. across
+filesystems. The destination is always replaced by an atomic rename.
+
+Since a file may share its content with other links, never write a file in place. Remove
+it first (see remove()) and write a new one.
+"""
+
+import errno
+import fcntl
+import os
+import os.path
+import shutil
+
+# ioctl request number of FICLONE in linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# errors of os.link() which mean hard link is not possible, then fall back to copy.
+LINK_ERRORS = (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EOPNOTSUPP, errno.EACCES)
+
+
+def remove(filename):
+    """Remove the file if it exists."""
+    try:
+        os.remove(filename)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def temp_filename(filename):
+    """Return a temporary filename next to filename."""
+    return "{filename}.{pid}.tmp".format(filename=filename, pid=os.getpid())
+
+
+def reflink(src, dst):
+    """Clone src into dst by reflink, return False if filesystem doesn't support it."""
+    try:
+        with open(src, 'rb') as srcfp:
+            with open(dst, 'wb') as dstfp:
+                fcntl.ioctl(dstfp.fileno(), FICLONE, srcfp.fileno())
+    except (IOError, OSError):
+        remove(dst)
+        return False
+    return True
+
+
+def copy(src, dst):
+    """Copy src to dst, use reflink if possible. dst is replaced atomically.
+
+    dst can be a directory, the file is copied into that directory.
+
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    tmpname = temp_filename(dst)
+    remove(tmpname)
+    if not reflink(src, tmpname):
+        shutil.copyfile(src, tmpname)
+    os.rename(tmpname, dst)
+
+
+def link(src, dst):
+    """Make dst have the same content as src, hard link if possible, otherwise copy. dst is replaced atomically.
+
+    dst can be a directory, the file is linked into that directory.
+
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    if not hasattr(os, "link"):
+        copy(src, dst)
+        return
+
+    tmpname = temp_filename(dst)
+    remove(tmpname)
+    try:
+        os.link(src, tmpname)
+    except OSError as e:
+        if e.errno not in LINK_ERRORS:
+            raise
+        copy(src, dst)
+        return
+    os.rename(tmpname, dst)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Length Filter Module
+
+Evaluate the length constraints of a batch of pairs at once. The numbers of tokens of the sources and
+targets in the batch are counted into two arrays, a constraint maps them to a mask whose item is True
+for the pair to drop. The length is the number of tokens split by space, as len(sentence.split(' ')).
+
+The arrays are numpy arrays and the masks are evaluated by numpy operations if numpy is installed,
+otherwise they are lists and evaluated item by item.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def token_counts(sentences):
+    """Return the array of numbers of tokens of sentences."""
+    counts = [sentence.count(u' ') + 1 for sentence in sentences]
+    return numpy.array(counts, dtype=numpy.int64) if numpy is not None else counts
+
+
+def limit_mask(counts, low, high):
+    """Return the mask of counts out of the range [low, high]."""
+    if numpy is not None:
+        return (counts < low) | (counts > high)
+    return [count < low or count > high for count in counts]
+
+
+def diff_mask(source_counts, target_counts, diff):
+    """Return the mask of pairs whose distance of counts is greater than diff."""
+    if numpy is not None:
+        return numpy.abs(source_counts - target_counts) > diff
+    return [abs(len_s - len_t) > diff for len_s, len_t in zip(source_counts, target_counts)]
+
+
+def ratio_mask(source_counts, target_counts, ratio):
+    """Return the mask of pairs whose ratio of the larger count to the smaller one is greater than ratio."""
+    if numpy is not None:
+        larger = numpy.maximum(source_counts, target_counts).astype(numpy.float64)
+        return larger / numpy.minimum(source_counts, target_counts) > ratio
+    return [float(max(len_s, len_t)) / min(len_s, len_t) > ratio for len_s, len_t in zip(source_counts, target_counts)]
+
+
+def any_mask(masks):
+    """Return the mask of pairs which are True in any of masks."""
+    if numpy is not None:
+        return numpy.logical_or.reduce(masks)
+    return [any(items) for items in zip(*masks)]
+
+
+def drop_indexes(mask):
+    """Return the indexes of the pairs to drop in mask."""
+    if numpy is not None:
+        return numpy.flatnonzero(mask).tolist()
+    return [index for index, drop in enumerate(mask) if drop]
+
+
+class LengthFilter(object):
+    """Batch function dropping the pairs which violate any of the length constraints.
+
+    A constraint is a function which accepts the arrays of source counts and target counts
+    and returns the mask of pairs to drop.
+    """
+    def __init__(self, constraints):
+        self.constraints = constraints
+
+    def drops(self, pairs):
+        """Return the indexes of the pairs to drop in the list of pairs."""
+        if not pairs or not self.constraints:
+            return []
+        source_counts = token_counts([source for source, _ in pairs])
+        target_counts = token_counts([target for _, target in pairs])
+        masks = [constraint(source_counts, target_counts) for constraint in self.constraints]
+        return drop_indexes(masks[0] if len(masks) == 1 else any_mask(masks))
+
+    def __call__(self, pairs):
+        results = list(pairs)
+        for index in self.drops(pairs):
+            results[index] = None
+        return results
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Line Index Module
+
+Build a sidecar index of a bitext file in one pass, which keeps the facts of every line as columns of
+typed arrays: the byte offset of line, the numbers of tokens and characters of source and target, and
+the hash of line content. The tools read the columns instead of reading and tokenizing the file again,
+e.g. the columns of token counts can be passed to the masks of lengths, a shard planner can find the
+line boundaries by the offsets.
+
+The index is the file <bitext file>.lidx, a header followed by the columns, every column is a little
+endian array aligned to 8 bytes. The index is memory-mapped on read, a column is a numpy memmap if numpy
+is installed, otherwise a list. The header keeps the size and mtime of the bitext file and the first bytes
+of its last line, an index is out of date if they are changed (see LineIndex.is_fresh).
+
+The lines are counted in the same way as bitextio reads them, the tokens are split by space as lengths
+does. The offsets of a compressed file are the offsets in the decompressed content.
+
+Command line syntax::
+
+    Usage: lineindex.py [options] bitext_file
+
+    Options:
+      --version             show program's version number and exit
+      -h, --help            show this help message and exit
+      -f, --force           rebuild the index even if it is up to date
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from optparse import OptionParser
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from corpustoolkit import bitextio
+from corpustoolkit import fileutil
+
+__version__ = 1.0
+__years__ = "2013"
+__author__ = "Leo Jiang <leo.jiang.dev@gmail.com>"
+
+SUFFIX = ".lidx"
+MAGIC = b'CTKLIDX1'
+
+# magic, number of lines, size of (decompressed) content, size and mtime of bitext file,
+# the first bytes of last line.
+HEADER = struct.Struct('<8sQQQd16s')
+HEADER_SIZE = 64
+
+# number of the bytes of last line kept in header.
+TAIL_SIZE = 16
+
+# columns: (name, struct format of item).
+COLUMNS = [("offset", 'Q'),
+           ("source_tokens", 'I'),
+           ("target_tokens", 'I'),
+           ("source_chars", 'I'),
+           ("target_chars", 'I'),
+           ("hash", 'Q')]
+
+NUMPY_TYPES = {'Q': '<u8', 'I': '<u4'}
+
+
+def index_filename(filename):
+    """Return the filename of the index of bitext file."""
+    return filename + SUFFIX
+
+
+def line_hash(line):
+    """Return the 64 bits hash of the content of line, the line terminator is excluded."""
+    return struct.unpack('<Q', hashlib.sha1(line.rstrip(u'\r\n').encode('UTF-8')).digest()[:8])[0]
+
+
+def column_positions(lines):
+    """Return a dict of the byte positions of columns in an index of lines."""
+    positions = {}
+    position = HEADER_SIZE
+    for name, fmt in COLUMNS:
+        positions[name] = position
+        position = position + (lines * struct.calcsize(fmt) + 7) // 8 * 8
+    return positions
+
+
+def build_index(filename):
+    """Build the index of bitext file in one pass, return the filename of index.
+
+    The index is written into a temporary file and renamed, a reader never sees a partial index.
+
+    """
+    stat = os.stat(filename)
+    columns = dict((name, []) for name, fmt in COLUMNS)     # pylint: disable=I0011,W0612
+    offsets = columns["offset"]
+    source_tokens = columns["source_tokens"]
+    target_tokens = columns["target_tokens"]
+    source_chars = columns["source_chars"]
+    target_chars = columns["target_chars"]
+    hashes = columns["hash"]
+    offset = 0
+    tail = b''
+    with bitextio.BitextReader(filename) as infp:
+        for line in infp:
+            (source, target) = bitextio.split_line(line)
+            offsets.append(offset)
+            source_tokens.append(source.count(u' ') + 1)
+            target_tokens.append(target.count(u' ') + 1)
+            source_chars.append(len(source))
+            target_chars.append(len(target))
+            hashes.append(line_hash(line))
+            data = line.encode('UTF-8')
+            tail = data[:TAIL_SIZE]
+            offset = offset + len(data)
+
+    lines = len(offsets)
+    idxname = index_filename(filename)
+    tmpname = fileutil.temp_filename(idxname)
+    with open(tmpname, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, lines, offset, stat.st_size, stat.st_mtime, tail).ljust(HEADER_SIZE, b'\0'))
+        # the columns are written in order, every one is padded to 8 bytes as column_positions().
+        for name, fmt in COLUMNS:
+            data = struct.pack('<{n}{fmt}'.format(n=lines, fmt=fmt), *columns[name])
+            fp.write(data.ljust((len(data) + 7) // 8 * 8, b'\0'))
+    os.rename(tmpname, idxname)
+    return idxname
+
+
+def load_index(filename):
+    """Return the LineIndex of bitext file, None if the index doesn't exist or is out of date."""
+    idxname = index_filename(filename)
+    if not os.path.isfile(idxname):
+        return None
+    index = LineIndex(idxname)
+    if not index.is_fresh(filename):
+        index.close()
+        return None
+    return index
+
+
+class LineIndex(object):
+    """The memory-mapped index of a bitext file.
+
+    :param filename:    the filename of index.
+
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.fp = open(filename, 'rb')
+        self.map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.lines, self.size, self.file_size, self.mtime, self.tail) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise IOError("Invalid line index: {}".format(filename))
+        self.positions = column_positions(self.lines)
+        self.formats = dict(COLUMNS)
+
+    def __len__(self):
+        return self.lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def is_fresh(self, filename):
+        """Return True if the index is up to date with bitext file.
+
+        A stale index is detected by st_size and st_mtime of file, and for an uncompressed file by the
+        first bytes at the offset of last line. A file rewritten in place with the same size and mtime
+        and the same bytes there is taken as unchanged, its offsets may be no longer line boundaries.
+
+        """
+        stat = os.stat(filename)
+        if stat.st_size != self.file_size or stat.st_mtime != self.mtime:
+            return False
+        if self.lines == 0 or bitextio.compression(filename) is not None:
+            return True
+        with open(filename, 'rb') as fp:
+            fp.seek(self.value("offset", self.lines - 1))
+            # the last line runs to the end of file, the bytes read are padded as struct pads them.
+            return fp.read(TAIL_SIZE).ljust(TAIL_SIZE, b'\0') == self.tail
+
+    def column(self, name):
+        """Return the column of all lines, a numpy array if numpy is installed, otherwise a list."""
+        fmt = self.formats[name]
+        if numpy is not None:
+            if self.lines == 0:
+                return numpy.zeros(0, dtype=NUMPY_TYPES[fmt])
+            return numpy.memmap(self.filename, dtype=NUMPY_TYPES[fmt], mode='r',
+                                offset=self.positions[name], shape=(self.lines,))
+        return list(struct.unpack_from('<{n}{fmt}'.format(n=self.lines, fmt=fmt), self.map, self.positions[name]))
+
+    def value(self, name, index):
+        """Return the item of column of the line at index, index is zero-based."""
+        if not 0 <= index < self.lines:
+            raise IndexError("line index out of range")
+        fmt = self.formats[name]
+        return struct.unpack_from('<' + fmt, self.map, self.positions[name] + index * struct.calcsize(fmt))[0]
+
+    def next_line(self, pos):
+        """Return the offset of the first line starting at or after byte pos, the content size if none."""
+        (low, high) = (0, self.lines)
+        while low < high:
+            mid = (low + high) // 2
+            if self.value("offset", mid) < pos:
+                low = mid + 1
+            else:
+                high = mid
+        return self.value("offset", low) if low < self.lines else self.size
+
+    def line_span(self, index):
+        """Return the byte range (start, end) of the line at index."""
+        end = self.value("offset", index + 1) if index + 1 < self.lines else self.size
+        return (self.value("offset", index), end)
+
+    def close(self):
+        self.map.close()
+        self.fp.close()
+
+
+def main(argv):
+    usage = "Usage: %prog [options] bitext_file"
+    version = "%prog {version} (c) {years} {author}".format(version=__version__,
+                                                            years=__years__,
+                                                            author=__author__
+                                                            )
+    parser = OptionParser(usage=usage, version=version)
+    parser.add_option("-f", "--force", dest="force", action="store_true", default=False,
+                      help="rebuild the index even if it is up to date")
+    (options, args) = parser.parse_args(argv[1:])
+    if len(args) != 1:
+        parser.error("Too few/many arguments. Expected 1")
+
+    filename = os.path.abspath(os.path.expanduser(args[0]))
+    if not os.path.isfile(filename):
+        parser.error("Invalid bitext file: {}".format(args[0]))
+
+    index = None if options.force else load_index(filename)
+    if index is None:
+        build_index(filename)
+        index = load_index(filename)
+    print "{name}: {lines} lines".format(name=index_filename(filename), lines=len(index))
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
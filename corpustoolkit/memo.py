@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Memo Module
+
+Localization corpora are repetitive, the same pair of sentences shows up many times. A step whose
+result depends on the pair only, and which writes no log, can keep the results of recent pairs in
+a memo and return the result of a repeated pair without cleaning it again.
+
+A clean module declares such steps by deterministic(step). A step asks for the memo with the key
+"memo" in its config, the size cap of memo in MB, e.g. {"name": "html", "ext": "html", "memo": 64}.
+The memo is in memory of the process running the step, the least recently used pairs are evicted
+when its estimated size is beyond the cap. The rule statistics of regex and url steps count the pairs
+cleaned, not the pairs found in memo.
+"""
+
+from collections import OrderedDict
+import sys
+
+# returned by get() if the key is not in memo.
+MISSING = object()
+
+# estimated bytes of an entry besides its strings: the ordered dict slot and link, the tuples.
+ENTRY_OVERHEAD = 240
+
+
+def entry_size(key, value):
+    """Return the estimated size of an entry, key and value are pairs of sentences or None."""
+    size = ENTRY_OVERHEAD + sys.getsizeof(key[0]) + sys.getsizeof(key[1])
+    if value is not None:
+        size = size + sys.getsizeof(value[0]) + sys.getsizeof(value[1])
+    return size
+
+
+class LRUMemo(object):
+    """A size capped memo of pairs, evicted in least recently used order."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the value of key and mark it as recently used, MISSING if the key is not in memo."""
+        value = self.entries.pop(key, MISSING)
+        if value is MISSING:
+            self.misses = self.misses + 1
+            return MISSING
+        self.entries[key] = value
+        self.hits = self.hits + 1
+        return value
+
+    def put(self, key, value):
+        """Put the value of key, evict the least recently used entries if memo is beyond the cap."""
+        size = entry_size(key, value)
+        if size > self.capacity:
+            return
+        self.entries[key] = value
+        self.size = self.size + size
+        while self.size > self.capacity:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.size = self.size - entry_size(old_key, old_value)
+            self.evictions = self.evictions + 1
+
+    def stats(self):
+        """Return the statistic data of memo."""
+        return {"memo_hits": self.hits, "memo_misses": self.misses, "memo_evictions": self.evictions}
+
+
+def hit_rate(stats):
+    """Return the hit rate of memo in stats of stage, None if there is no lookup."""
+    lookups = stats["memo_hits"] + stats["memo_misses"]
+    return float(stats["memo_hits"]) / lookups if lookups > 0 else None
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301,W0603
+
+"""
+Parallel Pipeline Module
+
+Run a segment of clean steps on shards of the corpus in a process pool.
+
+The bitext file is split into line-aligned byte ranges, every shard is pushed through
+its own copy of the stages in a worker process. The shard outputs are merged back in
+original order. Line numbers in the step logs are relative to the shard in the workers,
+they are shifted by the number of lines the stage had seen in the previous shards when
+the logs are merged, so the merged logs are the same as the logs of a sequential run.
+"""
+
+import multiprocessing
+import os
+import os.path
+import re
+import shutil
+
+from corpustoolkit import bitextio
+from corpustoolkit import lineindex
+from corpustoolkit import pipeline
+from corpustoolkit import rulestats
+
+# The number of shards for each worker, more shards give a better load balance.
+SHARDS_PER_JOB = 4
+
+# The shard is not smaller than this size.
+MIN_SHARD_SIZE = 1 << 20
+
+LINENO_PATTERN = re.compile(r'^Line (\d+)')
+
+# The job shared with worker processes, set before forking the pool.
+_job = None
+
+
+class ShardLogger(object):
+    """Collect the step log of a shard. The file is created when the first message is logged."""
+    def __init__(self, filename):
+        self.filename = filename
+        self.fp = None
+
+    def info(self, msg):
+        if self.fp is None:
+            self.fp = open(self.filename, 'w')
+        if isinstance(msg, unicode):
+            msg = msg.encode('utf-8')
+        self.fp.write(msg + '\n')
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+
+
+def plan_shards(filename, nshards):
+    """Split the file into at most nshards line-aligned byte ranges, return a list of (start, end).
+
+    The line boundaries are looked up in the line index of file if it is up to date (see lineindex).
+    The index is trusted as LineIndex.is_fresh() does, a file rewritten in place with the same size,
+    mtime and last line bytes would be split at stale boundaries.
+
+    """
+    size = os.path.getsize(filename)
+    offsets = [0]
+    index = lineindex.load_index(filename)
+    with open(filename, 'rb') as fp:
+        for i in range(1, nshards):
+            pos = size * i // nshards
+            if pos <= offsets[-1]:
+                continue
+            if index is not None:
+                pos = index.next_line(pos)
+            else:
+                # move to the beginning of next line, unless pos is at the beginning of a line.
+                fp.seek(pos - 1)
+                fp.readline()
+                pos = fp.tell()
+            if offsets[-1] < pos < size:
+                offsets.append(pos)
+    if index is not None:
+        index.close()
+    offsets.append(size)
+    return zip(offsets[:-1], offsets[1:])
+
+
+def shard_filename(filename, index):
+    """Return the filename of a shard part of file."""
+    return "{filename}.shard{index:04d}".format(filename=filename, index=index)
+
+
+def _run_shard(shard):
+    """Worker function: run the stages on a shard, return the stats of each stage."""
+    index, start, end = shard
+    clean_config, corpustools_config, steps, keep_steps = _job
+
+    working_dir = clean_config.working_dir
+    loggers = [ShardLogger(shard_filename(os.path.join(working_dir, step["ext"] + '.log'), index))
+               for step in steps]
+    steps = [dict(step, logger=logger) for step, logger in zip(steps, loggers)]
+    stages = [pipeline.make_stage(clean_config, corpustools_config, step) for step in steps]
+
+    outfps = []
+    for i, step in enumerate(steps):
+        if keep_steps or i == len(steps) - 1:
+            filename_ext = os.path.join(working_dir, clean_config.corpus_filename(step["ext"]))
+            outfps.append(bitextio.BitextWriter(shard_filename(filename_ext, index)))
+        else:
+            outfps.append(None)
+
+    infp = bitextio.BitextReader(os.path.join(working_dir, clean_config.corpus_filename()), start, end)
+    pipeline.run_stages(infp, stages, outfps)
+    infp.close()
+    for stage in stages:
+        stage.close()
+
+    for outfp in outfps:
+        if outfp is not None:
+            outfp.close()
+    for logger in loggers:
+        logger.close()
+
+    return [stage.stats() for stage in stages]
+
+
+def merge_log(filename, nshards, offsets):
+    """Merge the shard logs into log file, shift the line numbers with the offsets of shards."""
+    outfp = None
+    for index in range(nshards):
+        part = shard_filename(filename, index)
+        if not os.path.exists(part):
+            continue
+        if outfp is None:
+            outfp = open(filename, 'w')
+        with open(part, 'r') as infp:
+            for line in infp:
+                match = LINENO_PATTERN.match(line)
+                if match is not None:
+                    lineno = int(match.group(1)) + offsets[index]
+                    line = "Line {ln}".format(ln=lineno) + line[match.end():]
+                outfp.write(line)
+        os.remove(part)
+    if outfp is not None:
+        outfp.close()
+
+
+def merge_file(filename, nshards):
+    """Concatenate the shard parts into file."""
+    with open(filename, 'wb') as outfp:
+        for index in range(nshards):
+            part = shard_filename(filename, index)
+            with open(part, 'rb') as infp:
+                shutil.copyfileobj(infp, outfp, 1 << 20)
+            os.remove(part)
+
+
+def run_segment(clean_config, corpustools_config, steps, jobs, keep_steps=True):
+    """Run the steps on the corpus file in working directory with a pool of jobs worker processes.
+
+    The output files are the same as pipeline.run_segment(). Return the stats of stages summed over shards.
+
+    """
+    global _job
+    working_dir = clean_config.working_dir
+    filename = os.path.join(working_dir, clean_config.corpus_filename())
+    size = os.path.getsize(filename)
+    nshards = max(1, min(jobs * SHARDS_PER_JOB, size // MIN_SHARD_SIZE))
+    shards = [(index, start, end) for index, (start, end) in enumerate(plan_shards(filename, nshards))]
+    nshards = len(shards)
+
+    _job = (clean_config, corpustools_config, steps, keep_steps)
+    pool = multiprocessing.Pool(jobs)
+    try:
+        results = pool.map(_run_shard, shards)
+    finally:
+        pool.close()
+        pool.join()
+        _job = None
+
+    stats = []
+    for i, step in enumerate(steps):
+        stats.append(dict((key, sum(result[i][key] for result in results)) for key in results[0][i] if key != "rules"))
+        if "rules" in results[0][i]:
+            stats[i]["rules"] = rulestats.merge([result[i]["rules"] for result in results])
+        if keep_steps or i == len(steps) - 1:
+            merge_file(os.path.join(working_dir, clean_config.corpus_filename(step["ext"])), nshards)
+
+        # the line number in shard log is relative to the lines which the stage had seen in this shard.
+        offsets = [0]
+        for result in results[:-1]:
+            offsets.append(offsets[-1] + result[i]["lines_in"])
+        merge_log(os.path.join(working_dir, step["ext"] + '.log'), nshards, offsets)
+
+        if pipeline.is_predicate(step) or pipeline.is_batch(step):
+            pipeline.log_drops(step, stats[i]["lines_dropped"])
+    return stats
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Clean Pipeline Module
+
+Chain the clean steps as in-memory stages over one stream of (source, target) pairs,
+so a run of steps reads the corpus once and writes it once.
+
+A clean module can take part in the pipeline in one of three ways:
+    - batch(clean_config, corpustools_config, step): return a function which accepts
+      a list of pairs (source, target) and returns a list of the same length, every item
+      is the cleaned pair or None if the pair is dropped.
+    - predicate(source, target, step): the pair is dropped if predicate returns True.
+    - stage(clean_config, corpustools_config, step): return a function which accepts
+      a pair (source, target) and returns the cleaned pair.
+
+The pairs are pushed through the stages in batches, predicate and stage functions are adapted
+to batches by the stages. If the stage function is a method of a clean object which keeps the
+statistics of its rules in rule_stats (see rulestats), they are added into the stats of stage.
+If the clean object has close(), e.g. to write its asynchronous log, it's called by close() of stage
+when the pass is done.
+
+A module may also provide triggers(step), which returns the features of pairs (see features) the step
+needs to change a pair. The features of every pair are computed once, the pairs without any trigger of
+a stage are passed through the stage unchanged, its function is not called for them.
+
+A module may declare by deterministic(step) that the result of step depends on the pair only and the
+step writes no log. Such a step may keep the results of recent pairs in a memo (see memo), the stage
+returns the result of a repeated pair from memo without calling its function.
+
+Modules which only provide run() own their file loop, they can't be fused with other steps.
+"""
+
+from itertools import islice, izip
+import logging
+import os
+import os.path
+import sys
+import time
+
+from corpustoolkit import bitextio
+from corpustoolkit import features
+from corpustoolkit import memo
+
+# number of pairs in a batch.
+BATCH_SIZE = 1024
+
+
+def import_module(step):
+    """Import and return the clean module of step."""
+    module_name = "corpustoolkit.cleantools." + step["name"]
+    __import__(module_name)
+    return sys.modules[module_name]
+
+
+def is_predicate(step):
+    """Return True if the step is a predicate clean."""
+    return hasattr(import_module(step), "predicate")
+
+
+def is_batch(step):
+    """Return True if the step is a batch clean."""
+    return hasattr(import_module(step), "batch")
+
+
+def is_fusable(step):
+    """Return True if the step can run as an in-memory stage."""
+    module = import_module(step)
+    return hasattr(module, "batch") or hasattr(module, "predicate") or hasattr(module, "stage")
+
+
+def segments(steps, fuse):
+    """Split the clean steps into segments, every segment is run in one pass over the corpus.
+
+    Consecutive fusable steps are put into one segment if fuse is True, otherwise every step is a segment
+    by itself, except that consecutive predicate steps are always put into one segment. A predicate step
+    only drops pairs, the pairs dropped by a step never reach the following steps, so the steps run in
+    their order in one pass drop and log the same lines as they do in a pass each.
+
+    """
+    result = []
+    for step in steps:
+        if len(result) > 0 and (fuse and is_fusable(step) and is_fusable(result[-1][-1]) or
+                                is_predicate(step) and is_predicate(result[-1][-1])):
+            result[-1].append(step)
+        else:
+            result.append([step])
+    return result
+
+
+def log_drops(step, drops):
+    """Log the number of lines dropped by a step into the main log."""
+    logging.info("Totally {drop} lines are removed in step of {step}".format(drop=drops, step=step["name"]))
+
+
+class Stage(object):
+    """A clean step running on (source, target) pairs.
+
+    The pipeline counts the pairs passed into stage, the pairs dropped and the pairs modified by stage,
+    and measures the time spent in stage. The pairs skipped for lack of triggers are counted as passed.
+    If the step has a memo, the pairs found in memo are counted as passed too.
+
+    """
+    def __init__(self, step, func):
+        self.step = step
+        self.func = func
+        self.memo = memo.LRUMemo(step["memo"] << 20) if "memo" in step else None
+        self.triggers = 0
+        self.lines = 0
+        self.skipped = 0
+        self.drops = 0
+        self.modified = 0
+        self.seconds = 0.0
+
+    def process(self, source, target):
+        """Return the cleaned pair, or None if the pair is dropped."""
+        if self.memo is None:
+            return self.func(source, target)
+        key = (source, target)
+        result = self.memo.get(key)
+        if result is memo.MISSING:
+            result = self.func(source, target)
+            self.memo.put(key, result)
+        else:
+            self.count_owner_lines(1)
+        return result
+
+    def process_batch(self, pairs):
+        """Return the list of cleaned pairs, None for the pair dropped."""
+        results = []
+        for source, target in pairs:
+            self.lines = self.lines + 1
+            results.append(self.process(source, target))
+        return results
+
+    def process_masked(self, pairs, masks):
+        """Return the list of cleaned pairs as process_batch(), the pairs whose features have none of
+        the triggers are passed unchanged."""
+        results = []
+        start = 0
+        while start < len(pairs):
+            end = start
+            while end < len(pairs) and masks[end] & self.triggers:
+                end = end + 1
+            if end > start:
+                results.extend(self.process_batch(pairs[start:end]))
+            start = end
+            while end < len(pairs) and not masks[end] & self.triggers:
+                end = end + 1
+            if end > start:
+                self.skip(end - start)
+                results.extend(pairs[start:end])
+            start = end
+        return results
+
+    def skip(self, count):
+        """Count the pairs passed for lack of triggers."""
+        self.lines = self.lines + count
+        self.skipped = self.skipped + count
+        self.count_owner_lines(count)
+
+    def count_owner_lines(self, count):
+        """Count the pairs passed without calling the function into the line number of clean object."""
+        owner = getattr(self.func, "__self__", None)
+        if owner is not None and hasattr(owner, "lineno"):
+            owner.lineno = owner.lineno + count
+
+    def close(self):
+        """Called after the last pair has passed through the stage, close the clean object."""
+        close = getattr(getattr(self.func, "__self__", None), "close", None)
+        if close is not None:
+            close()
+
+    def finish(self):
+        """Called after the stage is closed, in the process running the step."""
+        pass
+
+    def stats(self):
+        """Return the statistic data of stage."""
+        stats = {"lines_in": self.lines,
+                 "lines_out": self.lines - self.drops,
+                 "lines_dropped": self.drops,
+                 "lines_modified": self.modified,
+                 "lines_skipped": self.skipped,
+                 "seconds": self.seconds}
+        if self.memo is not None:
+            stats.update(self.memo.stats())
+        rules = getattr(getattr(self.func, "__self__", None), "rule_stats", None)
+        if rules is not None:
+            stats["rules"] = [rule.as_dict() for rule in rules]
+        return stats
+
+
+class PredicateStage(Stage):
+    """Adapter of predicate function, drop the pair if predicate is True."""
+    def __init__(self, step, predicate):
+        Stage.__init__(self, step, predicate)
+        self.log_lineno = "log" in step and step["log"] == "lineno"
+
+    def process(self, source, target):
+        if not self.func(source, target, self.step):
+            return (source, target)
+        if self.log_lineno:
+            self.step["logger"].info("Line {ln}".format(ln=self.lines))
+        return None
+
+    def finish(self):
+        log_drops(self.step, self.drops)
+
+
+class BatchStage(Stage):
+    """Adapter of batch function."""
+    def __init__(self, step, func):
+        Stage.__init__(self, step, func)
+        self.log_lineno = "log" in step and step["log"] == "lineno"
+
+    def process(self, source, target):
+        return self.func([(source, target)])[0]
+
+    def process_batch(self, pairs):
+        lineno = self.lines
+        self.lines = self.lines + len(pairs)
+        results = self.func(pairs)
+        if self.log_lineno:
+            for result in results:
+                lineno = lineno + 1
+                if result is None:
+                    self.step["logger"].info("Line {ln}".format(ln=lineno))
+        return results
+
+    def finish(self):
+        log_drops(self.step, self.drops)
+
+
+def make_stage(clean_config, corpustools_config, step):
+    """Return the stage of clean step, or None if the module can't run as a stage."""
+    module = import_module(step)
+    if hasattr(module, "batch"):
+        stage = BatchStage(step, module.batch(clean_config, corpustools_config, step))
+    elif hasattr(module, "predicate"):
+        stage = PredicateStage(step, module.predicate)
+    elif hasattr(module, "stage"):
+        stage = Stage(step, module.stage(clean_config, corpustools_config, step))
+    else:
+        return None
+    if hasattr(module, "triggers"):
+        stage.triggers = module.triggers(step)
+    return stage
+
+
+def run_stages(infp, stages, outfps, batch_size=BATCH_SIZE):
+    """Push every line of infp through the stages in batches.
+
+    :param infp:        input bitext file object, or any iterable of lines.
+    :param stages:      list of stages.
+    :param outfps:      list of output file objects, one for each stage. The output of a stage
+                        is written into its file, None if the output of that stage is not kept.
+                        The file of last stage must be given.
+    :param batch_size:  number of pairs in a batch.
+
+    The features of pairs are computed at the first stage with triggers, its time is counted into
+    that stage, and computed again for the pairs changed by later stages.
+
+    """
+    timer = time.time
+    wanted = 0
+    for stage in stages:
+        wanted = wanted | stage.triggers
+    lines = iter(infp)
+    while True:
+        pairs = [bitextio.split_line(line) for line in islice(lines, batch_size)]
+        if not pairs:
+            break
+        masks = None
+        for i, stage in enumerate(stages):
+            start = timer()
+            if stage.triggers:
+                if masks is None:
+                    masks = [features.pair_features(source, target, wanted) for source, target in pairs]
+                results = stage.process_masked(pairs, masks)
+            else:
+                results = stage.process_batch(pairs)
+            stage.seconds = stage.seconds + timer() - start
+
+            kept = []
+            kept_masks = []
+            for index, (pair, result) in enumerate(izip(pairs, results)):
+                if result is None:
+                    stage.drops = stage.drops + 1
+                    continue
+                if result[0] != pair[0] or result[1] != pair[1]:
+                    stage.modified = stage.modified + 1
+                    if masks is not None:
+                        kept_masks.append(features.pair_features(result[0], result[1], wanted))
+                elif masks is not None:
+                    kept_masks.append(masks[index])
+                kept.append(result)
+            pairs = kept
+            masks = kept_masks if masks is not None else None
+
+            if outfps[i] is not None:
+                outfps[i].write(u''.join([bitextio.join_pair(source, target) for source, target in pairs]))
+            if not pairs:
+                break
+
+
+def run_segment(clean_config, stages, keep_steps=True):
+    """Run the stages in one pass on the corpus file in working directory, return the stats of stages.
+
+    The result is written into the corpus file with ext of the last step. The results of other
+    steps are written into their own files if keep_steps is True.
+
+    """
+    filename = os.path.join(clean_config.working_dir, clean_config.corpus_filename())
+    infp = bitextio.BitextReader(filename)
+    outfps = []
+    for i, stage in enumerate(stages):
+        if keep_steps or i == len(stages) - 1:
+            filename_ext = os.path.join(clean_config.working_dir, clean_config.corpus_filename(stage.step["ext"]))
+            outfps.append(bitextio.BitextWriter(filename_ext))
+        else:
+            outfps.append(None)
+
+    run_stages(infp, stages, outfps)
+    for stage in stages:
+        stage.close()
+        stage.finish()
+
+    infp.close()
+    for outfp in outfps:
+        if outfp is not None:
+            outfp.close()
+    return [stage.stats() for stage in stages]
+
+
+def run_step(clean_config, corpustools_config, step):
+    """Run a single step as stage on files, the entry function run() of stage modules."""
+    return run_segment(clean_config, [make_stage(clean_config, corpustools_config, step)])
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Clean Report Module
+
+Collect the performance data of every clean step: wall and CPU time, lines/sec, bytes in and out,
+lines dropped or modified and peak RSS. The report is dumped into a JSON file and summarized in
+a table at the end of the run.
+
+The steps fused into one pass share the wall and CPU time of the pass. The time of each fused step
+is measured around its batches, the CPU time of the pass is split among the steps in proportion
+to their time.
+"""
+
+import json
+import os
+import resource
+import time
+
+from corpustoolkit import memo
+
+
+def cpu_seconds():
+    """Return the CPU time of the process and its finished children."""
+    times = os.times()
+    return times[0] + times[1] + times[2] + times[3]
+
+
+def peak_rss():
+    """Return the peak resident set size of the process and its children in KB."""
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def file_size(filename):
+    """Return the size of file, None if the file doesn't exist."""
+    return os.path.getsize(filename) if os.path.isfile(filename) else None
+
+
+class CleanReport(object):
+    """Performance report of a clean run."""
+    def __init__(self):
+        self.steps = []
+        self.start_time = time.time()
+        self.start_cpu = cpu_seconds()
+        self.segment_time = None
+        self.segment_cpu = None
+
+    def skip_step(self, step):
+        """Record the step whose result is reused from step cache."""
+        self.steps.append({"name": step["name"], "ext": step["ext"], "description": step["description"],
+                           "cached": True})
+
+    def start_segment(self):
+        self.segment_time = time.time()
+        self.segment_cpu = cpu_seconds()
+
+    def end_segment(self, segment, stats, bytes_in, bytes_out):
+        """Record the steps of a segment.
+
+        :param segment:     list of steps.
+        :param stats:       list of stats of stages, None if the steps are not run as stages.
+        :param bytes_in:    size of the input file of segment.
+        :param bytes_out:   list of the sizes of step output files, None if the file is not kept.
+
+        """
+        wall = time.time() - self.segment_time
+        cpu = cpu_seconds() - self.segment_cpu
+        rss = peak_rss()
+
+        if stats is None:
+            stats = [{} for step in segment]
+        if len(segment) == 1:
+            seconds = [wall]
+        else:
+            seconds = [stat["seconds"] for stat in stats]
+        total = sum(seconds)
+
+        for i, step in enumerate(segment):
+            share = seconds[i] / total if total > 0 else 1.0 / len(segment)
+            lines_in = stats[i].get("lines_in")
+            item = {"name": step["name"],
+                    "ext": step["ext"],
+                    "description": step["description"],
+                    "cached": False,
+                    "fused": len(segment) > 1,
+                    "wall_seconds": seconds[i],
+                    "cpu_seconds": cpu * share,
+                    "lines_in": lines_in,
+                    "lines_out": stats[i].get("lines_out"),
+                    "lines_dropped": stats[i].get("lines_dropped"),
+                    "lines_modified": stats[i].get("lines_modified"),
+                    "lines_per_second": lines_in / seconds[i] if lines_in is not None and seconds[i] > 0 else None,
+                    "bytes_in": bytes_in if i == 0 else bytes_out[i - 1],
+                    "bytes_out": bytes_out[i],
+                    "peak_rss_kb": rss
+                    }
+            if len(segment) > 1:
+                item["segment_wall_seconds"] = wall
+            if "rules" in stats[i]:
+                item["rules"] = stats[i]["rules"]
+            if "memo_hits" in stats[i]:
+                item["memo"] = {"hits": stats[i]["memo_hits"],
+                                "misses": stats[i]["memo_misses"],
+                                "evictions": stats[i]["memo_evictions"],
+                                "hit_rate": memo.hit_rate(stats[i])}
+            self.steps.append(item)
+
+    def total(self):
+        return {"wall_seconds": time.time() - self.start_time,
+                "cpu_seconds": cpu_seconds() - self.start_cpu,
+                "peak_rss_kb": peak_rss()}
+
+    def dump(self, filename):
+        """Write the report into a JSON file."""
+        with open(filename, 'w') as fp:
+            json.dump({"steps": self.steps, "total": self.total()}, fp, indent=2, sort_keys=True)
+
+    def summary(self):
+        """Return the summary table of report as a list of lines."""
+        def fmt(value, spec):
+            return "-" if value is None else format(value, spec)
+
+        def mb(value):
+            return None if value is None else value / 1048576.0
+
+        header = "{:<12} {:>9} {:>9} {:>11} {:>11} {:>10} {:>10} {:>9} {:>9} {:>9}".format(
+            "step", "wall(s)", "cpu(s)", "lines in", "lines/s", "dropped", "modified", "MB in", "MB out", "RSS(MB)")
+        lines = [header, "-" * len(header)]
+        for item in self.steps:
+            if item["cached"]:
+                lines.append("{:<12} {}".format(item["ext"][:12], "(cached)"))
+                continue
+            lines.append("{:<12} {:>9} {:>9} {:>11} {:>11} {:>10} {:>10} {:>9} {:>9} {:>9}".format(
+                item["ext"][:12] + ("*" if item["fused"] else ""),
+                fmt(item["wall_seconds"], ".2f"),
+                fmt(item["cpu_seconds"], ".2f"),
+                fmt(item["lines_in"], "d"),
+                fmt(item["lines_per_second"], ".0f"),
+                fmt(item["lines_dropped"], "d"),
+                fmt(item["lines_modified"], "d"),
+                fmt(mb(item["bytes_in"]), ".1f"),
+                fmt(mb(item["bytes_out"]), ".1f"),
+                fmt(item["peak_rss_kb"] / 1024.0, ".1f")))
+        total = self.total()
+        lines.append("-" * len(header))
+        lines.append("{:<12} {:>9} {:>9}".format("total",
+                                                 fmt(total["wall_seconds"], ".2f"),
+                                                 fmt(total["cpu_seconds"], ".2f")))
+        if any(item.get("fused") for item in self.steps):
+            lines.append("* fused step, time measured inside the shared pass.")
+        for item in self.steps:
+            if "memo" in item:
+                lines.append("memo of {ext}: {hits} hits, {misses} misses, hit rate {rate}, {evictions} evicted.".format(
+                    ext=item["ext"], hits=item["memo"]["hits"], misses=item["memo"]["misses"],
+                    rate=fmt(item["memo"]["hit_rate"], ".1%"), evictions=item["memo"]["evictions"]))
+        return lines
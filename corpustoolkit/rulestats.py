@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+
+# pylint: disable=I0011,C0301
+
+"""
+Rule Statistics Module
+
+Keep the statistics of every rule of the rule based cleans (regex, url): the sentences examined,
+the sentences matched and deleted, and the time spent in rule. The statistics are returned in the
+stats of stage, summed over shards, and reported at the end of step, with the dead rules which never
+matched and the most expensive rules, so that the rule files can be pruned and reordered.
+
+Timing every rule costs, so the statistics are only kept if asked in clean config.
+"""
+
+import time
+
+
+class RuleStats(object):
+    """Statistics of a rule."""
+    def __init__(self, description, pattern):
+        self.description = description
+        self.pattern = pattern
+        self.examined = 0
+        self.matched = 0
+        self.deleted = 0
+        self.seconds = 0.0
+
+    def counted(self, clean):
+        """Return a function cleaning the sentence with clean and counting into the statistics.
+
+        clean returns the sentence itself if the rule doesn't match, as sub of re does.
+        """
+        timer = time.time
+
+        def counted_clean(sentence):
+            start = timer()
+            cleaned = clean(sentence)
+            self.seconds = self.seconds + timer() - start
+            self.examined = self.examined + 1
+            if cleaned is not sentence:
+                self.matched = self.matched + 1
+                if len(cleaned.strip()) == 0:
+                    self.deleted = self.deleted + 1
+            return cleaned
+        return counted_clean
+
+    def as_dict(self):
+        return {"description": self.description,
+                "pattern": self.pattern,
+                "examined": self.examined,
+                "matched": self.matched,
+                "deleted": self.deleted,
+                "seconds": self.seconds}
+
+
+def merge(rule_lists):
+    """Sum the lists of rule statistics (dicts) of shards, return a list of rule statistics."""
+    merged = [dict(rule) for rule in rule_lists[0]]
+    for rules in rule_lists[1:]:
+        for total, rule in zip(merged, rules):
+            for key in ("examined", "matched", "deleted", "seconds"):
+                total[key] = total[key] + rule[key]
+    return merged
+
+
+def report(ext, rules, top=None):
+    """Return the report of rule statistics as a list of lines.
+
+    :param ext:     ext name of step.
+    :param rules:   list of rule statistics (dicts) in the order of rules.
+    :param top:     list the dead rules and the top most expensive rules, None for not.
+
+    """
+    def name(index, rule):
+        return u"#{index} {desc}: {pattern}".format(index=index + 1, desc=rule["description"], pattern=rule["pattern"])
+
+    lines = [u"Rule statistics of step {ext}:".format(ext=ext),
+             u"{:>6} {:>10} {:>10} {:>10} {:>10}  {}".format("rule", "examined", "matched", "deleted", "time(ms)", "description")]
+    for index, rule in enumerate(rules):
+        lines.append(u"{:>6} {:>10d} {:>10d} {:>10d} {:>10.1f}  {}".format(
+            "#" + str(index + 1), rule["examined"], rule["matched"], rule["deleted"], rule["seconds"] * 1000,
+            rule["description"]))
+
+    if top is not None:
+        dead = [(index, rule) for index, rule in enumerate(rules) if rule["matched"] == 0]
+        lines.append(u"Dead rules, never matched: {count}".format(count=len(dead)))
+        lines.extend(u"    " + name(index, rule) for index, rule in dead)
+
+        expensive = sorted(enumerate(rules), key=lambda item: item[1]["seconds"], reverse=True)[:top]
+        lines.append(u"Top {count} expensive rules:".format(count=len(expensive)))
+        lines.extend(u"    {ms:.1f}ms ".format(ms=rule["seconds"] * 1000) + name(index, rule)
+                     for index, rule in expensive)
+    return lines
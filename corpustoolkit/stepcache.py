@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0301
+
+"""
+Step Cache Module
+
+Cache the output of clean steps in working directory, so a re-run of a clean plan can skip
+the steps whose input and config are unchanged.
+
+The output of a step is keyed on the content of its input and the step itself. The key of
+the first step is derived from the hash of the corpus file, the key of every following step
+is derived from the key of previous step, so only the original corpus is hashed. The key
+covers the JSON config of step and the version of clean module.
+
+Cache entries are evicted in least recently used order when the total size is beyond the cap.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import os.path
+import shutil
+
+from corpustoolkit import fileutil
+from corpustoolkit import pipeline
+
+BLOCK_SIZE = 1 << 20
+
+# The file to remember the hash of input files, keyed on path, size and mtime.
+INPUTS_FILENAME = "inputs.json"
+
+
+def file_hash(filename):
+    """Return the sha1 hex digest of file content."""
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as fp:
+        block = fp.read(BLOCK_SIZE)
+        while block:
+            sha1.update(block)
+            block = fp.read(BLOCK_SIZE)
+    return sha1.hexdigest()
+
+
+def module_version(step):
+    """Return the version of clean module, __version__ or the hash of module source."""
+    module = pipeline.import_module(step)
+    if hasattr(module, "__version__"):
+        return str(module.__version__)
+    filename = module.__file__
+    if filename.endswith(".pyc") or filename.endswith(".pyo"):
+        filename = filename[:-1]
+    return file_hash(filename)
+
+
+def step_config(step):
+    """Return the JSON config of step, the runtime properties and the memo which doesn't change the output are excluded."""
+    config = dict((key, value) for key, value in step.iteritems() if key not in ("logger", "memo"))
+    return json.dumps(config, sort_keys=True)
+
+
+def step_keys(input_key, steps):
+    """Return a list of the keys of step outputs."""
+    keys = []
+    key = input_key
+    for step in steps:
+        sha1 = hashlib.sha1()
+        sha1.update(key)
+        sha1.update(step_config(step).encode('utf-8'))
+        sha1.update(module_version(step))
+        key = sha1.hexdigest()
+        keys.append(key)
+    return keys
+
+
+class StepCache(object):
+    """A size capped cache of step outputs in a directory.
+
+    Every entry is a bitext file named with its key, and the step log if any.
+    The mtime of entry is updated when it is used, the entry with the oldest mtime is evicted first.
+
+    """
+    def __init__(self, directory, max_size):
+        """
+        :param directory:   cache directory, created if not exists.
+        :param max_size:    max total size of the cache in bytes.
+
+        """
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def entry(self, key, suffix="bitext"):
+        return os.path.join(self.directory, key + '.' + suffix)
+
+    def input_key(self, filename):
+        """Return the hash of input file, reuse the hash computed before if the file is unchanged."""
+        stat = os.stat(filename)
+        signature = [os.path.realpath(filename), stat.st_size, stat.st_mtime]
+        inputs_filename = os.path.join(self.directory, INPUTS_FILENAME)
+        inputs = {}
+        if os.path.isfile(inputs_filename):
+            try:
+                with open(inputs_filename, 'r') as fp:
+                    inputs = json.load(fp)
+            except ValueError:
+                inputs = {}
+        for item in inputs.get("files", []):
+            if item["signature"] == signature:
+                return str(item["hash"])
+
+        key = file_hash(filename)
+        files = [item for item in inputs.get("files", []) if item["signature"][0] != signature[0]]
+        files.append({"signature": signature, "hash": key})
+        with open(inputs_filename, 'w') as fp:
+            json.dump({"files": files}, fp)
+        return key
+
+    def contains(self, key):
+        return os.path.isfile(self.entry(key))
+
+    def lookup(self, keys):
+        """Return the number of leading steps which can be skipped, i.e. the position of last cached key + 1."""
+        for i in range(len(keys), 0, -1):
+            if self.contains(keys[i - 1]):
+                return i
+        return 0
+
+    def restore(self, key, filename, logfilename):
+        """Link the cached output into filename, and copy the cached log into logfilename if any."""
+        fileutil.link(self.entry(key), filename)
+        os.utime(self.entry(key), None)
+        if os.path.isfile(self.entry(key, "log")):
+            shutil.copy(self.entry(key, "log"), logfilename)
+
+    def store(self, key, filename, logfilename):
+        """Store the step output and its log into cache, then evict the old entries.
+
+        The output is linked into cache. The log is copied, because the step logger writes the log in place.
+
+        """
+        fileutil.link(filename, self.entry(key))
+        if os.path.isfile(logfilename):
+            shutil.copy(logfilename, self.entry(key, "log"))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache size is under the cap."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".bitext"):
+                continue
+            key = name[:-len(".bitext")]
+            files = [self.entry(key), self.entry(key, "log")]
+            size = sum(os.path.getsize(f) for f in files if os.path.isfile(f))
+            entries.append((os.path.getmtime(self.entry(key)), size, files))
+            total = total + size
+
+        entries.sort()
+        for mtime, size, files in entries:          # pylint: disable=I0011,W0612
+            if total <= self.max_size:
+                break
+            for f in files:
+                if os.path.isfile(f):
+                    os.remove(f)
+            total = total - size
+            logging.info("Evict step cache entry {name}".format(name=os.path.basename(files[0])))
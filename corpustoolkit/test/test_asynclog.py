@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+from nose.tools import raises
+
+from corpustoolkit import asynclog
+
+
+class ListLogger(object):
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message)
+
+
+class FailLogger(object):
+    def info(self, message):
+        raise IOError("disk full")
+
+
+class TestAsyncLog():
+    def setup(self):
+        self.logger = ListLogger()
+
+    def teardown(self):
+        pass
+
+    def test_format_record(self):
+        assert asynclog.format_record(u"plain") == u"plain"
+        record = (u"Line {ln}: Desc={desc}: {match}", 3, "tag", u"caf\xe9")
+        assert asynclog.format_record(record) == u"Line 3: Desc=tag: caf\xe9"
+
+    def test_flush_without_thread(self):
+        log = asynclog.AsyncLog(self.logger)
+        log.info("a")
+        log.append((u"Line {ln}", 1, None, None))
+        assert self.logger.messages == []
+        log.close()
+        assert log.thread is None
+        assert self.logger.messages == [u"a\nLine 1"]
+
+    def test_bulk_in_order(self):
+        log = asynclog.AsyncLog(self.logger, batch_size=4, queue_size=2)
+        for i in range(10):
+            log.append((u"Line {ln}", i, None, None))
+        log.close()
+        assert self.logger.messages == [u"Line 0\nLine 1\nLine 2\nLine 3",
+                                        u"Line 4\nLine 5\nLine 6\nLine 7",
+                                        u"Line 8\nLine 9"]
+
+    def test_not_bulk(self):
+        log = asynclog.AsyncLog(self.logger, bulk=False, batch_size=4)
+        for i in range(10):
+            log.append((u"Line {ln}", i, None, None))
+        log.close()
+        assert self.logger.messages == [u"Line %d" % i for i in range(10)]
+
+    @raises(IOError)
+    def test_writer_error(self):
+        log = asynclog.AsyncLog(FailLogger(), batch_size=2)
+        for i in range(10):
+            log.append((u"Line {ln}", i, None, None))
+        log.close()
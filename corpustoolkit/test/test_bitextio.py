@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import io
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import bitextio
+
+
+class TestBitextIO():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "corpus.en-fr.bitext")
+        self.text = u"one\tun\r\ntwo \tdeux\nété\tété\nlast\tdernier"
+        with open(self.filename, 'wb') as fp:
+            fp.write(self.text.encode('UTF-8'))
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_split_line(self):
+        assert bitextio.split_line(u"a b\tc\r\n") == (u"a b", u"c")
+
+    def test_lines_as_codecs(self):
+        expected = self.text.splitlines(True)
+        for blocksize in [1, 2, 3, 7, 1 << 20]:
+            reader = bitextio.BitextReader(self.filename, blocksize=blocksize)
+            assert list(reader) == expected
+            reader.close()
+
+    def test_range(self):
+        start = len(u"one\tun\r\n")
+        end = len(u"one\tun\r\ntwo \tdeux\n".encode('UTF-8'))
+        with bitextio.BitextReader(self.filename, start, end, blocksize=4) as reader:
+            assert list(reader) == [u"two ", u"\tdeux\n"]
+
+    def test_pairs(self):
+        reader = bitextio.BitextReader(io.BytesIO(u"a\tb\nc\td\r\n".encode('UTF-8')))
+        assert list(reader.pairs()) == [(u"a", u"b"), (u"c", u"d")]
+
+    def test_writer(self):
+        fp = io.BytesIO()
+        writer = bitextio.BitextWriter(fp, bufsize=8)
+        writer.write_pair(u"été", u"summer")
+        assert fp.getvalue() == u"été\tsummer".encode('UTF-8') + os.linesep
+        writer.write(u"a\tb")
+        assert fp.getvalue().endswith(os.linesep)
+        writer.close()
+        assert fp.getvalue().endswith(b"a\tb")
+
+    def test_split_suffix(self):
+        assert bitextio.split_suffix("a.en-fr.bitext.gz") == ("a.en-fr.bitext", "gz")
+        assert bitextio.split_suffix("a.tmx.xz") == ("a.tmx", "xz")
+        assert bitextio.split_suffix("a.en-fr.bitext") == ("a.en-fr.bitext", None)
+
+    def test_compressed_roundtrip(self):
+        for fmt in ["gz", "bz2"]:
+            filename = self.filename + "." + fmt
+            with bitextio.BitextWriter(filename) as writer:
+                writer.write(self.text)
+            assert bitextio.compression(filename) == fmt
+            with bitextio.BitextReader(filename, blocksize=3) as reader:
+                assert list(reader) == self.text.splitlines(True)
+
+    def test_convert_file(self):
+        filename = self.filename + ".gz"
+        bitextio.convert_file(self.filename, filename)
+        assert bitextio.compression(filename) == "gz"
+        # detected by magic bytes, not by name.
+        bitextio.convert_file(filename, self.filename + ".copy")
+        with open(self.filename + ".copy", 'rb') as fp:
+            assert fp.read().decode('UTF-8') == self.text
+        assert bitextio.compression(self.filename) is None
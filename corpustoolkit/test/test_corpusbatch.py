@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import json
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import corpusbatch
+from corpustoolkit import corpusclean
+
+
+class TestCorpusBatch():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for name in ["a.en-fr.bitext", "b.en-de.bitext.gz", "a.en-fr.clean.bitext", "notes.txt"]:
+            open(os.path.join(self.tmpdir, name), 'w').close()
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_parse_corpus_filename(self):
+        assert corpusclean.parse_corpus_filename("a.en-fr.bitext") == ("a", "en-fr", None)
+        assert corpusclean.parse_corpus_filename("a.en-fr.bitext.xz") == ("a", "en-fr", "xz")
+        assert corpusclean.parse_corpus_filename("a.en-fr.clean.bitext") is None
+        assert corpusclean.parse_corpus_filename("a.enfr.bitext") is None
+
+    def test_list_corpora_dir(self):
+        corpora = corpusbatch.list_corpora(self.tmpdir)
+        assert corpora == [os.path.join(self.tmpdir, "a.en-fr.bitext"), os.path.join(self.tmpdir, "b.en-de.bitext.gz")]
+
+    def test_list_corpora_manifest(self):
+        manifest = os.path.join(self.tmpdir, "list.txt")
+        with open(manifest, 'w') as fp:
+            fp.write("# corpora\n\na.en-fr.bitext\n/data/c.en-fr.bitext\n")
+        corpora = corpusbatch.list_corpora(manifest)
+        assert corpora == [os.path.join(self.tmpdir, "a.en-fr.bitext"), "/data/c.en-fr.bitext"]
+
+    def test_summary(self):
+        results = [{"corpus": "a", "status": "ok", "seconds": 1.0, "lines_in": 3, "lines_out": 2, "error": None},
+                   {"corpus": "b", "status": "failed", "seconds": 0.0, "lines_in": None, "lines_out": None,
+                    "error": "Traceback:\nValueError: bad line\n"}]
+        lines = corpusbatch.summary(results)
+        assert lines[4].strip() == "ValueError: bad line"
+        assert lines[-1] == "1 succeeded, 1 failed."
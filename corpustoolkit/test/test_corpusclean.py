@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import raises
+
+from corpustoolkit import corpusclean
+from corpustoolkit.config.corpustools import CorpusToolsConfig
+from corpustoolkit.config.corpusclean import CorpusCleanConfig
+
+
+class TestNoBackup():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "c.en-fr.bitext")
+        self.content = b"one two\tun deux\none\tun deux trois quatre\n"
+        with open(self.filename, 'wb') as fp:
+            fp.write(self.content)
+        self.steps_filename = os.path.join(self.tmpdir, "steps.json")
+        with open(self.steps_filename, 'w') as fp:
+            json.dump([{"name": "length_diff", "ext": "ldiff", "description": "length diff", "diff": 1}], fp)
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_corpus(self):
+        with open(self.filename, 'rb') as fp:
+            return fp.read()
+
+    def test_no_backup_without_working_dir(self):
+        try:
+            corpusclean.main(["corpusclean", "--no-backup", self.filename, self.steps_filename])
+        except SystemExit as e:
+            assert e.code != 0
+        else:
+            assert False, "--no-backup without -w should be refused."
+        assert self.read_corpus() == self.content
+
+    def test_no_backup_with_working_dir(self):
+        working_dir = os.path.join(self.tmpdir, "work")
+        os.mkdir(working_dir)
+        corpusclean.main(["corpusclean", "--no-backup", "-w", working_dir, self.filename, self.steps_filename])
+        assert self.read_corpus() == self.content
+        assert not os.path.exists(os.path.join(working_dir, "c.en-fr.orig.bitext"))
+        with open(os.path.join(self.tmpdir, "c.en-fr.clean.bitext"), 'rb') as fp:
+            assert fp.read() == b"one two\tun deux\n"
+
+    @raises(IOError)
+    def test_clean_corpus_in_place(self):
+        clean_config = CorpusCleanConfig()
+        clean_config.infile_dir = self.tmpdir
+        clean_config.working_dir = self.tmpdir
+        clean_config.backup = False
+        clean_config.corpus_name = "c"
+        (clean_config.source_lang, clean_config.target_lang) = ("en", "fr")
+        corpusclean.clean_corpus(CorpusToolsConfig(), clean_config)
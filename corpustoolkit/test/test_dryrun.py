@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import io
+import os.path
+import random
+import shutil
+import tempfile
+
+from corpustoolkit import dryrun
+from corpustoolkit import pipeline
+from corpustoolkit.config.corpusclean import CorpusCleanConfig
+
+
+class TestDryRun():
+    def setup(self):
+        self.lines = [u"line {}\tligne {}\n".format(i, i) for i in range(1, 101)]
+        self.steps = [{"name": "regex", "ext": "re", "description": "regex clean",
+                       "list": [{"description": "todo", "action": "delete_line", "pattern": u"\\bTODO\\b"},
+                                {"description": "number", "action": "replace", "pattern": u"(\\d+)", "repl": u"<\\1>"}]},
+                      {"name": "length_limit", "ext": "len", "description": "length limit", "source": [1, 3]}
+                      ]
+        self.tempdir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_reservoir_sample(self):
+        (sample, total) = dryrun.reservoir_sample(iter(self.lines), 10, random.Random(7))
+        assert total == 100
+        assert len(sample) == 10
+        assert [lineno for lineno, _ in sample] == sorted(set(lineno for lineno, _ in sample))
+        assert all(self.lines[lineno - 1] == line for lineno, line in sample)
+        # the same seed gives the same sample.
+        assert dryrun.reservoir_sample(iter(self.lines), 10, random.Random(7))[0] == sample
+
+    def test_reservoir_sample_small_corpus(self):
+        (sample, total) = dryrun.reservoir_sample(iter(self.lines[:3]), 10)
+        assert total == 3
+        assert sample == list(enumerate(self.lines[:3], 1))
+
+    def test_first_sample(self):
+        (sample, total) = dryrun.first_sample(iter(self.lines), 2)
+        assert total == 100
+        assert sample == [(1, self.lines[0]), (2, self.lines[1])]
+
+    def test_run_sample(self):
+        for step in self.steps:
+            step["logger"] = dryrun.null_logger(step["ext"])
+        stages = [pipeline.make_stage(None, None, step) for step in self.steps]
+        pairs = [(3, (u"a TODO", u"b")), (8, (u"c 1", u"d")), (9, (u"e", u"f")), (12, (u"g h i j", u"k"))]
+        changes = dryrun.run_sample(stages, pairs)
+        assert changes[0] == [(3, (u"a TODO", u"b"), (u"", u"b")), (8, (u"c 1", u"d"), (u"c <1>", u"d"))]
+        assert changes[1] == [(12, (u"g h i j", u"k"), None)]
+        assert [stage.stats()["lines_in"] for stage in stages] == [4, 4]
+        assert stages[0].modified == 2 and stages[1].drops == 1
+
+    def test_dry_run(self):
+        filename = os.path.join(self.tempdir, "corpus.en-fr.bitext")
+        with io.open(filename, 'w', encoding='utf-8') as fp:
+            fp.write(u"".join(self.lines))
+        clean_config = CorpusCleanConfig()
+        clean_config.steps = self.steps
+        clean_config.dry_run = 5
+        clean_config.sample_first = True
+        lines = dryrun.dry_run(None, clean_config, filename)
+        assert lines[0] == "Dry run on the first 5 pairs."
+        assert "Sampled 5 of 100 pairs, 5 pairs left (100.0%), about 100 pairs in a full run." in lines
+        assert "=== re: 0 dropped, 5 modified" in lines
+        assert u"+ Line 2: line <2> ||| ligne <2>" in lines
+        assert "=== len: 0 dropped, 0 modified" in lines
+        assert os.listdir(self.tempdir) == ["corpus.en-fr.bitext"]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+from corpustoolkit import features
+from corpustoolkit.features import LT, AMP, ZSTRING, CARET_Q, SCHEME, DOMAIN, BREAK, EDGE
+
+
+class TestFeatures():
+    def test_line_features(self):
+        assert features.line_features(u"plain text") == 0
+        assert features.line_features(u"<b>a</b> &amp; b") == LT | AMP
+        assert features.line_features(u"#{quot}a^Q") == ZSTRING | CARET_Q
+        assert features.line_features(u"see http://example") == SCHEME
+        assert features.line_features(u"www.example.com.") == DOMAIN
+        assert features.line_features(u"a\u2028b") == BREAK
+        assert features.line_features(u" a") == EDGE and features.line_features(u"a\u3000") == EDGE
+
+    def test_line_features_wanted(self):
+        assert features.line_features(u" <b>a.b</b>", LT | DOMAIN) == LT | DOMAIN
+
+    def test_break_edge_match_python(self):
+        for code in range(0x3001):
+            char = unichr(code)
+            line = u"a" + char + u"b"
+            assert bool(features.line_features(line) & BREAK) == (len(line.splitlines()) > 1)
+            assert bool(features.line_features(char) & EDGE) == (char.strip() == u"")
+
+    def test_pair_features(self):
+        assert features.pair_features(u"a <b>", u"b") == LT
+        assert features.pair_features(u"a", u"b ") == EDGE
+        assert features.pair_features(u"a.", u"b") == 0
+        assert features.pair_features(u"a", u"b", LT) == 0
+
+    def test_literal_features(self):
+        assert features.literal_features(u"&nbsp;") == AMP
+        assert features.literal_features(u"^Q") == CARET_Q
+        assert features.literal_features(u"^Q", True) == 0
+        assert features.literal_features(u"abc") == 0
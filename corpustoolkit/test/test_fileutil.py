@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import fileutil
+
+
+class TestFileUtil():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, "src")
+        with open(self.src, 'w') as fp:
+            fp.write("source\ttarget\n")
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read(self, filename):
+        with open(filename) as fp:
+            return fp.read()
+
+    def test_link(self):
+        dst = os.path.join(self.tmpdir, "dst")
+        fileutil.link(self.src, dst)
+        assert os.path.samefile(self.src, dst)
+
+    def test_link_into_directory(self):
+        subdir = os.path.join(self.tmpdir, "sub")
+        os.mkdir(subdir)
+        fileutil.link(self.src, subdir)
+        assert self.read(os.path.join(subdir, "src")) == "source\ttarget\n"
+
+    def test_link_replace(self):
+        dst = os.path.join(self.tmpdir, "dst")
+        with open(dst, 'w') as fp:
+            fp.write("old")
+        fileutil.link(self.src, dst)
+        assert self.read(dst) == "source\ttarget\n"
+        assert sorted(os.listdir(self.tmpdir)) == ["dst", "src"]
+
+    def test_copy(self):
+        dst = os.path.join(self.tmpdir, "dst")
+        fileutil.copy(self.src, dst)
+        assert not os.path.samefile(self.src, dst)
+        assert self.read(dst) == "source\ttarget\n"
+
+    def test_remove_missing(self):
+        fileutil.remove(os.path.join(self.tmpdir, "missing"))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+from corpustoolkit import lengths
+from corpustoolkit.cleantools import length_diff
+from corpustoolkit.cleantools import length_limit
+from corpustoolkit.cleantools import sentence_ratio
+
+
+PAIRS = [(u"a b c", u"x y z"),
+         (u"a", u"x y z w v u t s r q p"),
+         (u"a  b ", u"x"),
+         (u"", u"x y"),
+         (u"a b c d e f g h i j", u"x y")]
+
+STEPS = [(length_limit, {"name": "length_limit", "ext": "len", "source": [1, 4], "target": [2, 8]}),
+         (length_limit, {"name": "length_limit", "ext": "len", "target": [1, 3]}),
+         (length_diff, {"name": "length_diff", "ext": "ldiff", "diff": 2}),
+         (sentence_ratio, {"name": "sentence_ratio", "ext": "ratio", "ratio": 2.5})]
+
+
+class TestLengths():
+    def setup(self):
+        self.numpy = lengths.numpy
+
+    def teardown(self):
+        lengths.numpy = self.numpy
+
+    def check_batch_as_predicate(self):
+        for module, step in STEPS:
+            expected = [None if module.predicate(source, target, step) else (source, target) for source, target in PAIRS]
+            assert module.batch(None, None, step)(PAIRS) == expected
+
+    def test_token_counts(self):
+        counts = lengths.token_counts([source for source, _ in PAIRS])
+        assert list(counts) == [len(source.split(u' ')) for source, _ in PAIRS]
+
+    def test_masks(self):
+        source_counts = lengths.token_counts([u"a b c", u"a", u"a b c d e f"])
+        target_counts = lengths.token_counts([u"x y z", u"x y z w", u"x y"])
+        assert list(lengths.limit_mask(source_counts, 2, 5)) == [False, True, True]
+        assert list(lengths.diff_mask(source_counts, target_counts, 2)) == [False, True, True]
+        assert list(lengths.ratio_mask(source_counts, target_counts, 3)) == [False, True, False]
+        assert lengths.drop_indexes(lengths.any_mask([lengths.limit_mask(source_counts, 2, 5),
+                                                      lengths.ratio_mask(source_counts, target_counts, 3)])) == [1, 2]
+
+    def test_length_filter(self):
+        assert lengths.LengthFilter([])(PAIRS) == PAIRS
+        assert lengths.LengthFilter([lambda source_counts, target_counts: lengths.limit_mask(source_counts, 1, 2)]).drops(PAIRS) == [0, 2, 4]
+        assert lengths.LengthFilter([]).drops([]) == []
+
+    def test_batch_as_predicate(self):
+        self.check_batch_as_predicate()
+
+    def test_batch_as_predicate_without_numpy(self):
+        lengths.numpy = None
+        self.check_batch_as_predicate()
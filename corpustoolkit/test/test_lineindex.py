@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+import io
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import lengths
+from corpustoolkit import lineindex
+
+
+LINES = [u"a b c\tx y\n",
+         u"café\tcafé au lait\r\n",
+         u"\tx\n",
+         u"a  b\tx y z"]
+
+
+class TestLineIndex():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "corpus.en-fr.bitext")
+        with io.open(self.filename, 'w', encoding='UTF-8', newline='') as fp:
+            fp.write(u''.join(LINES))
+        self.numpy = lineindex.numpy
+
+    def teardown(self):
+        lineindex.numpy = self.numpy
+        shutil.rmtree(self.tmpdir)
+
+    def test_build_index(self):
+        lineindex.build_index(self.filename)
+        with lineindex.load_index(self.filename) as index:
+            assert len(index) == 4
+            assert list(index.column("offset")) == [0, 10, 31, 34]
+            assert list(index.column("source_tokens")) == [3, 1, 1, 3]
+            assert list(index.column("target_tokens")) == [2, 3, 1, 3]
+            assert list(index.column("source_chars")) == [5, 4, 0, 4]
+            assert list(index.column("target_chars")) == [3, 12, 1, 5]
+            assert index.value("hash", 0) == lineindex.line_hash(u"a b c\tx y")
+            assert index.value("hash", 2) != index.value("hash", 3)
+
+    def test_line_span(self):
+        lineindex.build_index(self.filename)
+        with open(self.filename, 'rb') as fp:
+            content = fp.read()
+        with lineindex.load_index(self.filename) as index:
+            spans = [index.line_span(i) for i in range(len(index))]
+            assert [content[start:end].decode('UTF-8') for start, end in spans] == LINES
+            assert index.next_line(0) == 0
+            assert index.next_line(11) == 31
+            assert index.next_line(35) == len(content)
+
+    def test_columns_as_lengths(self):
+        lineindex.numpy = None
+        lineindex.build_index(self.filename)
+        with lineindex.load_index(self.filename) as index:
+            mask = lengths.limit_mask(index.column("source_tokens"), 2, 3)
+            assert lengths.drop_indexes(mask) == [1, 2]
+
+    def test_out_of_date(self):
+        assert lineindex.load_index(self.filename) is None
+        lineindex.build_index(self.filename)
+        with open(self.filename, 'a') as fp:
+            fp.write("d\tw\n")
+        assert lineindex.load_index(self.filename) is None
+
+    def test_rewritten_in_place(self):
+        lineindex.build_index(self.filename)
+        stat = os.stat(self.filename)
+        with io.open(self.filename, 'w', encoding='UTF-8', newline='') as fp:
+            fp.write(u''.join(LINES[1:] + [LINES[0].rstrip(u'\n') + u'\n'])[:-1] + u'z')
+        os.utime(self.filename, (stat.st_atime, stat.st_mtime))
+        assert os.path.getsize(self.filename) == stat.st_size
+        assert lineindex.load_index(self.filename) is None
+
+    def test_empty_file(self):
+        open(self.filename, 'w').close()
+        lineindex.build_index(self.filename)
+        with lineindex.load_index(self.filename) as index:
+            assert len(index) == 0
+            assert list(index.column("offset")) == []
+            assert index.next_line(0) == 0
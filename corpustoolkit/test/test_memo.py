@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+# pylint: disable=I0011,C0111
+from corpustoolkit import memo
+
+
+class TestLRUMemo():
+    def setup(self):
+        self.size = memo.entry_size((u"a", u"b"), (u"a", u"b"))
+        self.memo = memo.LRUMemo(self.size * 2)
+
+    def test_get_put(self):
+        assert self.memo.get((u"a", u"b")) is memo.MISSING
+        self.memo.put((u"a", u"b"), (u"a", u"b"))
+        assert self.memo.get((u"a", u"b")) == (u"a", u"b")
+        assert self.memo.stats() == {"memo_hits": 1, "memo_misses": 1, "memo_evictions": 0}
+
+    def test_dropped_pair(self):
+        self.memo.put((u"a", u"b"), None)
+        assert self.memo.get((u"a", u"b")) is None
+
+    def test_evict_least_recently_used(self):
+        self.memo.put((u"a", u"b"), (u"a", u"b"))
+        self.memo.put((u"c", u"d"), (u"c", u"d"))
+        self.memo.get((u"a", u"b"))
+        self.memo.put((u"e", u"f"), (u"e", u"f"))
+        assert self.memo.get((u"c", u"d")) is memo.MISSING
+        assert self.memo.get((u"a", u"b")) == (u"a", u"b")
+        assert self.memo.evictions == 1 and self.memo.size == self.size * 2
+
+    def test_entry_beyond_cap(self):
+        self.memo.put((u"a" * 1000, u"b"), (u"a", u"b"))
+        assert len(self.memo.entries) == 0 and self.memo.size == 0
+
+    def test_hit_rate(self):
+        assert memo.hit_rate({"memo_hits": 3, "memo_misses": 1}) == 0.75
+        assert memo.hit_rate({"memo_hits": 0, "memo_misses": 0}) is None
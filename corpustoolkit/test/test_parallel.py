@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import lineindex
+from corpustoolkit import parallel
+
+
+class TestParallel():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "corpus.en-fr.bitext")
+        with open(self.filename, 'w') as fp:
+            for i in range(100):
+                fp.write("source {i}\ttarget {i}\n".format(i=i))
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_plan_shards(self):
+        shards = parallel.plan_shards(self.filename, 7)
+        assert shards[0][0] == 0
+        assert shards[-1][1] == os.path.getsize(self.filename)
+        with open(self.filename, 'rb') as fp:
+            for (start, end), (next_start, _) in zip(shards[:-1], shards[1:]):
+                assert end == next_start
+                fp.seek(start - 1 if start > 0 else 0)
+                assert start == 0 or fp.read(1) == '\n'
+
+    def test_plan_shards_with_index(self):
+        shards = parallel.plan_shards(self.filename, 7)
+        lineindex.build_index(self.filename)
+        assert parallel.plan_shards(self.filename, 7) == shards
+
+    def test_plan_shards_more_than_lines(self):
+        shards = parallel.plan_shards(self.filename, 1000)
+        assert len(shards) == 100
+
+    def test_merge_log(self):
+        logname = os.path.join(self.tmpdir, "re.log")
+        with open(parallel.shard_filename(logname, 0), 'w') as fp:
+            fp.write("Line 3: Desc=cdata: CDATA\n")
+        with open(parallel.shard_filename(logname, 2), 'w') as fp:
+            fp.write("Line 1: Desc=cdata: CDATA\nLine 5\n")
+        parallel.merge_log(logname, 3, [0, 10, 25])
+        with open(logname) as fp:
+            assert fp.read() == "Line 3: Desc=cdata: CDATA\nLine 26: Desc=cdata: CDATA\nLine 30\n"
+        assert not os.path.exists(parallel.shard_filename(logname, 0))
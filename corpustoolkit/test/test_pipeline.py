@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+
+import io
+from corpustoolkit import features
+from corpustoolkit import pipeline
+
+
+class TestPipeline():
+    def setup(self):
+        self.steps = [{"name": "html", "ext": "html"},
+                      {"name": "length_limit", "ext": "len", "source": [1, 3]},
+                      {"name": "zstring", "ext": "zstr"}
+                      ]
+
+    def test_segments_fuse(self):
+        segments = pipeline.segments(self.steps, True)
+        assert len(segments) == 1
+        assert [step["ext"] for step in segments[0]] == ["html", "len", "zstr"]
+
+    def test_segments_nofuse(self):
+        segments = pipeline.segments(self.steps, False)
+        assert [len(segment) for segment in segments] == [1, 1, 1]
+
+    def test_segments_predicates(self):
+        steps = self.steps + [{"name": "length_diff", "ext": "ldiff", "diff": 5},
+                              {"name": "sentence_ratio", "ext": "ratio", "ratio": 9},
+                              {"name": "html", "ext": "html2"}]
+        segments = pipeline.segments(steps, False)
+        assert [[step["ext"] for step in segment] for segment in segments] == [["html"], ["len"], ["zstr"], ["ldiff", "ratio"], ["html2"]]
+
+    def test_run_stages(self):
+        stages = [pipeline.make_stage(None, None, step) for step in self.steps]
+        infp = io.StringIO(u"<b>one</b>\tun\n1 2 3 4\tun deux\n#{quot}two#{quot}\t deux \n")
+        outfps = [None, io.StringIO(), io.StringIO()]
+        pipeline.run_stages(infp, stages, outfps)
+        assert stages[1].drops == 1
+        assert outfps[1].getvalue() == u"one\tun\n#{quot}two#{quot}\tdeux\n"
+        assert outfps[2].getvalue() == u"one\tun\n\"two\"\tdeux\n"
+
+    def test_run_stages_batch(self):
+        def func(pairs):
+            return [None if source.startswith(u"#") else (source.upper(), target) for source, target in pairs]
+        stages = [pipeline.BatchStage({"name": "upper", "ext": "up"}, func),
+                  pipeline.make_stage(None, None, self.steps[1])]
+        infp = io.StringIO(u"a\tb\n#c\td\ne f g h\ti\nj\tk\n")
+        outfps = [io.StringIO(), io.StringIO()]
+        pipeline.run_stages(infp, stages, outfps, batch_size=2)
+        assert [stage.stats()["lines_in"] for stage in stages] == [4, 3]
+        assert stages[0].drops == 1 and stages[0].modified == 3
+        assert stages[1].drops == 1
+        assert outfps[0].getvalue() == u"A\tb\nE F G H\ti\nJ\tk\n"
+        assert outfps[1].getvalue() == u"A\tb\nJ\tk\n"
+
+    def test_run_stages_triggers(self):
+        class Upper(object):
+            def __init__(self):
+                self.lineno = 0
+
+            def process(self, source, target):
+                self.lineno = self.lineno + 1
+                return source.upper() + unicode(self.lineno), target
+        upper = Upper()
+        stages = [pipeline.Stage({"name": "upper", "ext": "up"}, upper.process)]
+        stages[0].triggers = features.LT
+        infp = io.StringIO(u"<a\tb\nc\td\ne\tf<\ng\th\n")
+        outfps = [io.StringIO()]
+        pipeline.run_stages(infp, stages, outfps)
+        assert outfps[0].getvalue() == u"<A1\tb\nc\td\nE3\tf<\ng\th\n"
+        assert stages[0].stats()["lines_in"] == 4 and stages[0].skipped == 2
+        assert upper.lineno == 4
+
+    def test_run_stages_memo(self):
+        calls = []
+
+        def func(source, target):
+            calls.append(source)
+            return (source.upper(), target)
+        stages = [pipeline.Stage({"name": "upper", "ext": "up", "memo": 1}, func)]
+        infp = io.StringIO(u"a\tb\nc\td\na\tb\na\tx\n")
+        outfps = [io.StringIO()]
+        pipeline.run_stages(infp, stages, outfps)
+        assert outfps[0].getvalue() == u"A\tb\nC\td\nA\tb\nA\tx\n"
+        assert calls == [u"a", u"c", u"a"]
+        stats = stages[0].stats()
+        assert stats["lines_in"] == 4 and stats["lines_modified"] == 4
+        assert stats["memo_hits"] == 1 and stats["memo_misses"] == 3
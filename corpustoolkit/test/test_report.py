@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import json
+import os
+import shutil
+import tempfile
+
+from corpustoolkit import report
+
+
+class TestCleanReport():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.report = report.CleanReport()
+        self.steps = [{"name": "html", "ext": "html", "description": "clean html"},
+                      {"name": "length_limit", "ext": "len", "description": "length limit"}]
+        self.stats = [{"lines_in": 10, "lines_out": 10, "lines_dropped": 0, "lines_modified": 4, "seconds": 3.0},
+                      {"lines_in": 10, "lines_out": 7, "lines_dropped": 3, "lines_modified": 0, "seconds": 1.0}]
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fused_segment(self):
+        self.report.start_segment()
+        self.report.end_segment(self.steps, self.stats, 100, [None, 60])
+        html, length = self.report.steps
+        assert html["fused"] and length["fused"]
+        assert html["wall_seconds"] == 3.0
+        assert html["cpu_seconds"] == 3 * length["cpu_seconds"]
+        assert html["bytes_in"] == 100 and html["bytes_out"] is None
+        assert length["bytes_in"] is None and length["bytes_out"] == 60
+        assert length["lines_dropped"] == 3
+
+    def test_single_step(self):
+        self.report.start_segment()
+        self.report.end_segment(self.steps[:1], None, 100, [80])
+        item = self.report.steps[0]
+        assert not item["fused"]
+        assert item["lines_in"] is None and item["lines_per_second"] is None
+        assert item["bytes_out"] == 80
+
+    def test_dump_and_summary(self):
+        self.report.skip_step(self.steps[0])
+        self.report.start_segment()
+        self.report.end_segment(self.steps[1:], self.stats[1:], 100, [60])
+        filename = os.path.join(self.tmpdir, "report.json")
+        self.report.dump(filename)
+        with open(filename) as fp:
+            data = json.load(fp)
+        assert [item["cached"] for item in data["steps"]] == [True, False]
+        assert "wall_seconds" in data["total"]
+        lines = self.report.summary()
+        assert "(cached)" in lines[2]
+        assert lines[3].startswith("len ")
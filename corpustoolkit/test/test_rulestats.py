@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+from corpustoolkit import pipeline
+from corpustoolkit import rulestats
+from corpustoolkit.cleantools.regex import RegexClean
+from corpustoolkit.config.corpusclean import CorpusCleanConfig
+
+
+class TestRuleStats():
+    def setup(self):
+        self.clean_config = CorpusCleanConfig()
+        self.clean_config.rule_stats = True
+        self.relist = [{"description": "cdata", "action": "delete", "pattern": u"CDATA"},
+                       {"description": "todo", "action": "delete_line", "pattern": u"\\bTODO\\b"},
+                       {"description": "never", "action": "delete", "pattern": u"xyzzy", "apply_to": u"source"}]
+
+    def test_counted(self):
+        stats = rulestats.RuleStats("cdata", u"CDATA")
+        clean = stats.counted(lambda sentence: sentence.replace(u"CDATA", u""))
+        assert clean(u"a CDATA") == u"a "
+        assert clean(u"b") == u"b"
+        assert clean(u"CDATA") == u""
+        assert (stats.examined, stats.matched, stats.deleted) == (3, 2, 1)
+
+    def test_regex_stage_stats(self):
+        regexclean = RegexClean(self.clean_config, {"ext": "re", "list": self.relist})
+        regexclean.compile_relist()
+        stage = pipeline.Stage({"ext": "re"}, regexclean.clean_pair)
+        stage.process_batch([(u"CDATA x", u"y"), (u"TODO", u"z"), (u"a", u"b")])
+        rules = stage.stats()["rules"]
+        assert [rule["description"] for rule in rules] == ["cdata", "todo", "never"]
+        assert [rule["examined"] for rule in rules] == [6, 6, 2]
+        assert [rule["matched"] for rule in rules] == [1, 1, 0]
+        assert [rule["deleted"] for rule in rules] == [0, 1, 0]
+
+    def test_no_stats(self):
+        regexclean = RegexClean(None, {"ext": "re", "list": self.relist})
+        regexclean.compile_relist()
+        assert "rules" not in pipeline.Stage({"ext": "re"}, regexclean.clean_pair).stats()
+
+    def test_merge(self):
+        shard = [{"description": "a", "pattern": u"a", "examined": 2, "matched": 1, "deleted": 0, "seconds": 0.5}]
+        merged = rulestats.merge([shard, shard])
+        assert merged[0]["examined"] == 4 and merged[0]["seconds"] == 1.0
+        assert shard[0]["examined"] == 2
+
+    def test_report(self):
+        rules = [{"description": "a", "pattern": u"a", "examined": 2, "matched": 1, "deleted": 0, "seconds": 0.1},
+                 {"description": "b", "pattern": u"b", "examined": 2, "matched": 0, "deleted": 0, "seconds": 0.3},
+                 {"description": "c", "pattern": u"c", "examined": 2, "matched": 2, "deleted": 1, "seconds": 0.2}]
+        lines = rulestats.report("re", rules)
+        assert len(lines) == 5
+        lines = rulestats.report("re", rules, 2)
+        assert lines[5:] == [u"Dead rules, never matched: 1", u"    #2 b: b",
+                             u"Top 2 expensive rules:", u"    300.0ms #2 b: b", u"    200.0ms #3 c: c"]
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+# License: FreeBSD License or The BSD 2-Clause License
+
+# Copyright (c) 2013, Leo Jiang
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+#     Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Author:   Leo Jiang <leo.jiang.dev@gmail.com>
+import os
+import shutil
+import tempfile
+import time
+
+from corpustoolkit import stepcache
+
+
+class TestStepCache():
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = stepcache.StepCache(os.path.join(self.tmpdir, "cache"), 100)
+        self.steps = [{"name": "html", "ext": "html"},
+                      {"name": "length_limit", "ext": "len", "source": [1, 80]}]
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, size):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as fp:
+            fp.write('x' * size)
+        return filename
+
+    def test_step_keys_chain(self):
+        keys = stepcache.step_keys("input", self.steps)
+        assert len(keys) == 2
+        assert keys == stepcache.step_keys("input", self.steps)
+        assert keys[0] != stepcache.step_keys("other", self.steps)[0]
+
+    def test_step_keys_config_changed(self):
+        keys = stepcache.step_keys("input", self.steps)
+        self.steps[1]["source"] = [1, 100]
+        changed = stepcache.step_keys("input", self.steps)
+        assert keys[0] == changed[0]
+        assert keys[1] != changed[1]
+
+    def test_step_keys_ignore_logger(self):
+        keys = stepcache.step_keys("input", self.steps)
+        self.steps[0]["logger"] = object()
+        assert keys == stepcache.step_keys("input", self.steps)
+
+    def test_lookup(self):
+        self.cache.store("b", self.write("out", 10), "nolog")
+        assert self.cache.lookup(["a", "b", "c"]) == 2
+        assert self.cache.lookup(["c"]) == 0
+
+    def test_evict_lru(self):
+        self.cache.store("a", self.write("out", 40), "nolog")
+        self.cache.store("b", self.write("out", 40), "nolog")
+        os.utime(self.cache.entry("a"), (time.time() - 100, time.time() - 100))
+        os.utime(self.cache.entry("b"), (time.time() - 50, time.time() - 50))
+        self.cache.store("c", self.write("out", 40), "nolog")
+        assert not self.cache.contains("a")
+        assert self.cache.contains("b")
+        assert self.cache.contains("c")
+
+    def test_input_key(self):
+        filename = self.write("corpus", 10)
+        key = self.cache.input_key(filename)
+        assert key == stepcache.file_hash(filename)
+        assert key == self.cache.input_key(filename)
@@ -35,6 +35,8 @@
 TMX2BiText Converter
 
 Convert the tmx file or tmx files in a directory into bitext file(s).
+The tmx files compressed with gzip, bzip2 or xz (e.g. name.tmx.gz) are read directly, and the bitext
+files are compressed in the same format.
 
 Command line syntax::
 
@@ -50,7 +52,6 @@ Command line syntax::
 
 """
 
-import codecs
 import glob
 import logging
 import os.path
@@ -58,6 +59,7 @@ import sys
 
 from optparse import OptionParser
 
+from corpustoolkit.bitextio import BitextWriter, COMPRESSIONS, split_suffix
 from corpustoolkit.tmxparser import TMXParser
 from corpustoolkit.language_code import LanguageCode
 
@@ -153,8 +155,10 @@ class TMX2BiText():
     def run(self):
         """Run the tmx2bitext on file(s)."""
         if os.path.isdir(self.input_path):
-            for filename in glob.glob(os.path.join(self.input_path, "*.tmx")):
-                self.parse_tmx_file(filename)
+            patterns = ["*.tmx"] + ["*.tmx." + name for name, magic in COMPRESSIONS]
+            for pattern in patterns:
+                for filename in glob.glob(os.path.join(self.input_path, pattern)):
+                    self.parse_tmx_file(filename)
         elif os.path.isfile(self.input_path):
             self.parse_tmx_file(self.input_path)
 
@@ -212,18 +216,24 @@ class TMX2BiText():
         return (source, target)
 
     def parse_tmx_file(self, filename):
-        """Parse tmx file, extract the translation units."""
+        """Parse tmx file, extract the translation units.
+
+        The bitext file is compressed in the same format if tmx file is named with a compression suffix.
+        """
 
         logging.debug("TMX: {}".format(filename))
         bitext_filename = os.path.basename(filename)
         tmx_filename = bitext_filename
+        (bitext_filename, compression) = split_suffix(bitext_filename)
         (bitext_filename, ext) = os.path.splitext(bitext_filename)      # pylint: disable=I0011,W0612
         lang_suffix = '-'.join([LanguageCode(self.source_lang).xx(), LanguageCode(self.target_lang).xx()])
         bitext_filename = '.'.join([bitext_filename, lang_suffix, 'bitext'])
+        if compression is not None:
+            bitext_filename = '.'.join([bitext_filename, compression])
         bitext_filepath = os.path.join(self.outdir, bitext_filename)
         logging.debug("BiText : {}".format(bitext_filepath))
 
-        self.bitextfp = codecs.open(bitext_filepath, 'w', encoding="UTF-8")
+        self.bitextfp = BitextWriter(bitext_filepath)
 
         logging.info("TMX : {}".format(tmx_filename))
         logging.info("BiText: {}".format(bitext_filename))
@@ -44,6 +44,8 @@ import os.path
 from xml.parsers.expat import ParserCreate
 from xml.parsers.expat import ExpatError
 
+from corpustoolkit.bitextio import open_file
+
 
 class TMXParser(object):
     """TMXParser read a TMX file and extract all translation units.
@@ -97,9 +99,10 @@ class TMXParser(object):
         # Open the tmx file as file object. Don't specify the encoding.
         # ParseFile only need a file object with read(nbytes) method.
         # So we can use ParseFile read the xml with encoding either UTF-8 or UTF-16.
+        # A compressed tmx file is decompressed on the fly.
         try:
             logging.debug("Open the file: {}".format(filename))
-            fp = open(filename)
+            fp = open_file(filename)
         except IOError as e:
             logging.debug("Failed to open.")
             logging.error(e)